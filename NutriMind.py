@@ -3,24 +3,34 @@ import streamlit as st
 import pandas as pd
 import json
 from datetime import datetime, timedelta
-from oauth2client.service_account import ServiceAccountCredentials
-import gspread
-import plotly.express as px
-from sklearn.linear_model import LinearRegression
-from sklearn.cluster import KMeans
-import numpy as np
-import io
-from google.cloud import vision
 # import base64 # No se usa actualmente, se puede descomentar si se necesita en el futuro
-from unidecode import unidecode # NUEVO: Para quitar acentos
 import random # NUEVO: Para mensajes aleatorios
+import time
+from nutrimind.catalog import get_catalog, normalize_text
+from nutrimind.aggregates import WeeklyPlantAggregates, iso_week_key
+from nutrimind.analytics import plantas_por_dia, presencia_pre_probioticos
+from nutrimind.charts import GRANULARITY_LABELS, line_series, render_mode, scatter_points
+from nutrimind.export import EXPORT_FORMATS, available_formats, export_bytes
+from nutrimind.summaries import summary_row
+from nutrimind.importer import canonicalize_foods
+from nutrimind.food_ids import get_food_ids, union_masks
+from nutrimind.food_search import get_food_search_index
+from nutrimind.mood_models import MoodRegressionStore, OnlineLinearRegression, data_fingerprint, mood_row
+from nutrimind.cohorts import CohortModel, model_mtime
+from nutrimind.images import prepare_image
+from nutrimind.storage import EXPECTED_HEADERS, GSheetsBackend, SQLiteBackend, is_gspread_error
+from nutrimind.write_behind import FAILED, PERSISTED, QUEUED, WriteBehindStorage
+from nutrimind.sheets_usage import InstrumentedWorksheet, SheetsUsage, TokenBucket
+from nutrimind.timing import Tracer
+from nutrimind.detectors import ColorHistogramDetector, GoogleVisionDetector, merge_candidates
+from nutrimind.vision_cache import DEFAULT_MAX_DISK_ENTRIES, DetectionCache
+from nutrimind.vision_labels import CircuitBreaker, VisionLabeler, VisionMetrics
 
 st.set_page_config(page_title="NutriBioMind", layout="centered")
 st.title("🌱 La regla de oro: ¡30 plantas distintas por semana!")
 
 # --- Configuración de Clientes de Google Cloud ---
-creds_gspread = None
-vision_client = None
+# Aquí solo se interpreta el secreto; los clientes (gspread, Vision) y sus librerías se cargan al primer uso
 google_services_available = False
 gcp_secret_content_type_for_error = "unknown"
 creds_info_dict = None # Definido aquí para un alcance más amplio
@@ -47,15 +57,6 @@ try:
         st.error(f"No se pudo interpretar el contenido del secreto 'gcp_service_account' como un diccionario. Tipo obtenido: {gcp_secret_content_type_for_error}")
         raise ValueError("Fallo al interpretar el secreto como diccionario.")
 
-    # 1. Inicializar credenciales para gspread
-    scope_gspread = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    creds_gspread = ServiceAccountCredentials.from_json_keyfile_dict(creds_info_dict, scope_gspread)
-
-    # 2. Inicializar cliente de Vision con las credenciales cargadas explícitamente
-    from google.oauth2 import service_account as google_service_account # Importación movida aquí
-    vision_credentials = google_service_account.Credentials.from_service_account_info(creds_info_dict)
-    vision_client = vision.ImageAnnotatorClient(credentials=vision_credentials)
-
     google_services_available = True
     # st.sidebar.success("Servicios de Google conectados.") # Optional
 
@@ -68,328 +69,106 @@ except ValueError as ve:
 except Exception as e:
     st.error(f"Error inesperado al inicializar los servicios de Google: {e}. Tipo de contenido del secreto procesado: {gcp_secret_content_type_for_error}. Algunas funciones podrían no estar disponibles.")
 
-# --- Base de Datos Detallada de Alimentos ---
-def normalize_text(text):
-    if text is None:
-        return ""
-    return unidecode(str(text)).lower().strip()
-
-PLANT_CATEGORIES_KEYS = [
-    "🥦 Verduras y hortalizas", "🍎 Frutas", "🌰 Frutos secos y semillas",
-    "🫘 Legumbres", "🌾 Cereales y pseudocereales", "🍄 Setas y hongos", "🌿 Hierbas y especias"
-]
-
-food_details_db = {
-    # Verduras y Hortalizas (Existentes)
-    normalize_text("acelga"): {"original_name": "Acelga", "category_key": "🥦 Verduras y hortalizas", "color": "verde", "pni_benefits": ["vitamina K", "magnesio", "fibra", "antioxidantes"], "tags": ["hoja verde", "detox"]},
-    normalize_text("apio"): {"original_name": "Apio", "category_key": "🥦 Verduras y hortalizas", "color": "verde", "pni_benefits": ["fibra", "antioxidantes", "electrolitos", "ftalidas (relajante muscular)"], "tags": ["crujiente", "diurético", "bajo en calorías"]},
-    normalize_text("berenjena"): {"original_name": "Berenjena", "category_key": "🥦 Verduras y hortalizas", "color": "morado", "pni_benefits": ["nasunina", "fibra", "antioxidantes"], "tags": ["solanacea", "versátil"]},
-    normalize_text("brócoli"): {"original_name": "Brócoli", "category_key": "🥦 Verduras y hortalizas", "color": "verde", "pni_benefits": ["sulforafano", "fibra", "vitamina C", "indol-3-carbinol"], "tags": ["cruciferas", "detox", "anticancerígeno potencial"]},
-    normalize_text("calabacín"): {"original_name": "Calabacín", "category_key": "🥦 Verduras y hortalizas", "color": "verde", "pni_benefits": ["bajo en calorías", "vitamina A", "fibra", "potasio"], "tags": ["cucurbitacea", "suave", "hidratante"]},
-    normalize_text("calabaza"): {"original_name": "Calabaza", "category_key": "🥦 Verduras y hortalizas", "color": "naranja", "pni_benefits": ["betacaroteno", "fibra", "vitamina C", "potasio"], "tags": ["cucurbitacea", "otoño", "dulce", "versátil"]},
-    normalize_text("cebolla"): {"original_name": "Cebolla", "category_key": "🥦 Verduras y hortalizas", "color": "varios (blanco, amarillo, morado)", "pni_benefits": ["quercetina", "prebiótico (inulina)", "compuestos azufrados", "aliicina (al cortarla)"], "tags": ["aliacea", "base de sofrito", "inmunidad"]},
-    normalize_text("coliflor"): {"original_name": "Coliflor", "category_key": "🥦 Verduras y hortalizas", "color": "blanco", "pni_benefits": ["glucosinolatos", "fibra", "vitamina C", "colina"], "tags": ["cruciferas", "versátil", "bajo en carbohidratos"]},
-    normalize_text("espinaca"): {"original_name": "Espinaca", "category_key": "🥦 Verduras y hortalizas", "color": "verde oscuro", "pni_benefits": ["hierro", "folato", "vitamina K", "luteína", "zeaxantina"], "tags": ["hoja verde", "rica en nutrientes", "salud ocular"]},
-    normalize_text("pimiento rojo"): {"original_name": "Pimiento Rojo", "category_key": "🥦 Verduras y hortalizas", "color": "rojo", "pni_benefits": ["vitamina C (muy alta)", "capsantina", "betacaroteno", "antioxidantes"], "tags": ["solanacea", "dulce", "vitamina C potente"]},
-    normalize_text("puerro"): {"original_name": "Puerro", "category_key": "🥦 Verduras y hortalizas", "color": "verde claro/blanco", "pni_benefits": ["prebiótico (inulina)", "kaempferol", "vitaminas A, C, K"], "tags": ["aliacea", "suave", "sopas y cremas"]},
-    normalize_text("tomate"): {"original_name": "Tomate", "category_key": "🥦 Verduras y hortalizas", "color": "rojo", "pni_benefits": ["licopeno", "vitamina C", "potasio", "antioxidantes"], "tags": ["solanacea", "fruta botanicamente", "versátil", "antiinflamatorio"]},
-    normalize_text("zanahoria"): {"original_name": "Zanahoria", "category_key": "🥦 Verduras y hortalizas", "color": "naranja", "pni_benefits": ["betacaroteno", "fibra", "vitamina K", "antioxidantes"], "tags": ["raiz", "salud ocular", "crujiente"]},
-    normalize_text("ajo"): {"original_name": "Ajo", "category_key": "🥦 Verduras y hortalizas", "color": "blanco", "pni_benefits": ["alicina", "prebiótico", "compuestos azufrados", "inmunomodulador"], "tags": ["aliacea", "especias", "antibacteriano", "inmunidad"]},
-    normalize_text("alcachofa"): {"original_name": "Alcachofa", "category_key": "🥦 Verduras y hortalizas", "color": "verde/morado", "pni_benefits": ["cinarina", "fibra prebiótica (inulina)", "silimarina", "antioxidantes"], "tags": ["flor comestible", "detox hepático", "digestiva"]},
-    normalize_text("espárrago"): {"original_name": "Espárrago", "category_key": "🥦 Verduras y hortalizas", "color": "verde/blanco/morado", "pni_benefits": ["asparagina", "prebiótico (inulina)", "folato", "glutation"], "tags": ["diurético", "detox", "primavera"]},
-    normalize_text("remolacha"): {"original_name": "Remolacha", "category_key": "🥦 Verduras y hortalizas", "color": "rojo/morado", "pni_benefits": ["nitratos (vasodilatador)", "betanina", "folato", "fibra"], "tags": ["raiz", "colorante natural", "rendimiento deportivo", "detox"]},
-    normalize_text("col rizada"): {"original_name": "Col Rizada (Kale)", "category_key": "🥦 Verduras y hortalizas", "color": "verde oscuro", "pni_benefits": ["vitamina K", "vitamina C", "glucosinolatos", "luteína", "zeaxantina"], "tags": ["hoja verde", "cruciferas", "superalimento", "rica en nutrientes"]},
-    normalize_text("kale"): {"original_name": "Kale (Col Rizada)", "category_key": "🥦 Verduras y hortalizas", "color": "verde oscuro", "pni_benefits": ["vitamina K", "vitamina C", "glucosinolatos", "luteína", "zeaxantina"], "tags": ["hoja verde", "cruciferas", "superalimento", "rica en nutrientes"]},
-    normalize_text("nabo"): {"original_name": "Nabo", "category_key": "🥦 Verduras y hortalizas", "color": "blanco/morado", "pni_benefits": ["fibra", "vitamina C", "glucosinolatos"], "tags": ["raiz", "cruciferas", "sabor terroso"]},
-    normalize_text("chirivía"): {"original_name": "Chirivía", "category_key": "🥦 Verduras y hortalizas", "color": "blanco crema", "pni_benefits": ["fibra", "potasio", "vitamina C", "folato"], "tags": ["raiz", "dulce", "invierno"]},
-    normalize_text("guisante"): {"original_name": "Guisante", "category_key": "🥦 Verduras y hortalizas", "color": "verde", "pni_benefits": ["fibra", "proteína vegetal", "vitamina K", "manganeso"], "tags": ["leguminosa verde", "dulce", "primavera"]},
-    normalize_text("judía verde"): {"original_name": "Judía Verde", "category_key": "🥦 Verduras y hortalizas", "color": "verde", "pni_benefits": ["fibra", "vitamina K", "vitamina C", "silicio"], "tags": ["leguminosa verde", "crujiente", "baja en calorías"]},
-    normalize_text("habas"): {"original_name": "Habas", "category_key": "🥦 Verduras y hortalizas", "color": "verde", "pni_benefits": ["fibra", "proteína vegetal", "folato", "levodopa (precursor dopamina)"], "tags": ["leguminosa verde", "primavera"]},
-    normalize_text("pimiento verde"): {"original_name": "Pimiento Verde", "category_key": "🥦 Verduras y hortalizas", "color": "verde", "pni_benefits": ["vitamina C", "fibra", "clorofila"], "tags": ["solanacea", "sabor más amargo que otros pimientos"]},
-    normalize_text("pimiento amarillo"): {"original_name": "Pimiento Amarillo", "category_key": "🥦 Verduras y hortalizas", "color": "amarillo", "pni_benefits": ["vitamina C (alta)", "betacaroteno", "luteína", "zeaxantina"], "tags": ["solanacea", "dulce", "antioxidante"]},
-    normalize_text("cebolla morada"): {"original_name": "Cebolla Morada", "category_key": "🥦 Verduras y hortalizas", "color": "morado", "pni_benefits": ["quercetina", "antocianinas", "prebiótico"], "tags": ["aliacea", "color vibrante", "cruda en ensaladas"]},
-    normalize_text("cebolleta"): {"original_name": "Cebolleta", "category_key": "🥦 Verduras y hortalizas", "color": "blanco/verde", "pni_benefits": ["flavonoides", "vitamina K", "fibra"], "tags": ["aliacea", "suave", "fresca"]},
-    normalize_text("chalota"): {"original_name": "Chalota", "category_key": "🥦 Verduras y hortalizas", "color": "marrón/morado claro", "pni_benefits": ["compuestos azufrados", "antioxidantes", "vitaminas B"], "tags": ["aliacea", "sabor delicado", "gourmet"]},
-    normalize_text("rábano"): {"original_name": "Rábano", "category_key": "🥦 Verduras y hortalizas", "color": "rojo/blanco/negro", "pni_benefits": ["glucosinolatos", "vitamina C", "fibra", "efecto detoxificante"], "tags": ["raiz", "cruciferas", "picante", "digestivo"]},
-    normalize_text("endivia"): {"original_name": "Endivia", "category_key": "🥦 Verduras y hortalizas", "color": "blanco/amarillo claro", "pni_benefits": ["inulina (prebiótico)", "folato", "vitamina K"], "tags": ["hoja amarga", "digestiva", "achicoria"]},
-    normalize_text("escarola"): {"original_name": "Escarola", "category_key": "🥦 Verduras y hortalizas", "color": "verde", "pni_benefits": ["fibra", "folato", "vitamina A", "intibina (amargor)"], "tags": ["hoja amarga", "invierno", "digestiva"]},
-    normalize_text("lechuga iceberg"): {"original_name": "Lechuga Iceberg", "category_key": "🥦 Verduras y hortalizas", "color": "verde claro", "pni_benefits": ["agua (hidratante)", "baja en calorías", "fibra (menor que otras hojas)"], "tags": ["hoja crujiente", "ensaladas"]},
-    normalize_text("lechuga romana"): {"original_name": "Lechuga Romana", "category_key": "🥦 Verduras y hortalizas", "color": "verde", "pni_benefits": ["vitamina K", "vitamina A", "folato", "fibra"], "tags": ["hoja verde", "ensaladas", "crujiente"]},
-    normalize_text("canónigos"): {"original_name": "Canónigos", "category_key": "🥦 Verduras y hortalizas", "color": "verde oscuro", "pni_benefits": ["vitamina C", "betacaroteno", "hierro", "ácido fólico"], "tags": ["hoja verde", "sabor suave", "delicada"]},
-    normalize_text("rúcula"): {"original_name": "Rúcula", "category_key": "🥦 Verduras y hortalizas", "color": "verde oscuro", "pni_benefits": ["glucosinolatos", "vitamina K", "nitratos", "antioxidantes"], "tags": ["hoja verde", "sabor picante", "cruciferas"]},
-    normalize_text("boniato"): {"original_name": "Boniato (Batata)", "category_key": "🥦 Verduras y hortalizas", "color": "naranja/morado/blanco", "pni_benefits": ["betacaroteno (naranja)", "antocianinas (morado)", "fibra", "vitamina C", "manganeso"], "tags": ["tuberculo", "dulce", "antiinflamatorio", "versátil"]},
-    normalize_text("batata"): {"original_name": "Batata (Boniato)", "category_key": "🥦 Verduras y hortalizas", "color": "naranja/morado/blanco", "pni_benefits": ["betacaroteno (naranja)", "antocianinas (morado)", "fibra", "vitamina C", "manganeso"], "tags": ["tuberculo", "dulce", "antiinflamatorio", "versátil"]}, # Alias
-    normalize_text("patata"): {"original_name": "Patata", "category_key": "🥦 Verduras y hortalizas", "color": "varios", "pni_benefits": ["potasio", "vitamina C", "almidón resistente (enfriada)", "vitamina B6"], "tags": ["tuberculo", "versátil", "fuente de energía", "solanacea"]},
-    normalize_text("hinojo"): {"original_name": "Hinojo", "category_key": "🥦 Verduras y hortalizas", "color": "blanco/verde claro", "pni_benefits": ["anetol (digestivo)", "fibra", "vitamina C", "potasio"], "tags": ["bulbo", "sabor anisado", "digestivo", "carminativo"]},
-    normalize_text("pak choi"): {"original_name": "Pak Choi (Bok Choy)", "category_key": "🥦 Verduras y hortalizas", "color": "verde/blanco", "pni_benefits": ["glucosinolatos", "vitamina C", "vitamina K", "calcio"], "tags": ["col china", "cruciferas", "salteados", "suave"]},
-    normalize_text("bok choy"): {"original_name": "Bok Choy (Pak Choi)", "category_key": "🥦 Verduras y hortalizas", "color": "verde/blanco", "pni_benefits": ["glucosinolatos", "vitamina C", "vitamina K", "calcio"], "tags": ["col china", "cruciferas", "salteados", "suave"]}, # Alias
-    normalize_text("coles de bruselas"): {"original_name": "Coles de Bruselas", "category_key": "🥦 Verduras y hortalizas", "color": "verde", "pni_benefits": ["glucosinolatos", "fibra", "vitamina K", "vitamina C", "antioxidantes"], "tags": ["cruciferas", "detox", "sabor amargo/dulce al cocinar"]},
-    normalize_text("tirabeque"): {"original_name": "Tirabeque", "category_key": "🥦 Verduras y hortalizas", "color": "verde", "pni_benefits": ["fibra", "vitamina C", "vitamina A", "hierro"], "tags": ["leguminosa verde", "crujiente", "dulce", "se come entero"]},
-    normalize_text("okra"): {"original_name": "Okra", "category_key": "🥦 Verduras y hortalizas", "color": "verde", "pni_benefits": ["mucílago (fibra soluble)", "vitamina K", "folato", "antioxidantes"], "tags": ["textura mucilaginosa", "espesante", "cocina sureña/india/africana"]},
-    normalize_text("cardo"): {"original_name": "Cardo", "category_key": "🥦 Verduras y hortalizas", "color": "verde/blanco", "pni_benefits": ["cinarina", "silimarina", "fibra", "potasio"], "tags": ["similar alcachofa", "depurativo", "invierno"]},
-    normalize_text("borraja"): {"original_name": "Borraja", "category_key": "🥦 Verduras y hortalizas", "color": "verde", "pni_benefits": ["mucílago", "vitamina C", "potasio", "ácido gamma-linolénico (semillas)"], "tags": ["mucilaginosa", "diurética", "tradicional"]},
-    normalize_text("grelos"): {"original_name": "Grelos", "category_key": "🥦 Verduras y hortalizas", "color": "verde oscuro", "pni_benefits": ["glucosinolatos", "vitamina K", "folato", "hierro"], "tags": ["hojas de nabo", "sabor amargo", "tradicional gallega", "cruciferas"]},
-    normalize_text("pepino"): {"original_name": "Pepino", "category_key": "🥦 Verduras y hortalizas", "color": "verde", "pni_benefits": ["hidratante (alto contenido de agua)", "sílice (piel)", "cucurbitacinas", "electrolitos"], "tags": ["cucurbitacea", "refrescante", "ensaladas", "bajo en calorías"]},
-    normalize_text("rábano picante"): {"original_name": "Rábano Picante (Horseradish)", "category_key": "🥦 Verduras y hortalizas", "color": "blanco/beige", "pni_benefits": ["sinigrina (glucosinolato)", "propiedades antibacterianas", "descongestionante"], "tags": ["raiz", "muy picante", "condimento", "cruciferas"]},
-    normalize_text("wasabi"): {"original_name": "Wasabi (raíz)", "category_key": "🥦 Verduras y hortalizas", "color": "verde claro", "pni_benefits": ["isotiocianatos (antibacterianos, antiinflamatorios)", "propiedades antimicrobianas"], "tags": ["raiz", "muy picante", "condimento japonés", "cruciferas"]},
-    normalize_text("col lombarda"): {"original_name": "Col Lombarda", "category_key": "🥦 Verduras y hortalizas", "color": "morado", "pni_benefits": ["antocianinas", "vitamina C", "fibra", "glucosinolatos"], "tags": ["cruciferas", "color vibrante", "antioxidante"]},
-    normalize_text("berros"): {"original_name": "Berros", "category_key": "🥦 Verduras y hortalizas", "color": "verde oscuro", "pni_benefits": ["feniletil isotiocianato (PEITC)", "vitamina K", "vitamina C", "antioxidantes"], "tags": ["hoja verde", "cruciferas", "sabor picante", "depurativo"]},
-    normalize_text("diente de león (hojas)"): {"original_name": "Diente de León (hojas)", "category_key": "🥦 Verduras y hortalizas", "color": "verde", "pni_benefits": ["vitaminas A, C, K", "hierro", "calcio", "prebiótico (inulina en raíz)", "efecto diurético"], "tags": ["hoja amarga", "silvestre comestible", "depurativo", "nutritivo"]},
-    normalize_text("topinambur"): {"original_name": "Topinambur (Alcachofa de Jerusalén)", "category_key": "🥦 Verduras y hortalizas", "color": "marrón claro/amarillo", "pni_benefits": ["inulina (alto contenido, prebiótico)", "hierro", "potasio"], "tags": ["tuberculo", "prebiótico potente", "sabor dulce anuezado", "produce gases en algunos"]},
-
-    # Frutas
-    normalize_text("manzana"): {"original_name": "Manzana", "category_key": "🍎 Frutas", "color": "varios (rojo, verde, amarillo)", "pni_benefits": ["pectina (fibra soluble, prebiótico)", "quercetina", "vitamina C", "antioxidantes"], "tags": ["con piel", "salud intestinal", "versátil"]},
-    normalize_text("plátano"): {"original_name": "Plátano", "category_key": "🍎 Frutas", "color": "amarillo", "pni_benefits": ["potasio", "vitamina B6", "prebiótico (si no muy maduro - almidón resistente)", "triptófano"], "tags": ["energético", "salud muscular", "estado de ánimo"]},
-    normalize_text("naranja"): {"original_name": "Naranja", "category_key": "🍎 Frutas", "color": "naranja", "pni_benefits": ["vitamina C", "hesperidina", "fibra (si se come entera)", "folato"], "tags": ["cítrico", "inmunidad", "antioxidante"]},
-    normalize_text("fresa"): {"original_name": "Fresa", "category_key": "🍎 Frutas", "color": "rojo", "pni_benefits": ["antocianinas", "vitamina C", "manganeso", "fisetin"], "tags": ["baya", "antioxidante", "antiinflamatoria", "delicada"]},
-    normalize_text("arándano"): {"original_name": "Arándano", "category_key": "🍎 Frutas", "color": "azul/morado", "pni_benefits": ["antocianinas (muy alta)", "pterostilbeno", "antioxidantes potentes", "salud cerebral"], "tags": ["baya", "superfood", "antiinflamatorio", "salud urinaria (arándano rojo)"]},
-    normalize_text("kiwi"): {"original_name": "Kiwi", "category_key": "🍎 Frutas", "color": "verde (pulpa)/marrón (piel)", "pni_benefits": ["vitamina C (muy alta)", "actinidina (enzima digestiva)", "fibra", "serotonina"], "tags": ["digestivo", "inmunidad", "rico en vitamina C"]},
-    normalize_text("mango"): {"original_name": "Mango", "category_key": "🍎 Frutas", "color": "naranja/amarillo/rojo", "pni_benefits": ["vitamina A (betacaroteno)", "vitamina C", "mangiferina (antioxidante)", "fibra"], "tags": ["tropical", "antioxidante", "dulce"]},
-    normalize_text("aguacate"): {"original_name": "Aguacate", "category_key": "🍎 Frutas", "color": "verde (pulpa)/negro-verde (piel)", "pni_benefits": ["grasas saludables (ácido oleico)", "fibra", "potasio", "vitamina E", "folato"], "tags": ["grasa monoinsaturada", "salud cardiovascular", "antiinflamatorio", "fruta botanicamente"]},
-    normalize_text("limón"): {"original_name": "Limón", "category_key": "🍎 Frutas", "color": "amarillo", "pni_benefits": ["vitamina C", "limonoides", "flavonoides", "efecto alcalinizante (en el cuerpo)"], "tags": ["cítrico", "detox", "antioxidante", "ácido"]},
-    normalize_text("lima"): {"original_name": "Lima", "category_key": "🍎 Frutas", "color": "verde", "pni_benefits": ["vitamina C", "flavonoides", "antioxidantes"], "tags": ["cítrico", "refrescante", "cócteles", "ácida"]},
-    normalize_text("pomelo"): {"original_name": "Pomelo", "category_key": "🍎 Frutas", "color": "rosa/rojo/blanco", "pni_benefits": ["vitamina C", "licopeno (rosa/rojo)", "naringenina", "fibra"], "tags": ["cítrico", "amargo", "interacción con medicamentos", "quema grasa (popular)"]},
-    normalize_text("mandarina"): {"original_name": "Mandarina", "category_key": "🍎 Frutas", "color": "naranja", "pni_benefits": ["vitamina C", "nobiletina", "fibra", "criptoxantina"], "tags": ["cítrico", "fácil de pelar", "dulce"]},
-    normalize_text("uva"): {"original_name": "Uva", "category_key": "🍎 Frutas", "color": "varios (verde, roja, negra)", "pni_benefits": ["resveratrol (piel uvas oscuras)", "antocianinas (uvas oscuras)", "quercetina", "antioxidantes"], "tags": ["baya", "antioxidante", "salud cardiovascular"]},
-    normalize_text("melón"): {"original_name": "Melón", "category_key": "🍎 Frutas", "color": "varios (verde, naranja, amarillo)", "pni_benefits": ["hidratante (alto contenido de agua)", "vitamina C", "potasio", "betacaroteno (cantalupo)"], "tags": ["cucurbitacea", "verano", "refrescante", "diurético"]},
-    normalize_text("sandía"): {"original_name": "Sandía", "category_key": "🍎 Frutas", "color": "rojo/rosa (pulpa), verde (corteza)", "pni_benefits": ["licopeno", "citrulina (vasodilatador)", "hidratante (muy alta en agua)", "vitamina C"], "tags": ["cucurbitacea", "verano", "refrescante", "hidratación"]},
-    normalize_text("piña"): {"original_name": "Piña", "category_key": "🍎 Frutas", "color": "amarillo (pulpa)", "pni_benefits": ["bromelina (enzima digestiva, antiinflamatoria)", "vitamina C", "manganeso"], "tags": ["tropical", "digestiva", "antiinflamatoria"]},
-    normalize_text("papaya"): {"original_name": "Papaya", "category_key": "🍎 Frutas", "color": "naranja (pulpa)", "pni_benefits": ["papaína (enzima digestiva)", "vitamina C", "betacaroteno", "licopeno"], "tags": ["tropical", "digestiva", "antioxidante"]},
-    normalize_text("granada"): {"original_name": "Granada", "category_key": "🍎 Frutas", "color": "rojo (arilos y cáscara)", "pni_benefits": ["punicalaginas (potente antioxidante)", "ácido púnicico", "antiinflamatoria", "vitamina C"], "tags": ["superfruta", "antioxidante potente", "otoño"]},
-    normalize_text("higo"): {"original_name": "Higo", "category_key": "🍎 Frutas", "color": "morado/verde/negro", "pni_benefits": ["fibra (laxante suave)", "calcio", "potasio", "polifenoles"], "tags": ["dulce", "fibra", "otoño"]},
-    normalize_text("cereza"): {"original_name": "Cereza", "category_key": "🍎 Frutas", "color": "rojo/negro", "pni_benefits": ["antocianinas", "melatonina (ayuda al sueño)", "antiinflamatoria", "vitamina C"], "tags": ["baya (drupa)", "antiinflamatoria", "ácido úrico", "verano"]},
-    normalize_text("ciruela"): {"original_name": "Ciruela", "category_key": "🍎 Frutas", "color": "varios (rojo, morado, amarillo)", "pni_benefits": ["fibra (sorbitol - laxante)", "antioxidantes", "vitamina K", "potasio"], "tags": ["laxante natural", "fibra", "verano"]},
-    normalize_text("melocotón"): {"original_name": "Melocotón", "category_key": "🍎 Frutas", "color": "amarillo/naranja/rojo", "pni_benefits": ["vitamina C", "betacaroteno", "fibra", "antioxidantes"], "tags": ["verano", "dulce", "piel aterciopelada"]},
-    normalize_text("albaricoque"): {"original_name": "Albaricoque", "category_key": "🍎 Frutas", "color": "naranja", "pni_benefits": ["betacaroteno", "vitamina C", "fibra", "catequinas"], "tags": ["verano", "dulce", "salud ocular"]},
-    normalize_text("frambuesa"): {"original_name": "Frambuesa", "category_key": "🍎 Frutas", "color": "rojo/rosa", "pni_benefits": ["cetonas de frambuesa (discutido)", "ácido elágico", "antocianinas", "fibra", "vitamina C"], "tags": ["baya", "antioxidante", "baja en azúcar"]},
-    normalize_text("mora"): {"original_name": "Mora", "category_key": "🍎 Frutas", "color": "negro/morado oscuro", "pni_benefits": ["antocianinas (muy alta)", "vitamina C", "vitamina K", "fibra"], "tags": ["baya", "antioxidante potente", "verano"]},
-    normalize_text("kaki"): {"original_name": "Kaki (Persimón)", "category_key": "🍎 Frutas", "color": "naranja", "pni_benefits": ["vitamina A", "vitamina C", "fibra", "taninos (astringente si no maduro)", "antioxidantes"], "tags": ["otoño", "dulce", "fibra"]},
-    normalize_text("chirimoya"): {"original_name": "Chirimoya", "category_key": "🍎 Frutas", "color": "verde (piel), blanco (pulpa)", "pni_benefits": ["vitamina C", "vitamina B6", "fibra", "annonacina"], "tags": ["tropical", "dulce", "textura cremosa"]},
-    normalize_text("maracuyá"): {"original_name": "Maracuyá (Fruta de la pasión)", "category_key": "🍎 Frutas", "color": "morado/amarillo (piel), amarillo/naranja (pulpa)", "pni_benefits": ["vitamina C", "vitamina A", "fibra", "flavonoides"], "tags": ["tropical", "ácido/dulce", "aromático"]},
-    normalize_text("lichi"): {"original_name": "Lichi", "category_key": "🍎 Frutas", "color": "rojo (piel), blanco translúcido (pulpa)", "pni_benefits": ["vitamina C", "oligopeptidos", "flavonoides"], "tags": ["tropical", "dulce", "aromático"]},
-    normalize_text("plátano macho verde"): {"original_name": "Plátano Macho Verde", "category_key": "🍎 Frutas", "color": "verde", "pni_benefits": ["almidón resistente (prebiótico)", "fibra", "potasio", "vitamina B6"], "tags": ["prebiótico", "cocinar antes de comer", "salud intestinal"]},
-
-    # Frutos secos y semillas
-    normalize_text("almendra"): {"original_name": "Almendra", "category_key": "🌰 Frutos secos y semillas", "color": "marrón (piel), blanco (interior)", "pni_benefits": ["vitamina E", "grasas saludables (monoinsaturadas)", "fibra", "magnesio", "proteína"], "tags": ["fruto seco", "salud cardiovascular", "piel sana"]},
-    normalize_text("nuez"): {"original_name": "Nuez", "category_key": "🌰 Frutos secos y semillas", "color": "marrón claro", "pni_benefits": ["omega-3 (ALA)", "antioxidantes (polifenoles)", "melatonina", "salud cerebral"], "tags": ["fruto seco", "cerebro", "antiinflamatorio"]},
-    normalize_text("semilla de chía"): {"original_name": "Semilla de Chía", "category_key": "🌰 Frutos secos y semillas", "color": "gris/negro/blanco", "pni_benefits": ["omega-3 (ALA)", "fibra soluble (mucílago)", "calcio", "proteína"], "tags": ["semilla", "superfood", "gelificante", "salud intestinal"]},
-    normalize_text("semilla de lino"): {"original_name": "Semilla de Lino", "category_key": "🌰 Frutos secos y semillas", "color": "marrón/dorado", "pni_benefits": ["omega-3 (ALA)", "lignanos (fitoestrógenos)", "fibra soluble e insoluble"], "tags": ["semilla", "moler para absorber", "salud hormonal", "salud intestinal"]},
-    normalize_text("pipa de calabaza"): {"original_name": "Pipa de Calabaza", "category_key": "🌰 Frutos secos y semillas", "color": "verde oscuro", "pni_benefits": ["magnesio", "zinc", "grasas saludables", "cucurbitina (antiparasitario leve)"], "tags": ["semilla", "salud prostática", "magnesio"]},
-    normalize_text("anacardo"): {"original_name": "Anacardo", "category_key": "🌰 Frutos secos y semillas", "color": "blanco crema", "pni_benefits": ["magnesio", "cobre", "grasas monoinsaturadas", "triptófano"], "tags": ["fruto seco", "textura cremosa", "versátil"]},
-    normalize_text("nuez de brasil"): {"original_name": "Nuez de Brasil", "category_key": "🌰 Frutos secos y semillas", "color": "marrón oscuro (piel), blanco (interior)", "pni_benefits": ["selenio (muy alta - 1-2 al día suficiente)", "grasas saludables", "vitamina E"], "tags": ["fruto seco", "selenio", "tiroides", "moderación"]},
-    normalize_text("pistacho"): {"original_name": "Pistacho", "category_key": "🌰 Frutos secos y semillas", "color": "verde/morado (nuez), beige (cáscara)", "pni_benefits": ["vitamina B6", "luteína", "zeaxantina", "grasas saludables", "fibra"], "tags": ["fruto seco", "salud ocular", "colorido"]},
-    normalize_text("avellana"): {"original_name": "Avellana", "category_key": "🌰 Frutos secos y semillas", "color": "marrón", "pni_benefits": ["vitamina E", "grasas monoinsaturadas", "manganeso", "folato"], "tags": ["fruto seco", "salud cardiovascular", "sabor dulce"]},
-    normalize_text("semilla de girasol"): {"original_name": "Semilla de Girasol (Pipa)", "category_key": "🌰 Frutos secos y semillas", "color": "gris/negro (cáscara), blanco (semilla)", "pni_benefits": ["vitamina E", "selenio", "magnesio", "grasas saludables"], "tags": ["semilla", "vitamina E", "antiinflamatorio"]},
-    normalize_text("semilla de sésamo"): {"original_name": "Semilla de Sésamo (Ajonjolí)", "category_key": "🌰 Frutos secos y semillas", "color": "blanco/negro/marrón", "pni_benefits": ["calcio", "hierro", "magnesio", "lignanos (sesamina, sesamolina)"], "tags": ["semilla", "calcio", "tahini", "antioxidante"]},
-    normalize_text("semilla de cáñamo"): {"original_name": "Semilla de Cáñamo", "category_key": "🌰 Frutos secos y semillas", "color": "verde/marrón claro", "pni_benefits": ["proteína completa", "omega-3 y omega-6 (ratio ideal)", "fibra", "vitamina E"], "tags": ["semilla", "proteína vegetal", "superfood", "sin CBD/THC psicoactivo"]},
-    normalize_text("nuez pecana"): {"original_name": "Nuez Pecana", "category_key": "🌰 Frutos secos y semillas", "color": "marrón", "pni_benefits": ["antioxidantes", "grasas monoinsaturadas", "zinc", "vitamina E"], "tags": ["fruto seco", "dulce", "salud cardiovascular"]},
-    normalize_text("nuez de macadamia"): {"original_name": "Nuez de Macadamia", "category_key": "🌰 Frutos secos y semillas", "color": "blanco crema", "pni_benefits": ["grasas monoinsaturadas (ácido palmitoleico)", "fibra", "manganeso"], "tags": ["fruto seco", "rica en grasa saludable", "textura mantecosa", "cara"]},
-
-    # Legumbres
-    normalize_text("lenteja"): {"original_name": "Lenteja", "category_key": "🫘 Legumbres", "color": "varios (marrón, verde, roja, negra)", "pni_benefits": ["fibra (soluble e insoluble)", "proteína vegetal", "hierro", "folato", "prebiótico"], "tags": ["versátil", "económica", "rica en nutrientes"]},
-    normalize_text("garbanzo"): {"original_name": "Garbanzo", "category_key": "🫘 Legumbres", "color": "beige", "pni_benefits": ["fibra", "proteína vegetal", "manganeso", "folato", "almidón resistente (enfriado)"], "tags": ["versátil", "hummus", "salud intestinal"]},
-    normalize_text("judía negra"): {"original_name": "Judía Negra", "category_key": "🫘 Legumbres", "color": "negro", "pni_benefits": ["fibra", "antocianinas", "proteína vegetal", "molibdeno"], "tags": ["antioxidante", "rica en fibra", "cocina latina"]},
-    normalize_text("judía pinta"): {"original_name": "Judía Pinta", "category_key": "🫘 Legumbres", "color": "marrón rojizo con motas", "pni_benefits": ["fibra", "proteína vegetal", "folato", "hierro"], "tags": ["tradicional", "rica en fibra"]},
-    normalize_text("judía blanca"): {"original_name": "Judía Blanca (Alubia)", "category_key": "🫘 Legumbres", "color": "blanco", "pni_benefits": ["fibra", "proteína vegetal", "fósforo", "molibdeno"], "tags": ["versátil", "textura cremosa"]},
-    normalize_text("soja"): {"original_name": "Soja (Haba)", "category_key": "🫘 Legumbres", "color": "amarillo/verde (edamame)", "pni_benefits": ["proteína completa", "isoflavonas (fitoestrógenos)", "fibra", "ácidos grasos omega-3 y omega-6"], "tags": ["proteína vegetal", "versátil (tofu, tempeh, miso, edamame)", "salud hormonal (discutido)"]},
-    normalize_text("edamame"): {"original_name": "Edamame (Haba de Soja Verde)", "category_key": "🫘 Legumbres", "color": "verde", "pni_benefits": ["proteína completa", "fibra", "folato", "vitamina K", "isoflavonas"], "tags": ["snack saludable", "japonés", "proteína vegetal"]},
-    normalize_text("azuki"): {"original_name": "Azuki (Judía Roja Japonesa)", "category_key": "🫘 Legumbres", "color": "rojo oscuro", "pni_benefits": ["fibra", "proteína vegetal", "molibdeno", "antioxidantes"], "tags": ["dulce natural", "cocina asiática", "postres saludables"]},
-    normalize_text("lupino"): {"original_name": "Lupino (Altramuz)", "category_key": "🫘 Legumbres", "color": "amarillo", "pni_benefits": ["proteína muy alta", "fibra", "prebiótico", "aminoácidos esenciales"], "tags": ["aperitivo", "salmuera", "alto en proteína", "legumbre"]},
-
-    # Cereales y pseudocereales
-    normalize_text("avena"): {"original_name": "Avena", "category_key": "🌾 Cereales y pseudocereales", "color": "beige", "pni_benefits": ["betaglucanos (fibra soluble)", "prebiótico", "avenantramidas (antioxidantes)", "manganeso"], "tags": ["integral", "desayuno", "salud cardiovascular", "energía sostenida"]},
-    normalize_text("quinoa"): {"original_name": "Quinoa", "category_key": "🌾 Cereales y pseudocereales", "color": "varios (blanca, roja, negra)", "pni_benefits": ["proteína completa (todos los aminoácidos esenciales)", "fibra", "hierro", "magnesio", "flavonoides (quercetina, kaempferol)"], "tags": ["pseudocereal", "sin gluten", "versátil", "rica en nutrientes"]},
-    normalize_text("arroz integral"): {"original_name": "Arroz Integral", "category_key": "🌾 Cereales y pseudocereales", "color": "marrón", "pni_benefits": ["fibra", "magnesio", "selenio", "manganeso", "índice glucémico más bajo que el blanco"], "tags": ["integral", "grano entero", "versátil"]},
-    normalize_text("trigo sarraceno"): {"original_name": "Trigo Sarraceno (Alforfón)", "category_key": "🌾 Cereales y pseudocereales", "color": "marrón/grisáceo", "pni_benefits": ["rutina (flavonoide, salud vascular)", "magnesio", "fibra", "D-chiro-inositol (regulación glucosa)"], "tags": ["pseudocereal", "sin gluten", "alforfón", "sabor intenso"]},
-    normalize_text("mijo"): {"original_name": "Mijo", "category_key": "🌾 Cereales y pseudocereales", "color": "amarillo claro", "pni_benefits": ["magnesio", "fósforo", "fibra", "antioxidantes", "alcalinizante"], "tags": ["pseudocereal", "sin gluten", "versátil", "fácil digestión"]},
-    normalize_text("amaranto"): {"original_name": "Amaranto", "category_key": "🌾 Cereales y pseudocereales", "color": "beige/dorado", "pni_benefits": ["proteína completa (lisina)", "calcio", "hierro", "fibra", "escualeno"], "tags": ["pseudocereal", "sin gluten", "rico en proteínas", "ancestral"]},
-    normalize_text("arroz salvaje"): {"original_name": "Arroz Salvaje", "category_key": "🌾 Cereales y pseudocereales", "color": "negro/marrón oscuro", "pni_benefits": ["fibra (alta)", "proteína", "antioxidantes", "magnesio"], "tags": ["semilla acuática", "no es arroz verdadero", "textura firme", "sabor anuezado"]},
-    normalize_text("centeno"): {"original_name": "Centeno", "category_key": "🌾 Cereales y pseudocereales", "color": "marrón grisáceo", "pni_benefits": ["fibra (alta)", "lignanos", "magnesio", "manganeso"], "tags": ["cereal con gluten", "pan denso", "sabor fuerte"]},
-    normalize_text("espelta"): {"original_name": "Espelta", "category_key": "🌾 Cereales y pseudocereales", "color": "marrón claro", "pni_benefits": ["fibra", "proteína", "vitaminas B", "mejor tolerada que el trigo común por algunos"], "tags": ["trigo ancestral", "con gluten (diferente al trigo moderno)", "sabor anuezado"]},
-    normalize_text("sorgo"): {"original_name": "Sorgo", "category_key": "🌾 Cereales y pseudocereales", "color": "varios (blanco, rojo, marrón)", "pni_benefits": ["fibra", "antioxidantes (taninos en variedades oscuras)", "hierro", "fósforo"], "tags": ["cereal", "sin gluten", "versátil (harina, grano entero)", "resistente a la sequía"]},
-    normalize_text("teff"): {"original_name": "Teff", "category_key": "🌾 Cereales y pseudocereales", "color": "varios (blanco, marrón, rojo)", "pni_benefits": ["hierro", "calcio", "proteína", "fibra", "almidón resistente"], "tags": ["pseudocereal", "sin gluten", "grano diminuto", "base del injera etíope"]},
-    normalize_text("cebada"): {"original_name": "Cebada", "category_key": "🌾 Cereales y pseudocereales", "color": "beige", "pni_benefits": ["betaglucanos (fibra soluble, prebiótico)", "selenio", "magnesio"], "tags": ["cereal con gluten", "prebiótico", "salud cardiovascular"]},
-
-    # Setas y hongos
-    normalize_text("champiñón"): {"original_name": "Champiñón (Portobello, Cremini)", "category_key": "🍄 Setas y hongos", "color": "blanco/marrón", "pni_benefits": ["selenio", "vitaminas B (B2, B3, B5)", "betaglucanos", "ergotioneína (antioxidante)"], "tags": ["versátil", "común", "bajo en calorías"]},
-    normalize_text("shiitake"): {"original_name": "Shiitake", "category_key": "🍄 Setas y hongos", "color": "marrón", "pni_benefits": ["lentinano (betaglucano inmunomodulador)", "eritadenina (colesterol)", "vitamina D (si expuesto al sol)", "cobre"], "tags": ["medicinal", "sabor umami", "inmunidad"]},
-    normalize_text("seta de ostra"): {"original_name": "Seta de Ostra", "category_key": "🍄 Setas y hongos", "color": "varios (gris, rosa, amarillo)", "pni_benefits": ["betaglucanos", "lovastatina natural (colesterol)", "niacina", "antioxidantes"], "tags": ["sabor suave", "textura delicada", "fácil de cultivar"]},
-    normalize_text("maitake"): {"original_name": "Maitake (Grifola frondosa)", "category_key": "🍄 Setas y hongos", "color": "marrón/gris", "pni_benefits": ["grifolano (betaglucano)", "factor D-fracción (inmunidad, antitumoral potencial)", "regulación glucosa"], "tags": ["medicinal", "adaptógeno", "inmunidad"]},
-    normalize_text("reishi"): {"original_name": "Reishi (Ganoderma lucidum)", "category_key": "🍄 Setas y hongos", "color": "rojo/marrón brillante", "pni_benefits": ["triterpenos (antiinflamatorio, antihistamínico)", "polisacáridos (inmunomodulador)", "adaptógeno", "calmante"], "tags": ["medicinal", "no culinario (amargo)", "extracto/polvo", "longevidad"]},
-    normalize_text("enoki"): {"original_name": "Enoki", "category_key": "🍄 Setas y hongos", "color": "blanco", "pni_benefits": ["fibra", "vitaminas B", "antioxidantes", "proflamina (potencial antitumoral)"], "tags": ["largas y finas", "crujientes", "cocina asiática", "sopas"]},
-    normalize_text("melena de león"): {"original_name": "Melena de León (Hericium erinaceus)", "category_key": "🍄 Setas y hongos", "color": "blanco", "pni_benefits": ["hericenonas y erinacinas (neuroprotector, estimula NGF)", "salud digestiva", "inmunomodulador"], "tags": ["medicinal", "nootrópico", "salud cerebral", "sabor similar al marisco"]},
-    normalize_text("cordyceps"): {"original_name": "Cordyceps", "category_key": "🍄 Setas y hongos", "color": "naranja/marrón", "pni_benefits": ["cordicepina (energía, antiinflamatorio)", "adenosina", "polisacáridos", "rendimiento físico"], "tags": ["medicinal", "adaptógeno", "energizante", "resistencia"]},
-    normalize_text("trufa"): {"original_name": "Trufa (negra, blanca)", "category_key": "🍄 Setas y hongos", "color": "negro/blanco/marrón", "pni_benefits": ["antioxidantes", "compuestos fenólicos", "fibra", "minerales (pequeñas cantidades)"], "tags": ["gourmet", "aroma intenso", "condimento caro", "afrodisíaco (popular)"]},
-
-    # Hierbas y especias
-    normalize_text("cúrcuma"): {"original_name": "Cúrcuma", "category_key": "🌿 Hierbas y especias", "color": "naranja", "pni_benefits": ["curcumina (potente antiinflamatorio)", "antioxidante", "mejora función endotelial"], "tags": ["especia", "con pimienta negra (para absorción)", "antiinflamatorio", "dorada"]},
-    normalize_text("jengibre"): {"original_name": "Jengibre", "category_key": "🌿 Hierbas y especias", "color": "amarillo claro (interior)", "pni_benefits": ["gingerol (antiinflamatorio, antioxidante)", "antinauseas", "mejora digestión", "termogénico"], "tags": ["raiz", "especia", "picante", "digestivo"]},
-    normalize_text("perejil"): {"original_name": "Perejil", "category_key": "🌿 Hierbas y especias", "color": "verde", "pni_benefits": ["vitamina K", "vitamina C", "apiol", "miristicina", "apigenina (flavonoide)"], "tags": ["hierba fresca", "decoración", "diurético suave"]},
-    normalize_text("cilantro"): {"original_name": "Cilantro (hojas y semillas)", "category_key": "🌿 Hierbas y especias", "color": "verde (hojas), marrón (semillas)", "pni_benefits": ["antioxidantes (hojas)", "quelante suave de metales pesados (hojas)", "digestivo (semillas)", "linalol"], "tags": ["hierba fresca", "especia (semilla)", "sabor distintivo (amor/odio)"]},
-    normalize_text("canela"): {"original_name": "Canela (Cassia y Ceylan)", "category_key": "🌿 Hierbas y especias", "color": "marrón", "pni_benefits": ["cinamaldehído (antioxidante, antimicrobiano)", "regulación glucosa", "antiinflamatorio"], "tags": ["especia", "ceylan mejor (menos cumarina)", "dulce", "postres"]},
-    normalize_text("orégano"): {"original_name": "Orégano", "category_key": "🌿 Hierbas y especias", "color": "verde", "pni_benefits": ["carvacrol y timol (potentes antimicrobianos)", "antioxidantes", "antiinflamatorio"], "tags": ["hierba", "especia", "cocina mediterránea", "antimicrobiano"]},
-    normalize_text("albahaca"): {"original_name": "Albahaca", "category_key": "🌿 Hierbas y especias", "color": "verde", "pni_benefits": ["eugenol (antiinflamatorio)", "linalol", "flavonoides", "adaptógeno (albahaca sagrada/tulsi)"], "tags": ["hierba fresca", "aromática", "cocina italiana", "pesto"]},
-    normalize_text("menta"): {"original_name": "Menta / Hierbabuena", "category_key": "🌿 Hierbas y especias", "color": "verde", "pni_benefits": ["mentol (descongestionante, digestivo)", "ácido rosmarínico", "antiespasmódico", "refrescante"], "tags": ["hierba fresca", "digestiva", "aromática", "infusiones"]},
-    normalize_text("romero"): {"original_name": "Romero", "category_key": "🌿 Hierbas y especias", "color": "verde", "pni_benefits": ["ácido carnósico y carnosol (antioxidante, neuroprotector)", "mejora memoria (aroma)", "antiinflamatorio"], "tags": ["hierba", "aromática", "cocina mediterránea", "memoria"]},
-    normalize_text("tomillo"): {"original_name": "Tomillo", "category_key": "🌿 Hierbas y especias", "color": "verde", "pni_benefits": ["timol (antiséptico, antioxidante)", "expectorante", "antimicrobiano"], "tags": ["hierba", "aromática", "cocina mediterránea", "respiratorio"]},
-    normalize_text("salvia"): {"original_name": "Salvia", "category_key": "🌿 Hierbas y especias", "color": "verde grisáceo", "pni_benefits": ["ácido rosmarínico", "tuyona (con moderación)", "mejora función cognitiva", "antiinflamatorio", "menopausia (alivio sofocos)"], "tags": ["hierba", "aromática", "memoria", "propiedades medicinales"]},
-    normalize_text("cayena"): {"original_name": "Cayena (Pimienta de Cayena)", "category_key": "🌿 Hierbas y especias", "color": "rojo", "pni_benefits": ["capsaicina (antiinflamatorio, analgésico, termogénico)", "vitamina C", "antioxidantes"], "tags": ["especia", "picante", "metabolismo", "dolor"]},
-    normalize_text("pimienta negra"): {"original_name": "Pimienta Negra", "category_key": "🌿 Hierbas y especias", "color": "negro", "pni_benefits": ["piperina (mejora absorción nutrientes, ej. curcumina)", "antioxidante", "antiinflamatorio"], "tags": ["especia", "digestiva", "potenciador de absorción"]},
-    normalize_text("clavo"): {"original_name": "Clavo (de olor)", "category_key": "🌿 Hierbas y especias", "color": "marrón oscuro", "pni_benefits": ["eugenol (muy alto, potente antioxidante, analgésico, antiséptico)", "antiinflamatorio"], "tags": ["especia", "aromático", "analgésico dental", "antioxidante potente"]},
-    normalize_text("nuez moscada"): {"original_name": "Nuez Moscada", "category_key": "🌿 Hierbas y especias", "color": "marrón", "pni_benefits": ["miristicina y elemicina (estimulantes en altas dosis, tóxicas)", "antiinflamatorio", "digestivo (con moderación)"], "tags": ["especia", "aromática", "usar con moderación", "postres/bechamel"]},
-    normalize_text("comino"): {"original_name": "Comino", "category_key": "🌿 Hierbas y especias", "color": "marrón claro", "pni_benefits": ["cuminaldehído", "hierro", "digestivo", "carminativo"], "tags": ["especia", "aromático", "cocina india/mexicana/medio oriente", "digestivo"]},
-    normalize_text("hinojo (semillas)"): {"original_name": "Hinojo (semillas)", "category_key": "🌿 Hierbas y especias", "color": "verde/marrón claro", "pni_benefits": ["anetol (digestivo, carminativo)", "fibra", "antiespasmódico"], "tags": ["especia", "digestiva", "sabor anisado", "infusiones"]},
-    normalize_text("cardamomo"): {"original_name": "Cardamomo", "category_key": "🌿 Hierbas y especias", "color": "verde/negro (vainas)", "pni_benefits": ["cineol (expectorante)", "antioxidantes", "digestivo", "diurético suave"], "tags": ["especia", "aromático", "cocina india/escandinava", "caro"]},
-    normalize_text("anís estrellado"): {"original_name": "Anís Estrellado", "category_key": "🌿 Hierbas y especias", "color": "marrón", "pni_benefits": ["anetol", "ácido shikímico (base para Tamiflu)", "antiviral", "digestivo"], "tags": ["especia", "aromático", "forma de estrella", "cocina asiática", "infusiones"]},
-    normalize_text("azafrán"): {"original_name": "Azafrán", "category_key": "🌿 Hierbas y especias", "color": "rojo (estigmas)", "pni_benefits": ["crocina y crocetina (antioxidantes, antidepresivo leve)", "safranal (aroma, antidepresivo leve)", "antiinflamatorio"], "tags": ["especia", "colorante", "aromático", "caro", "estado de ánimo"]},
-    normalize_text("laurel"): {"original_name": "Laurel (hoja)", "category_key": "🌿 Hierbas y especias", "color": "verde", "pni_benefits": ["eugenol", "cineol", "digestivo", "antiinflamatorio"], "tags": ["hierba", "aromática", "cocina mediterránea", "guisos"]},
-    normalize_text("levadura nutricional"): {"original_name": "Levadura Nutricional", "category_key": "🌿 Hierbas y especias", "color": "amarillo (escamas/polvo)", "pni_benefits": ["vitaminas B (a menudo fortificada con B12)", "proteína completa (inactiva)", "betaglucanos"], "tags": ["condimento", "sabor a queso (umami)", "vegana", "rica en B12 (si fortificada)"]},
-
-    # Alimentos de origen animal
-    normalize_text("pollo"): {"original_name": "Pollo (de pasto/ecológico)", "category_key": "🥩 Carnes", "color": "blanco/amarillento", "pni_benefits": ["proteína magra de alta calidad", "vitamina B6", "niacina", "selenio"], "tags": ["ave", "versátil", "fuente de proteína"]},
-    normalize_text("salmón"): {"original_name": "Salmón (salvaje)", "category_key": "🐟 Pescados (blancos y azules)", "color": "rosado/rojo", "pni_benefits": ["omega-3 (EPA/DHA)", "vitamina D", "proteína de alta calidad", "astaxantina (antioxidante)"], "tags": ["pescado azul", "antiinflamatorio", "salud cardiovascular", "cerebro"]},
-    normalize_text("huevo"): {"original_name": "Huevo (campero/ecológico)", "category_key": "🥚 Huevos y derivados", "color": "varios (cáscara), amarillo/naranja (yema)", "pni_benefits": ["proteína completa", "colina (salud cerebral)", "vitamina D", "luteína", "zeaxantina"], "tags": ["versátil", "rico en nutrientes", "desayuno"]},
-    normalize_text("ternera de pasto"): {"original_name": "Ternera de Pasto", "category_key": "🥩 Carnes", "color": "rojo", "pni_benefits": ["proteína de alta calidad", "hierro hemo", "zinc", "vitamina B12", "mejor perfil omega-3/omega-6"], "tags": ["carne roja", "rica en hierro", "omega-3 (si de pasto)"]},
-    normalize_text("cordero"): {"original_name": "Cordero (de pasto)", "category_key": "🥩 Carnes", "color": "rojo claro", "pni_benefits": ["proteína", "hierro hemo", "zinc", "vitamina B12", "ácido linoleico conjugado (CLA)"], "tags": ["carne roja", "sabor distintivo"]},
-    normalize_text("sardina"): {"original_name": "Sardina", "category_key": "🐟 Pescados (blancos y azules)", "color": "plateado", "pni_benefits": ["omega-3 (EPA/DHA)", "calcio (con espinas)", "vitamina D", "proteína"], "tags": ["pescado azul", "económico", "rico en calcio", "sostenible"]},
-    normalize_text("caballa"): {"original_name": "Caballa (Verdel)", "category_key": "🐟 Pescados (blancos y azules)", "color": "plateado/azulado", "pni_benefits": ["omega-3 (EPA/DHA)", "vitamina D", "proteína", "selenio"], "tags": ["pescado azul", "sabor intenso", "antiinflamatorio"]},
-    normalize_text("anchoa"): {"original_name": "Anchoa / Boquerón", "category_key": "🐟 Pescados (blancos y azules)", "color": "plateado", "pni_benefits": ["omega-3 (EPA/DHA)", "proteína", "calcio", "vitamina D"], "tags": ["pescado azul", "sabor intenso", "salud ósea"]},
-    normalize_text("bacalao"): {"original_name": "Bacalao", "category_key": "🐟 Pescados (blancos y azules)", "color": "blanco", "pni_benefits": ["proteína magra", "vitamina B12", "selenio", "fósforo"], "tags": ["pescado blanco", "versátil", "bajo en grasa"]},
-    normalize_text("merluza"): {"original_name": "Merluza", "category_key": "🐟 Pescados (blancos y azules)", "color": "blanco", "pni_benefits": ["proteína magra", "vitaminas B", "potasio", "fósforo"], "tags": ["pescado blanco", "sabor suave", "popular"]},
-    normalize_text("hígado de ternera"): {"original_name": "Hígado de Ternera (de pasto)", "category_key": "🧠 Vísceras y casquería", "color": "marrón rojizo", "pni_benefits": ["vitamina A (retinol, muy alta)", "hierro hemo (muy alta)", "vitamina B12", "cobre", "colina"], "tags": ["vísceras", "superalimento nutricional", "consumir con moderación"]},
-    normalize_text("corazón de ternera"): {"original_name": "Corazón de Ternera (de pasto)", "category_key": "🧠 Vísceras y casquería", "color": "rojo oscuro", "pni_benefits": ["CoQ10", "proteína", "vitaminas B", "hierro", "selenio"], "tags": ["vísceras", "músculo", "salud cardiovascular", "CoQ10"]},
-    normalize_text("mejillón"): {"original_name": "Mejillón", "category_key": "🦐 Mariscos y crustáceos", "color": "negro (concha), naranja/amarillo (carne)", "pni_benefits": ["hierro", "selenio", "vitamina B12", "omega-3", "glucosamina"], "tags": ["marisco", "bivalvo", "rico en hierro", "sostenible"]},
-    normalize_text("gamba"): {"original_name": "Gamba / Langostino", "category_key": "🦐 Mariscos y crustáceos", "color": "rosado/gris", "pni_benefits": ["proteína magra", "selenio", "astaxantina", "vitamina B12"], "tags": ["marisco", "crustáceo", "versátil"]},
-    normalize_text("pulpo"): {"original_name": "Pulpo", "category_key": "🦐 Mariscos y crustáceos", "color": "marrón/morado (crudo), blanco/rosado (cocido)", "pni_benefits": ["proteína", "hierro", "vitamina B12", "taurina"], "tags": ["marisco", "cefalópodo", "inteligente", "textura firme"]},
-
-    # Probióticos y fermentados
-    normalize_text("yogur natural"): {"original_name": "Yogur Natural (sin azúcar, cultivos vivos)", "category_key": "🦠 PROBIÓTICOS", "category_key_alt": "🧀 Lácteos", "color": "blanco", "pni_benefits": ["probióticos (Lactobacillus, Bifidobacterium)", "calcio", "proteína", "vitamina B12"], "tags": ["fermentado", "lácteo", "salud intestinal"]},
-    normalize_text("kefir de leche"): {"original_name": "Kefir de Leche", "category_key": "🦠 PROBIÓTICOS", "category_key_alt": "🧀 Lácteos", "color": "blanco", "pni_benefits": ["probióticos (mayor diversidad, levaduras)", "calcio", "vitaminas B", "kefiran"], "tags": ["fermentado", "lácteo", "potente probiótico"]},
-    normalize_text("chucrut"): {"original_name": "Chucrut (no pasteurizado)", "category_key": "🦠 PROBIÓTICOS", "color": "verde claro/blanco", "pni_benefits": ["probióticos (Lactobacillus spp.)", "vitamina C", "fibra", "glucosinolatos"], "tags": ["fermentado", "repollo", "salud intestinal", "vitamina K2"]},
-    normalize_text("kimchi"): {"original_name": "Kimchi (no pasteurizado)", "category_key": "🦠 PROBIÓTICOS", "color": "rojo/naranja", "pni_benefits": ["probióticos (Lactobacillus spp.)", "fibra", "capsaicina", "ajo", "jengibre"], "tags": ["fermentado", "picante", "coreano", "verduras"]},
-    normalize_text("miso"): {"original_name": "Miso (no pasteurizado)", "category_key": "🦠 PROBIÓTICOS", "color": "varios", "pni_benefits": ["probióticos (Aspergillus oryzae)", "isoflavonas", "enzimas digestivas", "vitamina K"], "tags": ["fermentado", "soja", "japonés", "umami"]},
-    normalize_text("tempeh"): {"original_name": "Tempeh", "category_key": "🦠 PROBIÓTICOS", "color": "blanco-marrón", "pni_benefits": ["probióticos (Rhizopus oligosporus)", "proteína vegetal completa", "fibra", "isoflavonas"], "tags": ["fermentado", "soja", "textura firme"]},
-    normalize_text("kombucha"): {"original_name": "Kombucha (bajo en azúcar)", "category_key": "🦠 PROBIÓTICOS", "color": "varios", "pni_benefits": ["probióticos (SCOBY)", "ácidos orgánicos", "antioxidantes (del té)"], "tags": ["fermentado", "té", "bebida efervescente"]},
-    normalize_text("kefir de agua"): {"original_name": "Kefir de Agua", "category_key": "🦠 PROBIÓTICOS", "color": "translúcido/varía", "pni_benefits": ["probióticos (bacterias y levaduras)", "hidratante"], "tags": ["fermentado", "sin lácteos", "bebida efervescente"]},
-    normalize_text("vinagre de manzana sin pasteurizar"): {"original_name": "Vinagre de Manzana (con madre)", "category_key": "🦠 PROBIÓTICOS", "color": "ámbar turbio", "pni_benefits": ["ácido acético", "'madre' (bacterias)", "sensibilidad a la insulina (potencial)"], "tags": ["fermentado", "condimento", "no pasteurizado"]},
-    normalize_text("encurtidos lactofermentados"): {"original_name": "Encurtidos Lactofermentados (no pasteurizados)", "category_key": "🦠 PROBIÓTICOS", "color": "varios", "pni_benefits": ["probióticos (Lactobacillus spp.)", "fibra"], "tags": ["fermentado", "verduras", "no pasteurizado"]},
-
-    # PREBIÓTICOS (categoría específica y otros ya listados que son buenos prebióticos)
-    normalize_text("raíz de achicoria"): {"original_name": "Raíz de Achicoria", "category_key": "🌿 PREBIÓTICOS", "color": "marrón", "pni_benefits": ["inulina (alto contenido)", "fibra prebiótica potente"], "tags": ["prebiótico concentrado", "sustituto de café"]},
-    # Ajo, cebolla, puerro, espárrago, plátano (verde), alcachofa, diente de león (raíz), avena, manzana, cebada ya están listados y son prebióticos clave.
-
-    # Lácteos (no principalmente probióticos)
-    normalize_text("queso curado"): {"original_name": "Queso Curado (ej. manchego, parmesano)", "category_key": "🧀 Lácteos", "color": "amarillo/blanco", "pni_benefits": ["calcio", "proteína", "vitamina K2 (algunos)"], "tags": ["lácteo", "fermentado (proceso)", "sabor intenso"]},
-    normalize_text("queso fresco"): {"original_name": "Queso Fresco (ej. cottage, ricotta)", "category_key": "🧀 Lácteos", "color": "blanco", "pni_benefits": ["proteína (caseína)", "calcio"], "tags": ["lácteo", "suave"]},
-    normalize_text("mantequilla ghee"): {"original_name": "Mantequilla Ghee (clarificada)", "category_key": "🧀 Lácteos", "color": "amarillo dorado", "pni_benefits": ["ácido butírico", "vitaminas liposolubles", "sin lactosa/caseína"], "tags": ["grasa láctea", "cocina india", "alto punto de humeo"]},
-    normalize_text("leche de cabra"): {"original_name": "Leche de Cabra", "category_key": "🧀 Lácteos", "color": "blanco", "pni_benefits": ["calcio", "proteína", "fácil digestión para algunos"], "tags": ["lácteo", "alternativa leche de vaca"]},
-    normalize_text("leche de oveja"): {"original_name": "Leche de Oveja", "category_key": "🧀 Lácteos", "color": "blanco", "pni_benefits": ["calcio (alto)", "proteína (alta)"], "tags": ["lácteo", "rica y cremosa"]},
-
-    # Aceites y Grasas Saludables
-    normalize_text("aceite de oliva virgen extra"): {"original_name": "Aceite de Oliva Virgen Extra", "category_key": "🫒 Aceites y grasas saludables", "color": "verde/dorado", "pni_benefits": ["ácido oleico", "polifenoles (oleocantal)", "vitamina E"], "tags": ["grasa saludable", "antiinflamatorio", "dieta mediterránea"]},
-    normalize_text("aceite de coco virgen"): {"original_name": "Aceite de Coco Virgen", "category_key": "🫒 Aceites y grasas saludables", "color": "blanco/transparente", "pni_benefits": ["AGCM/MCTs", "ácido láurico"], "tags": ["grasa saludable", "MCT", "energía rápida"]},
-    normalize_text("aceite de lino"): {"original_name": "Aceite de Lino", "category_key": "🫒 Aceites y grasas saludables", "color": "amarillo dorado", "pni_benefits": ["omega-3 (ALA, muy alto)", "antiinflamatorio"], "tags": ["grasa saludable", "omega-3 vegetal", "no calentar"]},
-    normalize_text("aceituna"): {"original_name": "Aceituna", "category_key": "🫒 Aceites y grasas saludables", "category_key_alt": "🍎 Frutas", "color": "verde/negro/morado", "pni_benefits": ["grasas monoinsaturadas", "vitamina E", "polifenoles"], "tags": ["fruto del olivo", "aperitivo", "grasa saludable"]},
-
-    # Chocolate y Cacao
-    normalize_text("cacao puro en polvo"): {"original_name": "Cacao Puro en Polvo (sin azúcar)", "category_key": "🍫 Chocolate y cacao", "color": "marrón oscuro", "pni_benefits": ["flavonoides (epicatequina)", "magnesio", "hierro", "teobromina"], "tags": ["superfood", "antioxidante", "estado de ánimo"]},
-    normalize_text("chocolate negro"): {"original_name": "Chocolate Negro (>70% cacao)", "category_key": "🍫 Chocolate y cacao", "color": "marrón oscuro", "pni_benefits": ["flavonoides del cacao", "magnesio", "antioxidantes"], "tags": ["placer saludable", "antioxidante", "moderación"]},
-
-    # Sopas y Caldos
-    normalize_text("caldo de huesos"): {"original_name": "Caldo de Huesos", "category_key": "🍲 Sopas y caldos", "color": "variable", "pni_benefits": ["colágeno/gelatina", "aminoácidos (glicina, prolina)", "minerales"], "tags": ["nutritivo", "salud articular", "salud intestinal"]},
-
-    # Bebidas Saludables
-    normalize_text("té verde"): {"original_name": "Té Verde", "category_key": "🍵 Bebidas saludables", "color": "verde/amarillo", "pni_benefits": ["EGCG (antioxidante)", "L-teanina (calma, concentración)"], "tags": ["antioxidante", "salud cerebral", "metabolismo"]},
-    normalize_text("matcha"): {"original_name": "Matcha", "category_key": "🍵 Bebidas saludables", "color": "verde intenso", "pni_benefits": ["EGCG (muy alto)", "L-teanina (muy alta)", "clorofila"], "tags": ["té verde en polvo", "concentrado", "energía calmada"]},
-    normalize_text("té blanco"): {"original_name": "Té Blanco", "category_key": "🍵 Bebidas saludables", "color": "amarillo pálido", "pni_benefits": ["antioxidantes", "menos procesado"], "tags": ["delicado", "antioxidante", "bajo en cafeína"]},
-    normalize_text("rooibos"): {"original_name": "Rooibos (Té rojo sudafricano)", "category_key": "🍵 Bebidas saludables", "color": "rojo/marrón", "pni_benefits": ["aspalatina (antioxidante)", "sin cafeína"], "tags": ["infusión", "sin cafeína", "sabor dulce"]},
-    normalize_text("infusión de jengibre"): {"original_name": "Infusión de Jengibre", "category_key": "🍵 Bebidas saludables", "color": "amarillo pálido", "pni_benefits": ["gingerol", "antinauseas", "antiinflamatorio"], "tags": ["infusión", "sin cafeína", "medicinal"]},
-    normalize_text("infusión de manzanilla"): {"original_name": "Infusión de Manzanilla", "category_key": "🍵 Bebidas saludables", "color": "amarillo claro", "pni_benefits": ["apigenina (calmante)", "antiinflamatorio"], "tags": ["infusión", "sin cafeína", "calmante", "digestiva"]},
-    normalize_text("agua de coco"): {"original_name": "Agua de Coco (natural)", "category_key": "🍵 Bebidas saludables", "color": "translúcido", "pni_benefits": ["electrolitos (potasio)", "hidratante"], "tags": ["hidratación", "natural", "refrescante"]},
-
-    # Algas
-    normalize_text("alga nori"): {"original_name": "Alga Nori", "category_key": "🌊 Algas", "color": "verde oscuro/negro", "pni_benefits": ["yodo", "fibra", "vitaminas"], "tags": ["alga marina", "sushi", "snacks"]},
-    normalize_text("alga kombu"): {"original_name": "Alga Kombu", "category_key": "🌊 Algas", "color": "verde oscuro/negro", "pni_benefits": ["yodo (muy alta)", "ácido glutámico (umami)", "fucoidano"], "tags": ["alga marina", "caldos (dashi)", "ablandar legumbres"]},
-    normalize_text("alga wakame"): {"original_name": "Alga Wakame", "category_key": "🌊 Algas", "color": "verde oscuro", "pni_benefits": ["yodo", "fucoxantina", "calcio"], "tags": ["alga marina", "sopa de miso", "ensaladas"]},
-    normalize_text("alga espirulina"): {"original_name": "Alga Espirulina", "category_key": "🌊 Algas", "color": "verde azulado", "pni_benefits": ["proteína completa", "hierro", "ficocianina"], "tags": ["microalga", "superfood", "proteína vegetal", "detox"]},
-    normalize_text("alga chlorella"): {"original_name": "Alga Chlorella", "category_key": "🌊 Algas", "color": "verde oscuro", "pni_benefits": ["clorofila (muy alta)", "proteína", "CGF (factor crecimiento)"], "tags": ["microalga", "superfood", "detox", "pared celular dura"]},
-}
+# --- Clientes de Google, construidos al primer uso ---
+SCOPE_GSPREAD = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
 
-# Asignar category_key_alt para alimentos con múltiples naturalezas
-if normalize_text("ajo") in food_details_db: food_details_db[normalize_text("ajo")]["category_key_alt"] = "🌿 Hierbas y especias"
-if normalize_text("tomate") in food_details_db: food_details_db[normalize_text("tomate")]["category_key_alt"] = "🍎 Frutas"
-if normalize_text("aguacate") in food_details_db: food_details_db[normalize_text("aguacate")]["category_key_alt"] = "🫒 Aceites y grasas saludables"
-if normalize_text("guisante") in food_details_db: food_details_db[normalize_text("guisante")]["category_key_alt"] = "🫘 Legumbres"
-if normalize_text("judía verde") in food_details_db: food_details_db[normalize_text("judía verde")]["category_key_alt"] = "🫘 Legumbres"
-if normalize_text("habas") in food_details_db: food_details_db[normalize_text("habas")]["category_key_alt"] = "🫘 Legumbres"
-if normalize_text("edamame") in food_details_db: food_details_db[normalize_text("edamame")]["category_key_alt"] = "🥦 Verduras y hortalizas"
-
-all_selectable_food_items_original_case = sorted(list(set([data["original_name"] for data in food_details_db.values()])))
-plant_food_items_original_case = set()
-normalized_plant_food_items = set()
-normalized_to_original_food_map = {}
-probiotic_foods_original_case = set()
-normalized_probiotic_foods = set()
-prebiotic_foods_original_case = set()
-normalized_prebiotic_foods = set()
-
-for norm_name, data in food_details_db.items():
-    normalized_to_original_food_map[norm_name] = data["original_name"]
-    if data.get("category_key") in PLANT_CATEGORIES_KEYS:
-        plant_food_items_original_case.add(data["original_name"])
-        normalized_plant_food_items.add(norm_name)
-    if data.get("category_key") == "🦠 PROBIÓTICOS":
-        probiotic_foods_original_case.add(data["original_name"])
-        normalized_probiotic_foods.add(norm_name)
-    # Definición de prebióticos
-    is_prebiotic_category = data.get("category_key") == "🌿 PREBIÓTICOS"
-    has_prebiotic_benefit = "prebiótico" in " ".join(data.get("pni_benefits", [])).lower()
-    has_prebiotic_tag = "prebiótico" in " ".join(data.get("tags", [])).lower()
-    is_explicit_prebiotic = norm_name in [normalize_text("ajo"), normalize_text("cebolla"), normalize_text("puerro"), normalize_text("alcachofa"), normalize_text("espárrago"), normalize_text("plátano"), normalize_text("avena"), normalize_text("raíz de achicoria"), normalize_text("cebada"), normalize_text("diente de león (hojas)"), normalize_text("topinambur")]
-
-    if is_prebiotic_category or has_prebiotic_benefit or has_prebiotic_tag or is_explicit_prebiotic:
-        prebiotic_foods_original_case.add(data["original_name"])
-        normalized_prebiotic_foods.add(norm_name)
-
-food_synonyms_map = {
-    normalize_text("jitomate"): normalize_text("tomate"), normalize_text("aguacate hass"): normalize_text("aguacate"),
-    normalize_text("palta"): normalize_text("aguacate"), normalize_text("plátano canario"): normalize_text("plátano"),
-    normalize_text("banana"): normalize_text("plátano"), normalize_text("brocoli"): normalize_text("brócoli"),
-    normalize_text("broccoli"): normalize_text("brócoli"), normalize_text("col china"): normalize_text("pak choi"),
-    normalize_text("esparragos"): normalize_text("espárrago"), normalize_text("champinon"): normalize_text("champiñón"),
-    normalize_text("champinones"): normalize_text("champiñón"), normalize_text("semillas de chia"): normalize_text("semilla de chía"),
-    normalize_text("semillas de lino"): normalize_text("semilla de lino"), normalize_text("linaza"): normalize_text("semilla de lino"),
-    normalize_text("pipas de calabaza"): normalize_text("pipa de calabaza"), normalize_text("alubia negra"): normalize_text("judía negra"),
-    normalize_text("frijol negro"): normalize_text("judía negra"), normalize_text("buckwheat"): normalize_text("trigo sarraceno"),
-    normalize_text("alforfon"): normalize_text("trigo sarraceno"), normalize_text("turmeric"): normalize_text("cúrcuma"),
-    normalize_text("jengibre fresco"): normalize_text("jengibre"), normalize_text("ginger"): normalize_text("jengibre"),
-    normalize_text("yogurt natural"): normalize_text("yogur natural"), normalize_text("sauerkraut"): normalize_text("chucrut"),
-    normalize_text("bokchoy"): normalize_text("pak choi"), normalize_text("kale verde"): normalize_text("col rizada"),
-    normalize_text("batata"): normalize_text("boniato"), normalize_text("camote"): normalize_text("boniato"),
-}
+@st.cache_resource
+def _crear_credenciales_gspread():
+    from oauth2client.service_account import ServiceAccountCredentials
+    return ServiceAccountCredentials.from_json_keyfile_dict(creds_info_dict, SCOPE_GSPREAD)
 
-def get_canonical_food_info(input_name):
-    if not input_name: return None, None
-    normalized_input = normalize_text(input_name)
-    canonical_norm_name = food_synonyms_map.get(normalized_input)
-    if not canonical_norm_name:
-        if normalized_input in food_details_db:
-            canonical_norm_name = normalized_input
-        else: return None, None
-    if canonical_norm_name in food_details_db:
-        original_name = food_details_db[canonical_norm_name]["original_name"]
-        return canonical_norm_name, original_name
-    return None, None
+@st.cache_resource
+def _crear_cliente_vision():
+    from google.cloud import vision
+    from google.oauth2 import service_account as google_service_account
+    vision_credentials = google_service_account.Credentials.from_service_account_info(creds_info_dict)
+    return vision.ImageAnnotatorClient(credentials=vision_credentials)
+
+def get_gspread_credentials():
+    if not google_services_available:
+        return None
+    try:
+        return _crear_credenciales_gspread()
+    except Exception as e:
+        st.error(f"No se pudieron crear las credenciales de Google Sheets: {type(e).__name__} - {e}")
+        return None
+
+@st.cache_resource
+def _crear_cliente_vision_falso(latencia, tasa_error):
+    from nutrimind.fakes import FakeVisionClient
+    return FakeVisionClient(latency=latencia, error_rate=tasa_error)
+
+def vision_falso():
+    # secrets.toml: vision_backend = "fake" (con vision_fake_latency y vision_fake_error_rate opcionales)
+    return str(leer_secreto("vision_backend", "google")).lower() == "fake"
+
+def vision_disponible():
+    return google_services_available or vision_falso()
+
+def get_vision_client():
+    if vision_falso():
+        return _crear_cliente_vision_falso(float(leer_secreto("vision_fake_latency", 0.2)), float(leer_secreto("vision_fake_error_rate", 0.0)))
+    if not google_services_available:
+        return None
+    try:
+        return _crear_cliente_vision()
+    except Exception as e:
+        st.error(f"No se pudo inicializar el cliente de Google Vision: {type(e).__name__} - {e}")
+        return None
+
+# --- Conectar al almacenamiento (Google Sheets o SQLite local) ---
+def leer_secreto(clave, default=None):
+    try:
+        return st.secrets[clave]
+    except Exception:
+        return default
+
+@st.cache_resource
+def get_tracer():
+    # Salidas a fichero opcionales, como el panel de depuración: secrets.toml timing_jsonl_path (una línea JSON
+    # por rerun) y timing_prometheus_path (métricas en formato de texto de Prometheus). Sin ellas, solo memoria
+    return Tracer(str(leer_secreto("timing_jsonl_path", "")), str(leer_secreto("timing_prometheus_path", "")))
+
+def tramo(nombre):
+    return get_tracer().span(nombre)
+
+def mostrar_panel_tiempos():
+    # Panel opcional de la barra lateral: tramos de esta página y p50/p95 del proceso
+    if not st.sidebar.toggle("🐞 Tiempos por fase", key="debug_tiempos"):
+        return
+    tracer = get_tracer()
+    rerun = tracer.current_rerun()
+    if rerun is not None and rerun.spans:
+        st.sidebar.dataframe(pd.DataFrame(
+            [{"Fase": "\u2003" * profundidad + nombre, "ms": round(segundos * 1000, 1)}
+             for nombre, profundidad, segundos in rerun.spans if segundos is not None]
+        ), hide_index=True, use_container_width=True)
+    resumen = tracer.summary()
+    if resumen:
+        st.sidebar.caption("Proceso (últimas muestras por fase)")
+        st.sidebar.dataframe(pd.DataFrame(
+            [{"Fase": fase, "n": n, "p50 ms": round(p50, 1), "p95 ms": round(p95, 1)} for fase, (n, p50, p95) in resumen.items()]
+        ), hide_index=True, use_container_width=True)
+
+@st.cache_resource
+def get_sheets_instrumentation():
+    # Contadores de llamadas y cubos de fichas por proceso. secrets.toml: sheets_reads_per_minute, sheets_writes_per_minute
+    return (SheetsUsage(), TokenBucket(float(leer_secreto("sheets_reads_per_minute", 60))),
+            TokenBucket(float(leer_secreto("sheets_writes_per_minute", 60))))
 
-# --- Conectar a Google Sheets ---
 @st.cache_resource(ttl=600)
 def get_sheet_cached(credentials): # Renombrada para reflejar que está cacheada y evitar confusión con cualquier otra get_sheet
     if not google_services_available or credentials is None:
         st.warning("Los servicios de Google (gspread) no están disponibles. No se puede acceder a la hoja de cálculo.")
         return None
+    import gspread
+    uso, lecturas, escrituras = get_sheets_instrumentation()
     try:
+        inicio = time.monotonic()
         client_gspread = gspread.authorize(credentials)
-        return client_gspread.open("habitos_microbiota").sheet1
+        hoja = client_gspread.open("habitos_microbiota").sheet1 # Autorizar y abrir también cuentan (cada 600 s)
+        uso.record("open", 0, time.monotonic() - inicio)
+        return InstrumentedWorksheet(hoja, uso, lecturas, escrituras)
     except gspread.exceptions.SpreadsheetNotFound:
         email_cuenta_servicio = "EMAIL_NO_ENCONTRADO"
         if creds_info_dict and 'client_email' in creds_info_dict: # creds_info_dict debe estar disponible
@@ -400,20 +179,176 @@ def get_sheet_cached(credentials): # Renombrada para reflejar que está cacheada
         st.error(f"No se pudo conectar a Google Sheets: {type(e).__name__} - {e}")
         return None
 
-EXPECTED_HEADERS = ["usuario", "fecha", "comida_original", "comida_normalizada_canonica", "sueno", "ejercicio", "animo", "diversidad_diaria_plantas", "tipo_registro"]
+@st.cache_resource
+def get_sqlite_backend_cached(path):
+    return SQLiteBackend(path)
+
+@st.cache_resource
+def get_fake_sheet_cached(usuarios, dias, latencia):
+    # Hoja en memoria compartida por el proceso (pruebas de carga: benchmarks/load_test.py), con datos sintéticos
+    # de `usuarios` × `dias` que terminan hoy. Pasa por la misma instrumentación y cuota que la hoja real
+    from nutrimind.fakes import FakeWorksheet
+    from nutrimind.synthetic import synthetic_rows
+    filas = synthetic_rows(usuarios, dias, start=datetime.now().date() - timedelta(days=dias - 1)) if usuarios and dias else []
+    uso, lecturas, escrituras = get_sheets_instrumentation()
+    return InstrumentedWorksheet(FakeWorksheet([EXPECTED_HEADERS, *filas], latency=latencia), uso, lecturas, escrituras)
+
+@st.cache_resource
+def get_write_behind_cached(clave_backend, _backend):
+    # Una única cola de escritura por proceso y backend, compartida por todas las sesiones
+    return WriteBehindStorage(_backend)
+
+def abrir_backend_base():
+    # secrets.toml: storage_backend = "sqlite" (con sqlite_path opcional), "gsheets" (por defecto) o "fake"
+    # (hoja en memoria; fake_sheet_users, fake_sheet_days y fake_sheet_latency opcionales)
+    tipo_backend = str(leer_secreto("storage_backend", "gsheets")).lower()
+    if tipo_backend == "fake":
+        hoja = get_fake_sheet_cached(int(leer_secreto("fake_sheet_users", 0)), int(leer_secreto("fake_sheet_days", 0)),
+                                     float(leer_secreto("fake_sheet_latency", 0.0)))
+        return "fake:habitos_microbiota", GSheetsBackend(hoja)
+    if tipo_backend == "sqlite":
+        sqlite_path = str(leer_secreto("sqlite_path", "nutrimind.sqlite"))
+        try:
+            return f"sqlite:{sqlite_path}", get_sqlite_backend_cached(sqlite_path)
+        except Exception as e:
+            st.error(f"No se pudo abrir la base de datos SQLite: {type(e).__name__} - {e}")
+            return None, None
+    creds_gspread = get_gspread_credentials()
+    if creds_gspread:
+        sheet_obj = get_sheet_cached(creds_gspread) # Usar la función cacheada y pasar las credenciales
+        if sheet_obj is not None:
+            return "gsheets:habitos_microbiota", GSheetsBackend(sheet_obj)
+    return None, None
+
+def get_storage_backend():
+    clave_backend, backend = abrir_backend_base()
+    if backend is None:
+        return None
+    storage = get_write_behind_cached(clave_backend, backend)
+    storage.backend = backend # El worksheet cacheado se renueva cada 600 s
+    return storage
+
+@st.cache_resource
+def get_aggregates_cached(path, max_age):
+    return WeeklyPlantAggregates(path, max_age=max_age)
+
+def ruta_agregados():
+    # Con backend SQLite los agregados viven en la misma base de datos; con Sheets, en un fichero local
+    tipo_backend = str(leer_secreto("storage_backend", "gsheets")).lower()
+    if tipo_backend == "sqlite":
+        return str(leer_secreto("sqlite_path", "nutrimind.sqlite"))
+    if tipo_backend == "fake": # La hoja en memoria no sobrevive al proceso: sus agregados tampoco
+        return str(leer_secreto("aggregates_path", ":memory:"))
+    return str(leer_secreto("aggregates_path", "nutrimind_agregados.sqlite"))
+
+def antiguedad_maxima_agregados():
+    # secrets.toml: aggregates_max_age (segundos, 0 = sin caducidad). Los agregados y el modelo de ánimo son locales
+    # al proceso: al caducar se recalculan desde el backend y recogen filas de otras réplicas o de import-csv
+    max_age = float(leer_secreto("aggregates_max_age", 600))
+    return max_age if max_age > 0 else None
+
+def get_weekly_aggregates():
+    try:
+        return get_aggregates_cached(ruta_agregados(), antiguedad_maxima_agregados())
+    except Exception as e:
+        st.warning(f"Agregados semanales no disponibles: {type(e).__name__} - {e}")
+        return None
+
+@st.cache_resource
+def get_mood_store_cached(path, max_age):
+    return MoodRegressionStore(path, max_age=max_age)
 
-def check_and_create_headers(sheet_obj):
-    if sheet_obj is None: return
+def get_mood_store():
     try:
-        headers = sheet_obj.row_values(1)
-        if not headers:
-            sheet_obj.append_row(EXPECTED_HEADERS)
+        return get_mood_store_cached(ruta_agregados(), antiguedad_maxima_agregados())
+    except Exception as e:
+        st.warning(f"Modelo de ánimo incremental no disponible: {type(e).__name__} - {e}")
+        return None
+
+def modelo_animo_usuario(user_id, df_user):
+    # Estadísticos XᵀX/Xᵀy del usuario; se materializan una vez con las filas ya leídas
+    store = get_mood_store()
+    if store is not None:
+        modelo = store.get(user_id)
+        return modelo if modelo is not None else store.materialize(user_id, df_user.to_dict("records"))
+    modelo = OnlineLinearRegression()
+    for fila in filter(None, map(mood_row, df_user.to_dict("records"))):
+        modelo.update(*fila)
+    return modelo
+
+@st.cache_resource(max_entries=256)
+def clusters_dias_cached(huella, n_clusters, _features):
+    # KMeans solo se reajusta si cambian los datos (huella) o el número de grupos
+    from sklearn.cluster import KMeans
+    return KMeans(n_clusters=n_clusters, random_state=42, n_init='auto').fit(_features).labels_
+
+@st.cache_resource
+def _cargar_modelo_cohortes(path, mtime):
+    return CohortModel.load(path)
+
+def get_cohort_model():
+    # Cohortes de toda la comunidad (python -m nutrimind fit-cohorts); None si aún no se han entrenado
+    path = str(leer_secreto("cohort_model", "nutrimind_cohortes.joblib"))
+    mtime = model_mtime(path)
+    if mtime is None:
+        return None
+    try:
+        return _cargar_modelo_cohortes(path, mtime)
+    except Exception as e:
+        st.warning(f"Modelo de cohortes no disponible ({path}): {type(e).__name__} - {e}")
+        return None
+
+def plantas_semana_usuario(storage, user_id, fecha_en_semana):
+    semana = iso_week_key(fecha_en_semana)
+    agregados = get_weekly_aggregates()
+    if agregados is not None:
+        return agregados.get_or_build(storage, user_id, semana)
+    # Sin agregados: se calcula directamente desde las filas de la semana
+    food_ids = get_food_ids()
+    inicio = fecha_en_semana - timedelta(days=fecha_en_semana.weekday())
+    registros = storage.get_records(usuario=user_id, desde=inicio, hasta=inicio + timedelta(days=6), tipo_registro="registro_diario")
+    return frozenset(food_ids.plants(union_masks(food_ids.record_mask(r) for r in registros)))
+
+def estado_escritura(resultado):
+    # Los backends directos escriben de forma síncrona; la cola devuelve un PendingWrite
+    return PERSISTED if resultado is None else resultado.status
+
+def si_falla_escritura(resultado, deshacer):
+    # Los agregados locales se actualizan al encolar; si la escritura acaba fallando, deshacer() los invalida
+    if resultado is not None:
+        resultado.add_done_callback(lambda pendiente: deshacer() if pendiente.status == FAILED else None)
+
+def mostrar_estado_ultima_escritura():
+    ultima = st.session_state.get("ultima_escritura")
+    if not ultima:
+        return
+    descripcion, resultado = ultima
+    estado = estado_escritura(resultado)
+    if estado == PERSISTED:
+        st.success(f"✅ {descripcion} guardado.")
+        st.session_state.ultima_escritura = None
+    elif estado == QUEUED:
+        st.info(f"⏳ {descripcion} en cola: se guardará en unos segundos.")
+    elif estado == FAILED:
+        st.error(f"No se pudo guardar {descripcion}: {resultado.error}")
+        st.session_state.ultima_escritura = None
+
+def check_and_create_headers(storage):
+    if storage is None: return
+    try:
+        estado = storage.ensure_headers()
+        if estado == "created":
             st.info(f"Encabezados creados en la hoja: {', '.join(EXPECTED_HEADERS)}")
-        elif headers != EXPECTED_HEADERS:
-            st.warning(f"Encabezados existentes ({headers}) no coinciden con los esperados ({EXPECTED_HEADERS}). Podrían ocurrir errores.")
-    except gspread.exceptions.APIError as e:
-        if 'exceeds grid limits' in str(e).lower() or 'exceeded a limit' in str(e).lower():
+        elif estado == "migrated":
+            st.info("Encabezados actualizados: se añadió la columna 'mascara_alimentos'.")
+        elif estado == "mismatch":
+            st.warning(f"Encabezados existentes no coinciden con los esperados ({EXPECTED_HEADERS}). Podrían ocurrir errores.")
+    except Exception as e:
+        if not is_gspread_error(e, "APIError"):
+            st.error(f"Error al verificar/crear encabezados: {e}")
+        elif 'exceeds grid limits' in str(e).lower() or 'exceeded a limit' in str(e).lower():
             try:
+                sheet_obj = getattr(storage, "backend", storage).worksheet # Hoja real, no la cola de escritura
                 if not sheet_obj.get_all_values():
                     sheet_obj.append_row(EXPECTED_HEADERS)
                     st.info(f"Encabezados creados en hoja vacía (tras APIError): {', '.join(EXPECTED_HEADERS)}")
@@ -421,177 +356,182 @@ def check_and_create_headers(sheet_obj):
                 st.error(f"Error al intentar añadir encabezados tras APIError: {inner_e}")
         else:
             st.error(f"Error de API con Google Sheets al verificar encabezados: {e}")
-    except Exception as e:
-        st.error(f"Error al verificar/crear encabezados en Google Sheets: {e}")
 
-# --- Detección de alimentos con Google Vision AI ---
-def detectar_plantas_google_vision(image_file_content): # Renombrado para claridad (solo devuelve plantas)
-    if vision_client is None:
-        st.warning("El cliente de Google Vision no está inicializado.")
-        return []
+def mostrar_uso_sheets(user_id):
+    # Coste en llamadas a Google Sheets de esta página; solo con el backend de la hoja
+    uso, lecturas, escrituras = get_sheets_instrumentation()
+    if not uso.total.calls:
+        return
+    rerun = uso.current_rerun()
+    with st.sidebar.expander("📡 Uso de Google Sheets"):
+        if rerun is not None:
+            st.markdown(f"**Esta página**: {rerun.calls} llamadas, {rerun.bytes / 1024:.1f} KB, {rerun.seconds * 1000:.0f} ms")
+        por_usuario = uso.snapshot()["per_user"].get(user_id)
+        if por_usuario:
+            st.markdown(f"**{user_id} (proceso)**: {por_usuario['calls']} llamadas, {por_usuario['bytes'] / 1024:.1f} KB")
+        st.caption(f"Total del proceso: {uso.total.calls} llamadas. Fichas disponibles: "
+                   f"{lecturas.available:.0f}/{lecturas.capacity:.0f} lecturas, {escrituras.available:.0f}/{escrituras.capacity:.0f} escrituras por minuto.")
 
-    image = vision.Image(content=image_file_content)
+# --- Detección de alimentos con Google Vision AI ---
+@st.cache_resource
+def get_vision_cache_cached(path, phash_max_distance, max_disk_entries):
+    return DetectionCache(path, phash_max_distance=phash_max_distance, max_disk_entries=max_disk_entries)
+
+def get_vision_cache():
+    # secrets.toml: vision_cache_path, vision_cache_disk_entries (tope de fotos en disco) y, para reconocer fotos
+    # casi iguales, vision_cache_phash_distance (p. ej. 6)
+    path = str(leer_secreto("vision_cache_path", "nutrimind_vision_cache.sqlite"))
+    distancia = leer_secreto("vision_cache_phash_distance", None)
     try:
-        response = vision_client.label_detection(image=image)
-        labels = response.label_annotations
+        return get_vision_cache_cached(path, None if distancia is None else int(distancia),
+                                       int(leer_secreto("vision_cache_disk_entries", DEFAULT_MAX_DISK_ENTRIES)))
     except Exception as e:
-        st.error(f"Excepción al llamar a Google Vision API: {e}")
-        if hasattr(e, 'details'): st.error(f"Detalles del error de API: {e.details()}")
-        return []
+        st.warning(f"Caché de detecciones no disponible: {type(e).__name__} - {e}")
+        return None
+
+@st.cache_resource
+def get_vision_health():
+    # Circuit breaker y métricas de Vision: uno por proceso, compartidos entre sesiones
+    return CircuitBreaker(), VisionMetrics()
+
+def get_vision_labeler():
+    vision_client = get_vision_client()
+    if vision_client is None:
+        return None
+    breaker, metrics = get_vision_health()
+    return VisionLabeler(vision_client, deadline=float(leer_secreto("vision_deadline", 8.0)), breaker=breaker, metrics=metrics)
+
+@st.cache_resource
+def _cargar_detector_local(path):
+    return ColorHistogramDetector.load(path)
+
+def detector_local():
+    # secrets.toml: plant_detector = "local" usa el detector sin red (modelo de python -m nutrimind build-detector)
+    return str(leer_secreto("plant_detector", "google")).lower() == "local"
 
-    if response.error.message:
-        st.error(f"Error devuelto por Google Vision API: {response.error.message}")
+def deteccion_disponible():
+    return detector_local() or vision_disponible()
+
+def get_plant_detector():
+    if detector_local():
+        path = str(leer_secreto("detector_model", "nutrimind_detector.npz"))
+        try:
+            return _cargar_detector_local(path)
+        except Exception as e:
+            st.warning(f"Detector local no disponible ({path}): {type(e).__name__} - {e}")
+            return None
+    labeler = get_vision_labeler()
+    if labeler is None:
+        return None
+    return GoogleVisionDetector(labeler, cache=get_vision_cache())
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def preparar_imagen_cached(raw_bytes):
+    # Se reduce una sola vez por foto (la app se re-ejecuta en cada interacción)
+    return prepare_image(raw_bytes)
+
+def detectar_plantas(imagenes):
+    # Plantas detectadas en todas las fotos, sin duplicados y ordenadas por nombre
+    with tramo("vision.detector"):
+        detector = get_plant_detector()
+    if detector is None:
+        st.warning("El detector de plantas no está inicializado.")
         return []
-    if not labels:
-        st.info("Google Vision API no devolvió ninguna etiqueta para esta imagen.")
+    with tramo("vision.deteccion"):
+        resultados = detector.detect(imagenes)
+    if resultados is None:
+        st.info("Google Vision no está respondiendo; la detección se ha pausado unos segundos. Añade tus plantas en el registro manual.")
         return []
-
-    api_label_to_my_food_map = {
-        normalize_text("summer squash"): normalize_text("calabacín"), normalize_text("zucchini"): normalize_text("calabacín"),
-        normalize_text("courgette"): normalize_text("calabacín"), normalize_text("cucumber"): normalize_text("pepino"),
-        normalize_text("bell pepper"): normalize_text("pimiento rojo"), normalize_text("capsicum"): normalize_text("pimiento rojo"),
-        normalize_text("potato"): normalize_text("patata"), normalize_text("tomato"): normalize_text("tomate"),
-        normalize_text("apple"): normalize_text("manzana"), normalize_text("banana"): normalize_text("plátano"),
-        normalize_text("orange"): normalize_text("naranja"), normalize_text("strawberry"): normalize_text("fresa"),
-        normalize_text("blueberry"): normalize_text("arándano"), normalize_text("broccoli"): normalize_text("brócoli"),
-        normalize_text("spinach"): normalize_text("espinaca"), normalize_text("carrot"): normalize_text("zanahoria"),
-        normalize_text("almond"): normalize_text("almendra"), normalize_text("walnut"): normalize_text("nuez"),
-        normalize_text("lentil"): normalize_text("lenteja"), normalize_text("chickpea"): normalize_text("garbanzo"),
-        normalize_text("oat"): normalize_text("avena"), normalize_text("quinoa"): normalize_text("quinoa"),
-        normalize_text("mushroom"): normalize_text("champiñón"),
-    }
-    posibles_alimentos_detectados_original_case = set()
-    for label in labels:
-        nombre_label_norm_api = normalize_text(label.description)
-        target_norm_name = api_label_to_my_food_map.get(nombre_label_norm_api)
-        if target_norm_name and target_norm_name in food_details_db:
-            original_name = food_details_db[target_norm_name]["original_name"]
-            posibles_alimentos_detectados_original_case.add(original_name)
+    candidatos = []
+    for i, (candidatos_foto, error) in enumerate(resultados):
+        if error is not None:
+            st.error(f"Error al detectar plantas en la foto {i + 1}: {error}")
             continue
-        norm_canonical, original_canonical = get_canonical_food_info(label.description)
-        if norm_canonical and original_canonical:
-            posibles_alimentos_detectados_original_case.add(original_canonical)
-
-    plantas_detectadas_final = sorted([
-        food_name for food_name in list(posibles_alimentos_detectados_original_case)
-        if normalize_text(food_name) in normalized_plant_food_items # Filtro para devolver solo plantas
-    ])
-
-    if labels and not plantas_detectadas_final:
-        raw_api_labels_for_warning = [l.description for l in labels[:5]]
-        st.warning(f"Vision API devolvió etiquetas (ej: {', '.join(raw_api_labels_for_warning)}), pero ninguna coincidió con plantas de tu lista.")
+        candidatos.extend(candidatos_foto)
+
+    catalogo = get_catalog()
+    plantas_detectadas_final = sorted({
+        c.original_name for c in merge_candidates(candidatos)
+        if c.canonical in catalogo.normalized_plant_food_items # Filtro para devolver solo plantas
+    })
+    if candidatos and not plantas_detectadas_final:
+        st.warning(f"Se detectaron alimentos ({', '.join(c.original_name for c in candidatos[:5])}), pero ninguno es una planta de tu lista.")
     return plantas_detectadas_final
 
 # --- Guardar registro diario ---
-def guardar_registro(sheet_obj, user_id, fecha, seleccionados_original_case, sueno, ejercicio, animo):
-    if sheet_obj is None:
-        st.error("No se puede guardar el registro, la hoja de cálculo no está disponible.")
+def guardar_registro(storage, user_id, fecha, seleccionados_original_case, sueno, ejercicio, animo):
+    food_ids = get_food_ids()
+    if storage is None:
+        st.error("No se puede guardar el registro, el almacenamiento no está disponible.")
         return
     fecha_str = fecha.strftime('%Y-%m-%d')
-    plantas_dia_normalizadas_canonicas = set()
-    todos_alimentos_dia_normalizados_canonicos = set()
-    nombres_originales_para_guardar = []
-
-    for item_original_seleccionado in seleccionados_original_case:
-        norm_canonical, original_canonical = get_canonical_food_info(item_original_seleccionado)
-        if norm_canonical and original_canonical:
-            nombres_originales_para_guardar.append(original_canonical)
-            todos_alimentos_dia_normalizados_canonicos.add(norm_canonical)
-            if norm_canonical in normalized_plant_food_items:
-                plantas_dia_normalizadas_canonicas.add(norm_canonical)
-        else:
-            nombres_originales_para_guardar.append(item_original_seleccionado) # Guardar tal cual si no reconocido
-            st.warning(f"Alimento '{item_original_seleccionado}' no reconocido, se guardará pero no contará para diversidad de plantas.")
-
-    diversidad_diaria_plantas = len(plantas_dia_normalizadas_canonicas)
-    comida_original_str = ", ".join(sorted(list(set(nombres_originales_para_guardar))))
-    comida_normalizada_str = ", ".join(sorted(list(todos_alimentos_dia_normalizados_canonicos)))
+    # Misma canonización que la importación masiva (python -m nutrimind import-csv)
+    comida_original_str, comida_normalizada_str, mascara_dia, no_reconocidos = canonicalize_foods(seleccionados_original_case)
+    for item_no_reconocido in no_reconocidos: # Se guardan tal cual
+        candidatos = get_food_search_index().search(item_no_reconocido, limit=3)
+        sugerencia = f" ¿Quizás: {', '.join(c.original_name for c in candidatos)}?" if candidatos else ""
+        st.warning(f"Alimento '{item_no_reconocido}' no reconocido, se guardará pero no contará para diversidad de plantas.{sugerencia}")
+    diversidad_diaria_plantas = food_ids.count_plants(mascara_dia)
 
     try:
-        sheet_obj.append_row([
+        resultado = storage.append_row([
             user_id, fecha_str, comida_original_str, comida_normalizada_str,
-            sueno, ejercicio, animo, diversidad_diaria_plantas, "registro_diario"
+            sueno, ejercicio, animo, diversidad_diaria_plantas, "registro_diario", food_ids.to_column(mascara_dia)
         ])
-        st.success(f"✅ Registro para {user_id} guardado: {diversidad_diaria_plantas} plantas distintas hoy.")
+        agregados = get_weekly_aggregates()
+        if agregados is not None:
+            agregados.add(user_id, fecha, food_ids.plants(mascara_dia))
+            si_falla_escritura(resultado, lambda: agregados.invalidate(user_id, fecha))
+        modelos_animo = get_mood_store()
+        if modelos_animo is not None:
+            modelos_animo.add(user_id, {"tipo_registro": "registro_diario", "sueno": sueno, "animo": animo,
+                                        "diversidad_diaria_plantas": diversidad_diaria_plantas})
+            si_falla_escritura(resultado, lambda: modelos_animo.invalidate(user_id))
+        st.session_state.ultima_escritura = (f"Registro de {user_id} del {fecha_str} ({diversidad_diaria_plantas} plantas distintas)", resultado)
+        if estado_escritura(resultado) == PERSISTED:
+            st.success(f"✅ Registro para {user_id} guardado: {diversidad_diaria_plantas} plantas distintas hoy.")
+        else:
+            st.info(f"⏳ Registro para {user_id} en cola: {diversidad_diaria_plantas} plantas distintas hoy.")
     except Exception as e:
-        st.error(f"Error al guardar el registro en Google Sheets: {e}")
+        st.error(f"Error al guardar el registro: {e}")
 
 # --- Guardar resumen semanal ---
-def calcular_y_guardar_resumen_semanal_usuario(sheet_obj, user_id, fecha_referencia_lunes):
-    if sheet_obj is None: return
+def calcular_y_guardar_resumen_semanal_usuario(storage, user_id, fecha_referencia_lunes):
+    if storage is None: return
     st.write(f"Calculando resumen semanal para {user_id} para la semana anterior al {fecha_referencia_lunes.strftime('%Y-%m-%d')}")
+    fin_semana_a_resumir = fecha_referencia_lunes - timedelta(days=1)
+    inicio_semana_a_resumir = fin_semana_a_resumir - timedelta(days=6)
+    # Las plantas de la semana salen del agregado materializado; al backend solo se le pregunta si ya hay resumen
     try:
-        all_records_list_of_dict = sheet_obj.get_all_records(expected_headers=EXPECTED_HEADERS)
-    except Exception as e:
-        st.error(f"No se pudieron obtener todos los registros para el resumen semanal: {e}")
-        return
-    if not all_records_list_of_dict:
-        st.warning("La hoja está vacía, no se puede generar resumen semanal.")
-        return
-
-    df = pd.DataFrame(all_records_list_of_dict)
-    if "usuario" not in df.columns:
-        st.error("La columna 'usuario' no se encuentra en la hoja. No se puede generar resumen.")
-        return
-        
-    df_user = df[df["usuario"] == user_id].copy()
-    if df_user.empty:
-        st.info(f"No hay registros para {user_id} para generar resumen semanal.")
-        return
-
-    try:
-        df_user["fecha"] = pd.to_datetime(df_user["fecha"], errors='coerce').dt.date
-        df_user.dropna(subset=["fecha"], inplace=True)
+        resumen_existente = storage.get_records(usuario=user_id, desde=fecha_referencia_lunes,
+                                                hasta=fecha_referencia_lunes, tipo_registro="resumen_semanal")
+        plantas_semana_normalizadas_canonicas = plantas_semana_usuario(storage, user_id, fin_semana_a_resumir)
     except Exception as e:
-        st.error(f"Error convirtiendo fechas para el resumen: {e}")
+        st.error(f"No se pudieron obtener los registros para el resumen semanal: {e}")
         return
-            
-    fin_semana_a_resumir = fecha_referencia_lunes - timedelta(days=1)
-    inicio_semana_a_resumir = fin_semana_a_resumir - timedelta(days=6)
 
-    semana_df = df_user[
-        (df_user["fecha"] >= inicio_semana_a_resumir) &
-        (df_user["fecha"] <= fin_semana_a_resumir) &
-        (df_user["tipo_registro"] == "registro_diario")
-    ].copy()
-
-    diversidad_semanal_plantas = 0
-    if semana_df.empty:
-        st.info(f"No hay registros diarios para {user_id} en la semana de {inicio_semana_a_resumir.strftime('%Y-%m-%d')} a {fin_semana_a_resumir.strftime('%Y-%m-%d')}.")
-    else:
-        plantas_semana_normalizadas_canonicas = set()
-        for _, row in semana_df.iterrows():
-            comida_registrada_norm = str(row.get("comida_normalizada_canonica", "")).split(",")
-            for item_norm_canonico in comida_registrada_norm:
-                item_norm_canonico_trimmed = item_norm_canonico.strip()
-                if item_norm_canonico_trimmed and item_norm_canonico_trimmed in normalized_plant_food_items:
-                    plantas_semana_normalizadas_canonicas.add(item_norm_canonico_trimmed)
-        diversidad_semanal_plantas = len(plantas_semana_normalizadas_canonicas)
+    diversidad_semanal_plantas = len(plantas_semana_normalizadas_canonicas)
+    if not diversidad_semanal_plantas:
+        st.info(f"No hay plantas registradas para {user_id} en la semana de {inicio_semana_a_resumir.strftime('%Y-%m-%d')} a {fin_semana_a_resumir.strftime('%Y-%m-%d')}.")
 
     fecha_resumen_str = fecha_referencia_lunes.strftime('%Y-%m-%d')
-    resumen_existente = df_user[
-        (df_user["fecha"] == fecha_referencia_lunes) &
-        (df_user["tipo_registro"] == "resumen_semanal")
-    ]
 
-    if resumen_existente.empty:
+    if not resumen_existente:
         try:
-            sheet_obj.append_row([
-                user_id, fecha_resumen_str, 
-                f"Resumen semana {inicio_semana_a_resumir.strftime('%Y-%m-%d')} - {fin_semana_a_resumir.strftime('%Y-%m-%d')}", 
-                "", "", "", "", diversidad_semanal_plantas, "resumen_semanal"
-            ])
-            st.success(f"📝 Resumen semanal para {user_id} guardado: {diversidad_semanal_plantas} plantas.")
+            resultado = storage.append_row(summary_row(user_id, iso_week_key(fin_semana_a_resumir), diversidad_semanal_plantas))
+            st.session_state.ultima_escritura = (f"Resumen semanal de {user_id} ({diversidad_semanal_plantas} plantas)", resultado)
+            st.success(f"📝 Resumen semanal para {user_id} calculado: {diversidad_semanal_plantas} plantas.")
         except Exception as e:
-            st.error(f"Error al guardar el resumen semanal en Google Sheets: {e}")
+            st.error(f"Error al guardar el resumen semanal: {e}")
     else:
         st.info(f"Ya existe un resumen para {user_id} en la fecha {fecha_resumen_str}.")
 
 # --- Sugerencias Inteligentes ---
 def get_smart_suggestions(plantas_consumidas_norm_canonicas_set, num_sugerencias=5):
-    if not food_details_db or not normalized_plant_food_items:
+    catalogo = get_catalog()
+    if not catalogo.food_details_db or not catalogo.normalized_plant_food_items:
         return ["Error: Base de datos de alimentos no cargada."]
-    plantas_disponibles_norm = normalized_plant_food_items - plantas_consumidas_norm_canonicas_set
+    plantas_disponibles_norm = catalogo.normalized_plant_food_items - plantas_consumidas_norm_canonicas_set
     if not plantas_disponibles_norm: return []
     
     plantas_disponibles_lista_norm = list(plantas_disponibles_norm)
@@ -599,13 +539,47 @@ def get_smart_suggestions(plantas_consumidas_norm_canonicas_set, num_sugerencias
     sugerencias = []
     for norm_name in plantas_disponibles_lista_norm:
         if len(sugerencias) < num_sugerencias:
-            original_name = food_details_db[norm_name]["original_name"]
+            original_name = catalogo.food_details_db[norm_name]["original_name"]
             sugerencias.append(original_name)
         else: break
     return sugerencias
 
 # --- Visualización y análisis ---
-def mostrar_registros_y_analisis(df_user, current_user_id):
+def cargar_registros_usuario(storage, user_id):
+    with tramo("lectura_registros"):
+        registros_usuario = storage.get_records(usuario=user_id)
+    df_user = pd.DataFrame(registros_usuario, columns=EXPECTED_HEADERS)
+    if not df_user.empty:
+        with tramo("dataframe"):
+            df_user["fecha"] = pd.to_datetime(df_user["fecha"], errors='coerce').dt.date
+            df_user.dropna(subset=["fecha"], inplace=True)
+    return df_user
+
+HISTORIAL_SEMANAS_POR_PAGINA = 2
+
+def mostrar_historial_plantas(storage, user_id, primera_fecha):
+    # Solo se leen y procesan las últimas N semanas; "Cargar más" amplía la ventana de semana en semana
+    clave = f"historial_semanas_{user_id}"
+    semanas = st.session_state.setdefault(clave, HISTORIAL_SEMANAS_POR_PAGINA)
+    hoy = datetime.now().date()
+    desde = hoy - timedelta(days=hoy.weekday()) - timedelta(weeks=semanas - 1)
+    registros = storage.get_records(usuario=user_id, desde=desde, tipo_registro="registro_diario")
+    dias = plantas_por_dia(pd.DataFrame(registros, columns=EXPECTED_HEADERS)).iloc[::-1] if registros else None
+    if dias is None or dias.empty:
+        st.info(f"Sin registros desde el {desde.strftime('%Y-%m-%d')}.")
+    else:
+        # Un único bloque de texto para toda la ventana (un elemento por día ralentiza cada rerun)
+        st.markdown("\n\n".join(
+            f"📆 **{dia.fecha.strftime('%Y-%m-%d')}**: {dia.n_plantas} planta(s): {dia.plantas}" if dia.n_plantas
+            else f"📆 **{dia.fecha.strftime('%Y-%m-%d')}**: 0 plantas."
+            for dia in dias.itertuples(index=False)))
+    if primera_fecha is not None and primera_fecha < desde:
+        st.caption(f"Mostrando desde el {desde.strftime('%Y-%m-%d')} (últimas {semanas} semanas).")
+        def cargar_mas():
+            st.session_state[clave] = semanas + HISTORIAL_SEMANAS_POR_PAGINA
+        st.button(f"⬇️ Cargar {HISTORIAL_SEMANAS_POR_PAGINA} semanas más", key=f"cargar_mas_{user_id}", on_click=cargar_mas)
+
+def mostrar_registros_y_analisis(df_user, current_user_id, plantas_semana_actual, storage):
     if df_user.empty:
         st.info(f"Aún no hay registros para el usuario {current_user_id}.")
         return
@@ -615,42 +589,26 @@ def mostrar_registros_y_analisis(df_user, current_user_id):
         st.info(f"Aún no hay registros de tipo 'registro_diario' para {current_user_id} para mostrar detalles.")
         return
             
-    df_display["fecha"] = pd.to_datetime(df_display["fecha"]).dt.date
-    df_display["diversidad_diaria_plantas"] = pd.to_numeric(df_display["diversidad_diaria_plantas"], errors='coerce').fillna(0)
-    df_display["sueno"] = pd.to_numeric(df_display["sueno"], errors='coerce')
-    df_display["animo"] = pd.to_numeric(df_display["animo"], errors='coerce')
+    with tramo("analisis.fechas"):
+        df_display["fecha"] = pd.to_datetime(df_display["fecha"]).dt.date
+        df_display["diversidad_diaria_plantas"] = pd.to_numeric(df_display["diversidad_diaria_plantas"], errors='coerce').fillna(0)
+        df_display["sueno"] = pd.to_numeric(df_display["sueno"], errors='coerce')
+        df_display["animo"] = pd.to_numeric(df_display["animo"], errors='coerce')
 
     st.markdown("---"); st.subheader(f"📅 Tus vegetales únicos por día ({current_user_id})")
-    for fecha_registro, grupo in df_display.sort_values("fecha", ascending=False).groupby("fecha"):
-        plantas_originales_dia = set()
-        for comida_norm_str in grupo["comida_normalizada_canonica"].dropna():
-            items_norm_canonicos = [i.strip() for i in comida_norm_str.split(",") if i.strip()]
-            for item_norm_c in items_norm_canonicos:
-                if item_norm_c in normalized_plant_food_items:
-                    original_name = food_details_db.get(item_norm_c, {}).get("original_name", item_norm_c)
-                    plantas_originales_dia.add(original_name)
-        if plantas_originales_dia:
-            st.markdown(f"📆 **{fecha_registro.strftime('%Y-%m-%d')}**: {len(plantas_originales_dia)} planta(s): {', '.join(sorted(list(plantas_originales_dia)))}")
-        else:
-            st.markdown(f"📆 **{fecha_registro.strftime('%Y-%m-%d')}**: 0 plantas.")
+    with tramo("analisis.historial"):
+        mostrar_historial_plantas(storage, current_user_id, df_display["fecha"].min())
 
     st.markdown("---"); st.subheader(f"🌿 Tu diversidad vegetal esta semana ({current_user_id})")
-    hoy = datetime.now().date()
-    inicio_semana_actual = hoy - timedelta(days=hoy.weekday())
-    df_semana_actual = df_display[df_display["fecha"] >= inicio_semana_actual]
-    plantas_consumidas_semana_actual_norm_canonicas = set()
-    for comida_norm_str in df_semana_actual["comida_normalizada_canonica"].dropna():
-        items_norm_canonicos = [i.strip() for i in comida_norm_str.split(",") if i.strip()]
-        for item_norm_c in items_norm_canonicos:
-            if item_norm_c in normalized_plant_food_items:
-                plantas_consumidas_semana_actual_norm_canonicas.add(item_norm_c)
+    plantas_consumidas_semana_actual_norm_canonicas = set(plantas_semana_actual)
     progreso = len(plantas_consumidas_semana_actual_norm_canonicas)
     st.markdown(f"Esta semana has comido **{progreso} / 30** plantas diferentes.")
     st.progress(min(progreso / 30.0, 1.0))
 
     st.subheader("💡 Sugerencias inteligentes para hoy")
     if progreso < 30:
-        sugerencias_inteligentes = get_smart_suggestions(plantas_consumidas_semana_actual_norm_canonicas)
+        with tramo("analisis.sugerencias"):
+            sugerencias_inteligentes = get_smart_suggestions(plantas_consumidas_semana_actual_norm_canonicas)
         if sugerencias_inteligentes:
             st.markdown("🌟 Prueba algo nuevo: " + ", ".join(sugerencias_inteligentes))
         else:
@@ -659,56 +617,94 @@ def mostrar_registros_y_analisis(df_user, current_user_id):
         st.success("🎉 ¡Felicidades! Ya has alcanzado o superado las 30 plantas distintas esta semana.")
 
     if not df_display.empty:
+        # Librerías pesadas: solo se importan cuando hay datos que graficar o modelar
+        import plotly.express as px
+
+        # Los gráficos reciben datos acotados (nutrimind/charts.py): agrupados, muestreados o en WebGL
         st.subheader("📊 Gráfico: Ánimo vs. Sueño")
-        fig = px.scatter(df_display.dropna(subset=['sueno', 'animo']), x="sueno", y="animo", 
-                           hover_data=["fecha", "comida_original"], title="Relación Ánimo y Sueño")
-        st.plotly_chart(fig, use_container_width=True)
+        with tramo("analisis.grafico_animo"):
+            puntos, agrupados = scatter_points(df_display, "sueno", "animo", hover=["fecha", "comida_original"])
+            fig = px.scatter(puntos, x="sueno", y="animo", size="dias" if agrupados else None,
+                             hover_data=["fecha", "comida_original"], title="Relación Ánimo y Sueño", render_mode=render_mode(len(puntos)))
+            st.plotly_chart(fig, use_container_width=True)
+        if agrupados: st.caption("Los días con el mismo sueño y ánimo se muestran como un punto; su tamaño indica cuántos días son.")
 
         st.subheader("📈 Diversidad de plantas por día")
-        df_plot_line = df_display.sort_values(by="fecha")
-        fig2 = px.line(df_plot_line, x="fecha", y="diversidad_diaria_plantas", title="Evolución de la Diversidad Diaria de Plantas")
-        st.plotly_chart(fig2, use_container_width=True)
+        with tramo("analisis.grafico_diversidad"):
+            df_plot_line, granularidad = line_series(df_display, "fecha", "diversidad_diaria_plantas")
+            fig2 = px.line(df_plot_line, x="fecha", y="diversidad_diaria_plantas", render_mode=render_mode(len(df_plot_line)),
+                           title=f"Evolución de la Diversidad de Plantas ({GRANULARITY_LABELS[granularidad]})")
+            st.plotly_chart(fig2, use_container_width=True)
 
         st.subheader("🤖 Predicción de Ánimo (ML)")
-        df_ml = df_display[['sueno', 'animo', 'diversidad_diaria_plantas']].dropna().copy()
-        if len(df_ml) > 3:
-            X = df_ml[["sueno", "diversidad_diaria_plantas"]]
-            y = df_ml["animo"]
+        with tramo("analisis.modelo_animo"):
             try:
-                model = LinearRegression().fit(X, y)
-                st.markdown(f"Modelo (beta): Sueño: {model.coef_[0]:.2f}, Diversidad: {model.coef_[1]:.2f}, Intercepto: {model.intercept_:.2f}")
-                st.caption("Simplificación. El ánimo depende de muchos factores.")
-            except Exception as e: st.warning(f"No se pudo entrenar el modelo de regresión: {e}")
+                coeficientes = modelo_animo_usuario(current_user_id, df_user).coefficients()
+            except Exception as e:
+                coeficientes = None
+                st.warning(f"No se pudo entrenar el modelo de regresión: {e}")
+        if coeficientes is not None:
+            coef, intercepto = coeficientes
+            st.markdown(f"Modelo (beta): Sueño: {coef[0]:.2f}, Diversidad: {coef[1]:.2f}, Intercepto: {intercepto:.2f}")
+            st.caption("Simplificación. El ánimo depende de muchos factores.")
         else: st.info("No hay suficientes datos (>3 registros con sueño, ánimo y diversidad) para el modelo de ánimo.")
 
         st.subheader("👥 Clusters de Días")
         features_cluster = df_display[["diversidad_diaria_plantas", "sueno", "animo"]].dropna().copy()
-        if len(features_cluster) >= 3:
-            n_clusters_kmeans = min(3, len(features_cluster))
-            if n_clusters_kmeans < 2: n_clusters_kmeans = 2
-            if len(features_cluster) >= n_clusters_kmeans :
+        with tramo("analisis.clusters"):
+            cohortes = get_cohort_model()
+            if cohortes is not None and not features_cluster.empty:
+                # Los días del usuario se asignan a las cohortes compartidas: solo predict, sin entrenar
                 try:
-                    kmeans = KMeans(n_clusters=n_clusters_kmeans, random_state=42, n_init='auto').fit(features_cluster)
                     df_display_clustered = df_display.loc[features_cluster.index].copy()
-                    df_display_clustered['cluster'] = kmeans.labels_.astype(str) # Color como string
-                    fig3 = px.scatter(df_display_clustered.dropna(subset=['cluster']), x="diversidad_diaria_plantas", y="sueno", color="cluster",
-                                      hover_data=["fecha", "animo"], title=f"Clusters de Días ({n_clusters_kmeans} grupos)")
+                    df_display_clustered['cohorte'] = cohortes.predict(features_cluster).astype(str)
+                    orden_cohortes = [str(i) for i in range(cohortes.n_clusters)]
+                    puntos, agrupados = scatter_points(df_display_clustered, "diversidad_diaria_plantas", "sueno", color="cohorte", hover=["fecha", "animo"])
+                    fig3 = px.scatter(puntos, x="diversidad_diaria_plantas", y="sueno", color="cohorte", size="dias" if agrupados else None,
+                                      category_orders={"cohorte": orden_cohortes}, hover_data=["fecha", "animo"], render_mode=render_mode(len(puntos)),
+                                      title=f"Tus días en las cohortes de la comunidad ({cohortes.n_clusters} grupos)")
                     st.plotly_chart(fig3, use_container_width=True)
-                    st.caption("Clusters de días con características similares de diversidad, sueño y ánimo.")
-                except Exception as e: st.warning(f"No se pudo realizar el clustering: {e}")
-            else: st.info("No hay suficientes datos para clustering con el número de clusters deseado.")
-        else: st.info("No hay suficientes datos (>=3 registros con diversidad, sueño y ánimo) para clustering.")
+                    centros = pd.DataFrame(cohortes.centroids(), columns=["Diversidad (plantas)", "Sueño (h)", "Ánimo"]).round(1)
+                    centros.insert(0, "Cohorte", orden_cohortes)
+                    centros["% días comunidad"] = [round(100 * n / max(cohortes.n_rows, 1), 1) for n in cohortes.sizes]
+                    centros["Tus días"] = df_display_clustered['cohorte'].value_counts().reindex(orden_cohortes, fill_value=0).to_list()
+                    st.dataframe(centros, hide_index=True, use_container_width=True)
+                    st.caption(f"Cohortes calculadas con {cohortes.n_rows} días de todos los usuarios ({cohortes.fitted_at}).")
+                except Exception as e: st.warning(f"No se pudo asignar tus días a las cohortes: {e}")
+            elif len(features_cluster) >= 3:
+                n_clusters_kmeans = min(3, len(features_cluster))
+                if n_clusters_kmeans < 2: n_clusters_kmeans = 2
+                if len(features_cluster) >= n_clusters_kmeans :
+                    try:
+                        huella = data_fingerprint(features_cluster, features_cluster.columns)
+                        etiquetas_cluster = clusters_dias_cached(huella, n_clusters_kmeans, features_cluster)
+                        df_display_clustered = df_display.loc[features_cluster.index].copy()
+                        df_display_clustered['cluster'] = etiquetas_cluster.astype(str) # Color como string
+                        puntos, agrupados = scatter_points(df_display_clustered, "diversidad_diaria_plantas", "sueno", color="cluster", hover=["fecha", "animo"])
+                        fig3 = px.scatter(puntos, x="diversidad_diaria_plantas", y="sueno", color="cluster", size="dias" if agrupados else None,
+                                          hover_data=["fecha", "animo"], render_mode=render_mode(len(puntos)), title=f"Clusters de Días ({n_clusters_kmeans} grupos)")
+                        st.plotly_chart(fig3, use_container_width=True)
+                        st.caption("Clusters de días con características similares de diversidad, sueño y ánimo.")
+                    except Exception as e: st.warning(f"No se pudo realizar el clustering: {e}")
+                else: st.info("No hay suficientes datos para clustering con el número de clusters deseado.")
+            else: st.info("No hay suficientes datos (>=3 registros con diversidad, sueño y ánimo) para clustering.")
 
     st.subheader("📤 Exportar tus datos")
     if not df_user.empty:
-        csv_buffer = io.StringIO()
-        df_user.to_csv(csv_buffer, index=False, encoding='utf-8')
-        st.download_button(label="⬇️ Descargar tus datos como CSV", data=csv_buffer.getvalue(),
-                           file_name=f"registro_nutribio_{current_user_id}_{datetime.now().strftime('%Y%m%d')}.csv", mime="text/csv")
+        primera, ultima = df_user["fecha"].min(), df_user["fecha"].max()
+        col_periodo, col_formato = st.columns(2)
+        periodo = col_periodo.date_input("Periodo", value=(primera, ultima), min_value=primera, max_value=ultima, key="export_periodo")
+        formato = col_formato.selectbox("Formato", available_formats(), format_func=lambda f: EXPORT_FORMATS[f][0], key="export_formato")
+        desde, hasta = (periodo[0], periodo[-1]) if isinstance(periodo, (tuple, list)) and periodo else (primera, ultima)
+        # El fichero se genera al pulsar el botón (en otro hilo) y por lotes, no en cada rerun
+        generar = lambda: export_bytes(storage.get_records(usuario=current_user_id, desde=desde, hasta=hasta), formato)
+        st.download_button(label="⬇️ Descargar tus datos", data=generar, mime=EXPORT_FORMATS[formato][1],
+                           file_name=f"registro_nutribio_{current_user_id}_{desde.strftime('%Y%m%d')}_{hasta.strftime('%Y%m%d')}.{formato}")
     else: st.info("No hay datos para exportar.")
 
 # --- Mensajes sobre Prebióticos y Probióticos ---
 def mostrar_mensajes_pre_probioticos(df_user_registros_diarios, current_user_id):
+    catalogo = get_catalog()
     st.markdown("---"); st.subheader("💡 Sabías que...")
     mensajes_generales = [
         "**Probióticos**: microorganismos vivos beneficiosos. Busca yogur natural, kéfir, chucrut o kimchi no pasteurizados!",
@@ -721,28 +717,17 @@ def mostrar_mensajes_pre_probioticos(df_user_registros_diarios, current_user_id)
     st.info(random.choice(mensajes_generales))
 
     if not df_user_registros_diarios.empty:
-        consumo_reciente_pro = False; consumo_reciente_pre = False
-        hoy = datetime.now().date()
-        registros_recientes = df_user_registros_diarios[
-            (pd.to_datetime(df_user_registros_diarios["fecha"]).dt.date >= (hoy - timedelta(days=3))) &
-            (df_user_registros_diarios["tipo_registro"] == "registro_diario")
-        ]
-        alimentos_consumidos_recientemente_norm = set()
-        for _, row in registros_recientes.iterrows():
-            comida_norm_str = str(row.get("comida_normalizada_canonica", "")).split(",")
-            for item_norm in comida_norm_str:
-                alimentos_consumidos_recientemente_norm.add(item_norm.strip())
-        
-        if normalized_probiotic_foods.intersection(alimentos_consumidos_recientemente_norm):
-            consumo_reciente_pro = True
-        if normalized_prebiotic_foods.intersection(alimentos_consumidos_recientemente_norm):
-            consumo_reciente_pre = True
-            
-        if not consumo_reciente_pro and probiotic_foods_original_case:
-            sug_pro = random.sample(list(probiotic_foods_original_case), min(3, len(probiotic_foods_original_case)))
+        with tramo("pre_probioticos.recientes"):
+            presencia = presencia_pre_probioticos(df_user_registros_diarios, hoy=datetime.now().date(), dias=3)
+        consumo_reciente_pro = bool(presencia["probiotico_reciente"].any())
+        consumo_reciente_pre = bool(presencia["prebiotico_reciente"].any())
+
+
+        if not consumo_reciente_pro and catalogo.probiotic_foods_original_case:
+            sug_pro = random.sample(list(catalogo.probiotic_foods_original_case), min(3, len(catalogo.probiotic_foods_original_case)))
             st.warning(f"💡 {current_user_id}, no has registrado probióticos recientemente. Considera: {', '.join(sug_pro)}.")
-        if not consumo_reciente_pre and prebiotic_foods_original_case:
-            sug_pre = random.sample(list(prebiotic_foods_original_case), min(3, len(prebiotic_foods_original_case)))
+        if not consumo_reciente_pre and catalogo.prebiotic_foods_original_case:
+            sug_pre = random.sample(list(catalogo.prebiotic_foods_original_case), min(3, len(catalogo.prebiotic_foods_original_case)))
             st.warning(f"💡 {current_user_id}, ¿unos prebióticos? {', '.join(sug_pre)} son buenas opciones.")
 
 # --- Contenido Educativo ---
@@ -821,31 +806,38 @@ def main():
     st.sidebar.title("Navegación")
     pagina_seleccionada = st.sidebar.radio("Ir a:", ["🎯 Registro y Progreso", "📚 Aprende"], key="nav_main")
 
-    # Inicializar sheet aquí, después de que las credenciales (creds_gspread) se hayan intentado cargar globalmente
-    sheet = None
-    if google_services_available and creds_gspread:
-        sheet = get_sheet_cached(creds_gspread) # Usar la función cacheada y pasar las credenciales
-        if sheet: # Solo verificar encabezados si la hoja se cargó exitosamente
-            check_and_create_headers(sheet)
-        # No mostrar error aquí directamente, se maneja por sección si sheet es None
+    # Las llamadas a Sheets y los tramos de tiempo de este rerun se atribuyen al usuario y la página actuales
+    get_sheets_instrumentation()[0].start_rerun(current_user_id)
+    rerun = get_tracer().current_rerun()
+    if rerun is not None:
+        rerun.user, rerun.page = current_user_id, pagina_seleccionada
+    # Inicializar el almacenamiento aquí, después de que el secreto de Google se haya intentado interpretar globalmente
+    with tramo("almacenamiento"):
+        storage = get_storage_backend()
+        if storage: # Solo verificar encabezados si el backend se cargó exitosamente
+            check_and_create_headers(storage)
+    # No mostrar error aquí directamente, se maneja por sección si storage es None
 
     if pagina_seleccionada == "🎯 Registro y Progreso":
         if not current_user_id:
             st.info("Por favor, ingresa un nombre de usuario en la barra lateral para registrar y ver tu progreso.")
             st.stop()
-        if not sheet:
-            st.error("No se pudo conectar a Google Sheets. El registro y la visualización de datos no están disponibles.")
+        if not storage:
+            st.error("No se pudo conectar al almacenamiento. El registro y la visualización de datos no están disponibles.")
             st.stop()
             
         st.header(f"🎯 Registro y Progreso de {current_user_id}")
+        catalogo = get_catalog() # El catálogo solo se carga en las páginas que lo usan
+        mostrar_estado_ultima_escritura()
         col1, col2 = st.columns(2)
 
         with col1:
             st.subheader(f"📋 Registro diario")
             with st.form("registro_diario_form"):
                 seleccionados_form = st.multiselect("¿Qué comiste hoy? (Puedes escribir para buscar)",
-                                                    options=all_selectable_food_items_original_case,
-                                                    help="Escribe parte del nombre, ej: 'manza' para 'Manzana'.")
+                                                    options=catalogo.all_selectable_food_items_original_case,
+                                                    accept_new_options=True, # Texto libre: se resuelve con el índice de búsqueda al guardar
+                                                    help="Escribe parte del nombre, ej: 'manza' para 'Manzana'. Si no aparece, escríbelo y pulsa Enter.")
                 fecha_registro_form = st.date_input("Fecha del registro", datetime.now().date())
                 sueno_form = st.number_input("¿Horas de sueño?", min_value=0.0, max_value=24.0, step=0.5, value=7.5)
                 ejercicio_form = st.text_input("¿Ejercicio realizado? (ej: Caminar 30 min, Yoga, Pesas)")
@@ -855,20 +847,24 @@ def main():
                     if not seleccionados_form:
                         st.warning("Por favor, selecciona al menos un alimento.")
                     else:
-                        guardar_registro(sheet, current_user_id, fecha_registro_form, seleccionados_form, sueno_form, ejercicio_form, animo_form)
+                        guardar_registro(storage, current_user_id, fecha_registro_form, seleccionados_form, sueno_form, ejercicio_form, animo_form)
                         st.rerun()
         with col2:
             st.subheader("📸 Detección desde foto (Plantas)")
-            if vision_client is None:
+            if not deteccion_disponible():
                 st.warning("Detección por imagen no disponible (cliente de Vision no inicializado).")
+            elif not detector_local() and get_vision_health()[0].state == CircuitBreaker.OPEN:
+                st.info("La detección por imagen está pausada porque Google Vision no responde. Usa el registro manual; se reintentará en unos segundos.")
             else:
-                img_file = st.file_uploader("Sube una foto de tu comida (opcional)", type=["jpg", "jpeg", "png"], key="img_uploader")
-                if img_file:
-                    st.image(img_file, caption="Tu imagen", use_container_width=True)
-                    img_bytes = img_file.getvalue()
-                    if st.button("🔍 Detectar Plantas en Imagen"):
-                        with st.spinner("Detectando plantas..."):
-                            st.session_state.detected_plants_img = detectar_plantas_google_vision(img_bytes)
+                img_files = st.file_uploader("Sube fotos de tus comidas del día (opcional)", type=["jpg", "jpeg", "png"],
+                                             accept_multiple_files=True, key="img_uploader")
+                if img_files:
+                    imagenes = [preparar_imagen_cached(f.getvalue()) for f in img_files]
+                    st.image([i.thumbnail_bytes for i in imagenes], caption=[f.name for f in img_files], width=150)
+                    img_bytes = [i.detect_bytes for i in imagenes] # Fotos reducidas y enderezadas: menos bytes de subida a Vision
+                    if st.button("🔍 Detectar Plantas en Imágenes"):
+                        with st.spinner(f"Detectando plantas en {len(img_bytes)} foto(s)..."):
+                            st.session_state.detected_plants_img = detectar_plantas(img_bytes)
                         if not st.session_state.detected_plants_img:
                             st.warning("🤔 No se detectaron plantas conocidas. Puedes añadirlas manualmente.")
                 
@@ -879,7 +875,7 @@ def main():
                         confirmados_api = st.multiselect("Confirma las plantas detectadas:",
                                                          options=st.session_state.detected_plants_img,
                                                          default=st.session_state.detected_plants_img)
-                        opciones_adicionales = [p for p in plant_food_items_original_case if p not in st.session_state.detected_plants_img]
+                        opciones_adicionales = [p for p in catalogo.plant_food_items_original_case if p not in st.session_state.detected_plants_img]
                         adicionales_manual_img = st.multiselect("Añade otras plantas (no detectadas):", options=opciones_adicionales)
                         
                         todos_seleccionados_img = sorted(list(set(confirmados_api + adicionales_manual_img)))
@@ -894,7 +890,7 @@ def main():
                             if not todos_seleccionados_img:
                                 st.warning("No has seleccionado ninguna planta para guardar.")
                             else:
-                                guardar_registro(sheet, current_user_id, fecha_registro_img, todos_seleccionados_img, sueno_img, ejercicio_img, animo_img)
+                                guardar_registro(storage, current_user_id, fecha_registro_img, todos_seleccionados_img, sueno_img, ejercicio_img, animo_img)
                                 st.session_state.detected_plants_img = [] # Limpiar después de guardar
                                 st.rerun()
         
@@ -903,32 +899,34 @@ def main():
         if st.button(f"🗓️ Calcular/Actualizar Resumen Semanal (para semana pasada)"):
             hoy_calc = datetime.now().date()
             lunes_esta_semana_calc = hoy_calc - timedelta(days=hoy_calc.weekday())
-            calcular_y_guardar_resumen_semanal_usuario(sheet, current_user_id, lunes_esta_semana_calc)
+            calcular_y_guardar_resumen_semanal_usuario(storage, current_user_id, lunes_esta_semana_calc)
             st.rerun()
         try:
-            data_with_headers = sheet.get_all_records(expected_headers=EXPECTED_HEADERS)
-            df_full = pd.DataFrame(data_with_headers)
-            if not df_full.empty and "usuario" in df_full.columns:
-                df_user_specific = df_full[df_full["usuario"] == current_user_id].copy()
-                if not df_user_specific.empty:
-                    df_user_specific["fecha"] = pd.to_datetime(df_user_specific["fecha"], errors='coerce').dt.date
-                    df_user_specific.dropna(subset=["fecha"], inplace=True)
-                    mostrar_registros_y_analisis(df_user_specific, current_user_id)
-                    df_user_registros_tipo_registro = df_user_specific[df_user_specific['tipo_registro'] == 'registro_diario'].copy()
+            df_user_specific = cargar_registros_usuario(storage, current_user_id)
+            if not df_user_specific.empty:
+                with tramo("plantas_semana"):
+                    plantas_semana_actual = plantas_semana_usuario(storage, current_user_id, datetime.now().date())
+                with tramo("analisis"):
+                    mostrar_registros_y_analisis(df_user_specific, current_user_id, plantas_semana_actual, storage)
+                df_user_registros_tipo_registro = df_user_specific[df_user_specific['tipo_registro'] == 'registro_diario'].copy()
+                with tramo("pre_probioticos"):
                     mostrar_mensajes_pre_probioticos(df_user_registros_tipo_registro, current_user_id)
-                else:
-                    st.info(f"No hay datos para '{current_user_id}'. ¡Empieza a añadir tus comidas!")
-            elif df_full.empty:
-                st.info("La hoja de cálculo parece vacía. ¡Empieza a registrar tus comidas!")
             else:
-                st.warning("No se pudieron cargar los datos o la hoja no tiene la columna 'usuario'.")
-        except gspread.exceptions.GSpreadException as e:
-            st.error(f"Error gspread: {e}. Encabezados esperados: {', '.join(EXPECTED_HEADERS)}")
+                st.info(f"No hay datos para '{current_user_id}'. ¡Empieza a añadir tus comidas!")
         except Exception as e:
-            st.warning(f"No se pudieron cargar/procesar datos de Sheets: {type(e).__name__} - {e}")
+            if is_gspread_error(e):
+                st.error(f"Error gspread: {e}. Encabezados esperados: {', '.join(EXPECTED_HEADERS)}")
+            else:
+                st.warning(f"No se pudieron cargar/procesar los datos: {type(e).__name__} - {e}")
 
     elif pagina_seleccionada == "📚 Aprende":
         display_contenido_educativo()
+    mostrar_uso_sheets(current_user_id)
+    mostrar_panel_tiempos()
 
 if __name__ == "__main__":
-    main()
+    get_tracer().start_rerun()
+    try:
+        main()
+    finally: # También tras st.stop() o st.rerun()
+        get_tracer().finish_rerun()
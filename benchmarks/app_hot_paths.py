@@ -0,0 +1,196 @@
+# benchmarks/app_hot_paths.py
+# Tiempos de los caminos calientes de la app con datos sintéticos (nutrimind/synthetic.py) a varias escalas:
+# guardar_registro, calcular_y_guardar_resumen_semanal_usuario, get_smart_suggestions y las fases de datos de un
+# rerun (lectura, DataFrame, plantas de la semana y mostrar_registros_y_analisis con sus tramos analisis.*).
+# El almacenamiento es GSheetsBackend sobre una FakeWorksheet en memoria (o SQLite con --backend sqlite).
+# NutriMind.py se carga sin main() en modo "bare" de Streamlit: los st.* no pintan nada, pero se ejecutan.
+#
+#   python benchmarks/app_hot_paths.py --rows 1000,100000,1000000 --output bench.json
+#   python benchmarks/app_hot_paths.py --rows 1000,100000 --compare bench.json --max-regression 1.25
+import argparse
+import json
+import logging
+import os
+import platform
+import runpy
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "NutriMind.py")
+sys.path.insert(0, ROOT)
+
+from nutrimind.fakes import FakeWorksheet # noqa: E402
+from nutrimind.storage import EXPECTED_HEADERS, GSheetsBackend, SQLiteBackend # noqa: E402
+from nutrimind.synthetic import synthetic_rows, user_name # noqa: E402
+
+ALIMENTOS_REGISTRO = ["Manzana", "Ajo", "Cebolla", "Lenteja", "Espinaca", "Kefir", "Avena", "Nuez"]
+
+
+def load_app():
+    # Módulo de la app sin ejecutar main() (run_name distinto de "__main__")
+    logging.disable(logging.WARNING) # Sin el aviso "missing ScriptRunContext" de cada st.* (streamlit reajusta sus loggers)
+    return runpy.run_path(APP_PATH, run_name="nutrimind_benchmark")
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def medir(funcion, repeticiones):
+    tiempos = []
+    for i in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(i)
+        tiempos.append(time.perf_counter() - inicio)
+    return resumen(tiempos)
+
+
+def resumen(tiempos):
+    return {"first_ms": round(tiempos[0] * 1000, 2), "median_ms": round(statistics.median(tiempos) * 1000, 2),
+            "min_ms": round(min(tiempos) * 1000, 2), "n": len(tiempos)}
+
+
+def abrir_backend(tipo, filas):
+    if tipo == "sqlite":
+        backend = SQLiteBackend(os.path.join(os.getcwd(), "bench.sqlite"))
+        backend.ensure_headers()
+        lote = []
+        for fila in filas:
+            lote.append(fila)
+            if len(lote) == 10000:
+                backend.append_rows(lote)
+                lote = []
+        backend.append_rows(lote)
+        return backend
+    backend = GSheetsBackend(FakeWorksheet([EXPECTED_HEADERS, *filas]))
+    backend.ensure_headers()
+    return backend
+
+
+def bench_scale(app, n_rows, n_days, backend_tipo, repeticiones, seed):
+    n_users = max(1, round(n_rows / n_days))
+    inicio_datos = date.today() - timedelta(days=n_days - 1) # Los datos terminan hoy: la semana actual y el historial tienen filas
+    app["get_aggregates_cached"].clear()
+    app["get_mood_store_cached"].clear()
+    app["clusters_dias_cached"].clear()
+
+    inicio = time.perf_counter()
+    storage = abrir_backend(backend_tipo, synthetic_rows(n_users, n_days, seed=seed, start=inicio_datos))
+    carga_s = time.perf_counter() - inicio
+    usuario = user_name(0)
+    hoy = date.today()
+    lunes = hoy - timedelta(days=hoy.weekday())
+    resultados = {"rows": n_users * n_days, "users": n_users, "days": n_days, "load_s": round(carga_s, 2), "timings": {}}
+    tiempos = resultados["timings"]
+
+    # Primera lectura (recarga completa de la hoja) y lecturas siguientes (solo filas nuevas)
+    tiempos["get_records.cold"] = medir(lambda i: storage.get_records(usuario=usuario), 1)
+    tiempos["get_records.warm"] = medir(lambda i: storage.get_records(usuario=usuario), repeticiones)
+
+    # Fases de datos de un rerun, con los tramos de la propia app (nutrimind/timing.py)
+    tracer = app["get_tracer"]()
+    tramos = {}
+    def rerun(i):
+        rerun_actual = tracer.start_rerun("benchmark", usuario)
+        df_user = app["cargar_registros_usuario"](storage, usuario)
+        with tracer.span("plantas_semana"):
+            plantas = app["plantas_semana_usuario"](storage, usuario, hoy)
+        with tracer.span("analisis"):
+            app["mostrar_registros_y_analisis"](df_user, usuario, plantas, storage)
+        for nombre, _, segundos in rerun_actual.spans:
+            tramos.setdefault(nombre, []).append(segundos)
+    tiempos["rerun.data_phases"] = medir(rerun, repeticiones)
+    for nombre, valores in tramos.items():
+        tiempos[f"rerun.{nombre}"] = resumen(valores)
+
+    plantas_semana = app["plantas_semana_usuario"](storage, usuario, hoy)
+    tiempos["get_smart_suggestions"] = medir(lambda i: app["get_smart_suggestions"](set(plantas_semana)), repeticiones)
+    # Cada repetición guarda un día nuevo y resume una semana distinta (sin resumen previo)
+    tiempos["guardar_registro"] = medir(lambda i: app["guardar_registro"](
+        storage, usuario, hoy + timedelta(days=i + 1), ALIMENTOS_REGISTRO, 7.5, "Caminar 30 min", 4), repeticiones)
+    tiempos["calcular_y_guardar_resumen_semanal_usuario"] = medir(lambda i: app["calcular_y_guardar_resumen_semanal_usuario"](
+        storage, usuario, lunes - timedelta(weeks=i)), repeticiones)
+    if hasattr(storage, "close"):
+        storage.close()
+    return resultados
+
+
+def compare(actual, anterior, max_regression):
+    # Métricas (median_ms) más lentas que max_regression × la ejecución anterior, por número de filas
+    previas = {r["rows"]: r["timings"] for r in anterior["results"]}
+    regresiones = []
+    for r in actual["results"]:
+        for nombre, t in r["timings"].items():
+            base = previas.get(r["rows"], {}).get(nombre)
+            if base and base["median_ms"] > 0 and t["median_ms"] / base["median_ms"] > max_regression:
+                regresiones.append({"rows": r["rows"], "metric": nombre, "before_ms": base["median_ms"],
+                                    "after_ms": t["median_ms"], "ratio": round(t["median_ms"] / base["median_ms"], 2)})
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de los caminos calientes de NutriMind con datos sintéticos.")
+    parser.add_argument("--rows", default="1000,100000,1000000", help="Escalas (filas totales) separadas por comas")
+    parser.add_argument("--days", type=int, default=365, help="Días por usuario; usuarios = filas / días, redondeado")
+    parser.add_argument("--backend", choices=["gsheets", "sqlite"], default="gsheets",
+                        help="gsheets: GSheetsBackend sobre una FakeWorksheet en memoria")
+    parser.add_argument("--repeat", type=int, default=5, help="Repeticiones por medida")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Guarda los resultados en este fichero JSON")
+    parser.add_argument("--compare", help="JSON de una ejecución anterior con el que comparar")
+    parser.add_argument("--max-regression", type=float, default=1.25,
+                        help="Con --compare, falla si una mediana es más de este factor más lenta")
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args(argv)
+
+    escalas = [int(n) for n in args.rows.split(",") if n.strip()]
+    directorio = os.getcwd()
+    rutas = [os.path.abspath(p) if p else None for p in (args.output, args.compare)]
+    app = load_app()
+    informe = {"commit": git_commit(), "created": datetime.now().isoformat(timespec="seconds"),
+               "python": platform.python_version(), "backend": args.backend, "seed": args.seed,
+               "repeat": args.repeat, "results": []}
+    try:
+        for n in escalas:
+            # Agregados, modelos de ánimo y tiempos de cada escala en su propio directorio (las rutas de la app son relativas)
+            with tempfile.TemporaryDirectory(prefix=f"nutrimind_bench_{n}_") as temporal:
+                os.chdir(temporal)
+                informe["results"].append(bench_scale(app, n, min(args.days, n), args.backend, args.repeat, args.seed))
+                os.chdir(directorio)
+    finally:
+        os.chdir(directorio)
+
+    salida, comparar = rutas
+    if salida:
+        with open(salida, "w", encoding="utf-8") as f:
+            json.dump(informe, f, indent=2)
+    regresiones = []
+    if comparar:
+        with open(comparar, encoding="utf-8") as f:
+            regresiones = compare(informe, json.load(f), args.max_regression)
+        informe["regressions"] = regresiones
+
+    if args.json:
+        print(json.dumps(informe, indent=2))
+    else:
+        for r in informe["results"]:
+            print(f"\n{r['rows']} filas ({r['users']} usuarios × {r['days']} días, carga {r['load_s']} s)")
+            print(f"{'mediana ms':>11}  {'primera ms':>10}  medida")
+            for nombre, t in r["timings"].items():
+                print(f"{t['median_ms']:>11.2f}  {t['first_ms']:>10.2f}  {nombre}")
+        for reg in regresiones:
+            print(f"REGRESIÓN {reg['rows']} filas, {reg['metric']}: {reg['before_ms']} -> {reg['after_ms']} ms (×{reg['ratio']})")
+    return 1 if regresiones else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+# benchmarks/charts.py
+# Tamaño del JSON que Streamlit envía al navegador por gráfico, y tiempo de construirlo, con los datos
+# en bruto frente a la capa nutrimind/charts.py, para historiales de distinta longitud (un registro al día).
+#
+#   python benchmarks/charts.py --days 365,3650,36500
+#   python benchmarks/charts.py --json
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nutrimind.charts import line_series, render_mode, scatter_points # noqa: E402
+
+
+def synthetic_history(dias, seed=0):
+    import numpy as np
+    import pandas as pd
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "fecha": pd.date_range("2000-01-01", periods=dias).date,
+        "diversidad_diaria_plantas": rng.poisson(8, dias),
+        "sueno": rng.choice([5, 5.5, 6, 6.5, 7, 7.5, 8, 8.5, 9], dias),
+        "animo": rng.integers(1, 6, dias),
+        "comida_original": "Manzana, Ajo",
+    })
+
+
+def medir(construir):
+    inicio = time.perf_counter()
+    fig = construir()
+    payload = fig.to_json()
+    return {"points": sum(len(t.x) for t in fig.data), "payload_kb": round(len(payload) / 1024, 1),
+            "build_ms": round((time.perf_counter() - inicio) * 1000, 1)}
+
+
+def bench(dias):
+    import plotly.express as px
+    df = synthetic_history(dias)
+    hover = ["fecha", "comida_original"]
+
+    def scatter_capa():
+        puntos, agrupados = scatter_points(df, "sueno", "animo", hover=hover)
+        return px.scatter(puntos, x="sueno", y="animo", size="dias" if agrupados else None, hover_data=hover,
+                          render_mode=render_mode(len(puntos)))
+
+    def line_capa():
+        serie, _ = line_series(df, "fecha", "diversidad_diaria_plantas")
+        return px.line(serie, x="fecha", y="diversidad_diaria_plantas", render_mode=render_mode(len(serie)))
+
+    return {
+        "days": dias,
+        "scatter_raw": medir(lambda: px.scatter(df, x="sueno", y="animo", hover_data=hover)),
+        "scatter": medir(scatter_capa),
+        "line_raw": medir(lambda: px.line(df, x="fecha", y="diversidad_diaria_plantas")),
+        "line": medir(line_capa),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de la capa de datos de los gráficos.")
+    parser.add_argument("--days", default="365,3650,36500", help="Longitudes de historial separadas por comas")
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args(argv)
+
+    informes = [bench(int(d)) for d in args.days.split(",") if d.strip()]
+    if args.json:
+        print(json.dumps(informes, indent=2))
+        return 0
+    print(f"{'días':>7} {'gráfico':<8} {'puntos':>14} {'KB':>16} {'ms':>14}")
+    for r in informes:
+        for nombre in ("scatter", "line"):
+            bruto, capa = r[f"{nombre}_raw"], r[nombre]
+            print(f"{r['days']:>7} {nombre:<8} {bruto['points']:>6} -> {capa['points']:<5} "
+                  f"{bruto['payload_kb']:>7} -> {capa['payload_kb']:<6} {bruto['build_ms']:>6} -> {capa['build_ms']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
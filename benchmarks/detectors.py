@@ -0,0 +1,132 @@
+# benchmarks/detectors.py
+# Compara detectores de plantas (latencia y precisión) sobre una carpeta de fotos etiquetadas:
+# carpeta/<alimento>/*.jpg. El detector local se evalúa dejando cada foto fuera de sus referencias
+# (leave-one-out) salvo que se pase --model; el de Google necesita --credentials.
+#
+#   python benchmarks/detectors.py --images fotos_etiquetadas --detectors local,google --credentials gcp.json
+#   python benchmarks/detectors.py --synthetic --json
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nutrimind.detectors import ColorHistogramDetector, GoogleVisionDetector, embed_image, load_labelled_folder # noqa: E402
+
+# Colores dominantes aproximados para generar un conjunto sintético reproducible
+SYNTHETIC_FOODS = {"tomate": (200, 30, 30), "espinaca": (40, 120, 40), "platano": (230, 210, 60),
+                   "zanahoria": (240, 120, 20), "arandano": (50, 60, 140)}
+
+
+def synthetic_folder(destino, por_alimento=6, seed=0):
+    import numpy as np
+    from PIL import Image
+    rng = np.random.default_rng(seed)
+    for nombre, color in SYNTHETIC_FOODS.items():
+        os.makedirs(os.path.join(destino, nombre), exist_ok=True)
+        for i in range(por_alimento):
+            fondo = rng.integers(180, 255, 3) # Plato o mantel claro
+            pixels = np.tile(fondo, (240, 320, 1)).astype(np.float32)
+            y, x = np.ogrid[:240, :320]
+            cy, cx, r = rng.integers(80, 160), rng.integers(100, 220), rng.integers(50, 90)
+            mascara = (y - cy) ** 2 + (x - cx) ** 2 < r ** 2
+            pixels[mascara] = np.array(color) + rng.normal(0, 20, (mascara.sum(), 3))
+            imagen = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+            imagen.save(os.path.join(destino, nombre, f"{i}.jpg"), quality=85)
+    return destino
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def evaluate(nombre, predecir, ejemplos):
+    # predecir(i, bytes) -> lista de canónicos predichos (de mayor a menor score)
+    latencias, aciertos_top1, correctas, predichas, recuperadas = [], 0, 0, 0, 0
+    for i, (_, img, verdad) in enumerate(ejemplos):
+        inicio = time.perf_counter()
+        prediccion = predecir(i, img)
+        latencias.append(time.perf_counter() - inicio)
+        aciertos_top1 += bool(prediccion) and prediccion[0] == verdad
+        correctas += verdad in prediccion
+        predichas += len(prediccion)
+        recuperadas += verdad in prediccion
+    n = len(ejemplos)
+    return {
+        "detector": nombre,
+        "images": n,
+        "top1_accuracy": round(aciertos_top1 / n, 3),
+        "precision": round(correctas / predichas, 3) if predichas else 0.0,
+        "recall": round(recuperadas / n, 3),
+        "latency_p50_ms": round(percentil(latencias, 50) * 1000, 2),
+        "latency_p95_ms": round(percentil(latencias, 95) * 1000, 2),
+        "latency_mean_ms": round(statistics.mean(latencias) * 1000, 2),
+    }
+
+
+def local_predictor(ejemplos, model_path=None):
+    if model_path:
+        detector = ColorHistogramDetector.load(model_path)
+        return lambda i, img: [c.canonical for c in detector.detect([img])[0][0] or []]
+    # Leave-one-out: todas las fotos son referencias salvo la que se evalúa
+    detector = ColorHistogramDetector.fit([(img, verdad) for _, img, verdad in ejemplos])
+    return lambda i, img: [c.canonical for c in detector.rank(embed_image(img), exclude=i)]
+
+
+def google_predictor(credentials):
+    from google.cloud import vision
+    from nutrimind.vision_labels import VisionLabeler
+    detector = GoogleVisionDetector(VisionLabeler(vision.ImageAnnotatorClient.from_service_account_json(credentials)))
+
+    def predecir(i, img):
+        candidatos, error = detector.detect([img])[0]
+        return [] if error is not None else [c.canonical for c in candidatos]
+    return predecir
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de detectores de plantas.")
+    origen = parser.add_mutually_exclusive_group(required=True)
+    origen.add_argument("--images", help="Carpeta con una subcarpeta por alimento")
+    origen.add_argument("--synthetic", action="store_true", help="Genera un conjunto sintético de fotos de colores")
+    parser.add_argument("--detectors", default="local", help="Lista separada por comas: local, google")
+    parser.add_argument("--model", help="Modelo del detector local (si no, leave-one-out sobre --images)")
+    parser.add_argument("--credentials", help="JSON de cuenta de servicio (detector google)")
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        carpeta = synthetic_folder(tmp) if args.synthetic else args.images
+        ejemplos = load_labelled_folder(carpeta)
+    if not ejemplos:
+        parser.error("No hay fotos etiquetadas (se esperan subcarpetas con nombre de alimento)")
+
+    informes = []
+    for nombre in [d.strip() for d in args.detectors.split(",") if d.strip()]:
+        if nombre == "local":
+            informes.append(evaluate(nombre, local_predictor(ejemplos, args.model), ejemplos))
+        elif nombre == "google":
+            if not args.credentials:
+                parser.error("El detector google necesita --credentials")
+            informes.append(evaluate(nombre, google_predictor(args.credentials), ejemplos))
+        else:
+            parser.error(f"Detector desconocido: {nombre}")
+
+    if args.json:
+        print(json.dumps({"images": len(ejemplos), "foods": len({v for _, _, v in ejemplos}), "results": informes}, indent=2))
+        return 0
+    print(f"{len(ejemplos)} fotos de {len({v for _, _, v in ejemplos})} alimentos")
+    print(f"{'detector':<10} {'top1':>6} {'prec':>6} {'recall':>6} {'p50 ms':>8} {'p95 ms':>8}")
+    for r in informes:
+        print(f"{r['detector']:<10} {r['top1_accuracy']:>6} {r['precision']:>6} {r['recall']:>6} "
+              f"{r['latency_p50_ms']:>8} {r['latency_p95_ms']:>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+# benchmarks/image_prep.py
+# Mide lo que ahorra nutrimind.images.prepare_image sobre un conjunto de fotos: bytes de subida,
+# tiempo de preparación y subida estimada a un ancho de banda dado. Sin --photos se generan fotos
+# sintéticas del tamaño de una cámara de móvil (12 MP). Con --credentials se mide además la latencia
+# real de label_detection con la foto original frente a la preparada.
+#
+#   python benchmarks/image_prep.py --photos ~/fotos_comida --mbps 10
+#   python benchmarks/image_prep.py --synthetic 5 --json
+import argparse
+import glob
+import io
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nutrimind.images import prepare_image # noqa: E402
+
+
+def synthetic_photos(n, size=(4032, 3024), quality=92, seed=0):
+    # Ruido suave sobre degradados: comprime como una foto real, no como un color plano
+    import numpy as np
+    from PIL import Image
+    rng = np.random.default_rng(seed)
+    ancho, alto = size
+    fotos = []
+    for i in range(n):
+        x = np.linspace(0, 255, ancho, dtype=np.float32)[None, :, None]
+        y = np.linspace(0, 255, alto, dtype=np.float32)[:, None, None]
+        base = (x * rng.random(3) + y * rng.random(3)) / 2
+        ruido = rng.normal(0, 18, (alto // 4, ancho // 4, 3)).repeat(4, axis=0).repeat(4, axis=1)
+        pixels = np.clip(base + ruido, 0, 255).astype(np.uint8)
+        buffer = io.BytesIO()
+        Image.fromarray(pixels).save(buffer, format="JPEG", quality=quality)
+        fotos.append((f"sintetica_{i}.jpg", buffer.getvalue()))
+    return fotos
+
+
+def load_photos(directorio):
+    rutas = sorted(p for ext in ("jpg", "jpeg", "png", "JPG", "JPEG", "PNG") for p in glob.glob(os.path.join(directorio, f"*.{ext}")))
+    fotos = []
+    for ruta in rutas:
+        with open(ruta, "rb") as f:
+            fotos.append((os.path.basename(ruta), f.read()))
+    return fotos
+
+
+def vision_latency(client, image_bytes):
+    from google.cloud import vision
+    inicio = time.perf_counter()
+    client.label_detection(image=vision.Image(content=image_bytes))
+    return time.perf_counter() - inicio
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de la preparación de imágenes para Vision.")
+    parser.add_argument("--photos", help="Directorio con fotos de muestra (jpg/png)")
+    parser.add_argument("--synthetic", type=int, default=5, help="Fotos sintéticas si no se indica --photos")
+    parser.add_argument("--mbps", type=float, default=10.0, help="Ancho de banda de subida para estimar la transferencia")
+    parser.add_argument("--credentials", help="JSON de cuenta de servicio para medir label_detection de verdad")
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args(argv)
+
+    fotos = load_photos(args.photos) if args.photos else synthetic_photos(args.synthetic)
+    if not fotos:
+        parser.error("No se encontraron fotos")
+
+    client = None
+    if args.credentials:
+        from google.cloud import vision
+        client = vision.ImageAnnotatorClient.from_service_account_json(args.credentials)
+
+    filas = []
+    for nombre, raw in fotos:
+        inicio = time.perf_counter()
+        preparada = prepare_image(raw)
+        prep_s = time.perf_counter() - inicio
+        fila = {
+            "photo": nombre,
+            "original_bytes": len(raw),
+            "detect_bytes": len(preparada.detect_bytes),
+            "thumbnail_bytes": len(preparada.thumbnail_bytes),
+            "original_size": preparada.original_size,
+            "detect_size": preparada.detect_size,
+            "prepare_ms": round(prep_s * 1000, 1),
+            "upload_ms_original": round(len(raw) * 8 / (args.mbps * 1e6) * 1000, 1),
+            "upload_ms_prepared": round(len(preparada.detect_bytes) * 8 / (args.mbps * 1e6) * 1000, 1),
+        }
+        if client is not None:
+            fila["vision_ms_original"] = round(vision_latency(client, raw) * 1000, 1)
+            fila["vision_ms_prepared"] = round((prep_s + vision_latency(client, preparada.detect_bytes)) * 1000, 1)
+        filas.append(fila)
+
+    total_original = sum(f["original_bytes"] for f in filas)
+    total_preparado = sum(f["detect_bytes"] for f in filas)
+    resumen = {
+        "photos": len(filas),
+        "bytes_original": total_original,
+        "bytes_prepared": total_preparado,
+        "bytes_saved_pct": round(100 * (1 - total_preparado / total_original), 1),
+        "prepare_ms_median": statistics.median(f["prepare_ms"] for f in filas),
+        "upload_ms_saved_median": statistics.median(f["upload_ms_original"] - f["upload_ms_prepared"] for f in filas),
+    }
+    if client is not None:
+        resumen["vision_ms_original_median"] = statistics.median(f["vision_ms_original"] for f in filas)
+        resumen["vision_ms_prepared_median"] = statistics.median(f["vision_ms_prepared"] for f in filas)
+
+    if args.json:
+        print(json.dumps({"summary": resumen, "photos": filas}, indent=2))
+        return 0
+    for f in filas:
+        print(f"{f['photo']}: {f['original_bytes'] / 1e6:.2f} MB {f['original_size']} -> "
+              f"{f['detect_bytes'] / 1e3:.0f} KB {f['detect_size']} en {f['prepare_ms']} ms")
+    print(f"Total: {total_original / 1e6:.2f} MB -> {total_preparado / 1e6:.2f} MB ({resumen['bytes_saved_pct']}% menos)")
+    print(f"Preparación (mediana): {resumen['prepare_ms_median']} ms; "
+          f"subida ahorrada a {args.mbps} Mbps (mediana): {resumen['upload_ms_saved_median']:.0f} ms")
+    if client is not None:
+        print(f"label_detection (mediana): original {resumen['vision_ms_original_median']} ms, "
+              f"preparada {resumen['vision_ms_prepared_median']} ms (incluye preparar)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
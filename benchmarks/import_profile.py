@@ -0,0 +1,97 @@
+# benchmarks/import_profile.py
+# Perfil de importación del arranque de la app con `python -X importtime`.
+# Ejecuta el código de módulo de NutriMind.py (sin main) en un subproceso, ordena los módulos por
+# tiempo acumulado y falla si el arranque supera --max-ms o si se cargan librerías pesadas.
+#
+#   python benchmarks/import_profile.py --top 20
+#   python benchmarks/import_profile.py --json --max-ms 1500
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "NutriMind.py")
+
+# Deben importarse bajo demanda, nunca al arrancar.
+# plotly.express y no plotly: streamlit ya carga parte de plotly por su cuenta (streamlit.elements.plotly_chart)
+HEAVY_MODULES = ("sklearn", "plotly.express", "google.cloud.vision", "gspread", "oauth2client")
+
+# Carga el módulo sin ejecutar main(): run_path con un __name__ distinto de "__main__"
+_RUNNER = (
+    "import runpy, sys; sys.path.insert(0, {root!r}); "
+    "runpy.run_path({app!r}, run_name='nutrimind_import_profile')"
+)
+
+
+def run_importtime(app_path=APP_PATH):
+    cmd = [sys.executable, "-X", "importtime", "-c", _RUNNER.format(root=ROOT, app=app_path)]
+    proceso = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True)
+    if proceso.returncode != 0:
+        errores = [l for l in proceso.stderr.splitlines() if not l.startswith("import time:")]
+        ultimas = "\n".join(errores[-20:])
+        raise RuntimeError(f"La app falló al importarse:\n{ultimas}")
+    return proceso.stderr
+
+
+def parse_importtime(salida):
+    # Líneas "import time:  self [us] | cumulative | imported package"
+    modulos = []
+    for linea in salida.splitlines():
+        if not linea.startswith("import time:"):
+            continue
+        campos = linea[len("import time:"):].split("|")
+        if len(campos) != 3 or not campos[0].strip().isdigit():
+            continue
+        nombre = campos[2].rstrip()
+        modulos.append({
+            "module": nombre.strip(),
+            "depth": (len(nombre) - len(nombre.lstrip())) // 2,
+            "self_us": int(campos[0]),
+            "cumulative_us": int(campos[1]),
+        })
+    return modulos
+
+
+def heavy_imports(modulos):
+    nombres = {m["module"] for m in modulos}
+    return sorted(n for n in nombres if any(n == h or n.startswith(h + ".") for h in HEAVY_MODULES))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Perfil de importación del arranque de NutriMind.")
+    parser.add_argument("--top", type=int, default=25, help="Número de módulos a mostrar")
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    parser.add_argument("--max-ms", type=float, default=None, help="Falla si el tiempo total supera este umbral")
+    args = parser.parse_args(argv)
+
+    modulos = parse_importtime(run_importtime())
+    # El tiempo total es la suma de los acumulados de las importaciones de primer nivel
+    total_ms = sum(m["cumulative_us"] for m in modulos if m["depth"] == 0) / 1000
+    top = sorted(modulos, key=lambda m: m["cumulative_us"], reverse=True)[:args.top]
+    pesados = heavy_imports(modulos)
+
+    if args.json:
+        print(json.dumps({"total_ms": round(total_ms, 1), "modules": len(modulos), "heavy_imports": pesados, "top": top}, indent=2))
+    else:
+        print(f"Total: {total_ms:.1f} ms en {len(modulos)} módulos")
+        print(f"{'acumulado ms':>12}  {'propio ms':>9}  módulo")
+        for m in top:
+            print(f"{m['cumulative_us'] / 1000:>12.1f}  {m['self_us'] / 1000:>9.1f}  {m['module']}")
+        if pesados:
+            print("Librerías pesadas importadas al arrancar: " + ", ".join(pesados))
+
+    fallos = []
+    if pesados:
+        fallos.append("librerías pesadas importadas al arrancar")
+    if args.max_ms is not None and total_ms > args.max_ms:
+        fallos.append(f"arranque de {total_ms:.1f} ms > {args.max_ms} ms")
+    if fallos:
+        print("FALLO: " + "; ".join(fallos), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
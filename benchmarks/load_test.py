@@ -0,0 +1,404 @@
+# benchmarks/load_test.py
+# Prueba de carga: muchas sesiones de la app, cada una un AppTest de Streamlit (sin navegador) que ejecuta
+# main() completo contra la hoja en memoria (storage_backend = "fake") y Vision falso.
+# Cada sesión sigue el recorrido típico: entrar, abrir sesión, registrar el día, subir una foto y detectar
+# plantas, ver el progreso y calcular el resumen semanal. Se informa de sesiones por segundo, percentiles de
+# latencia por paso, memoria por sesión y los tiempos por fase de la propia app (nutrimind/timing.py).
+#
+# AppTest cambia estado global del proceso en cada rerun (runtime, st.secrets, configuración), así que dos
+# sesiones AppTest no pueden ejecutarse a la vez en el mismo proceso: dentro de cada uno de los --workers
+# procesos (réplicas independientes, cada una con sus cachés, su cola de escritura y su hoja en memoria) van
+# en serie. Sus cifras son el rendimiento en serie por réplica, no la carga concurrente sobre un servidor.
+#
+# Para eso está la fase concurrente (--threads, 0 la omite): en cada proceso, --threads hilos recorren a la
+# vez los mismos pasos sin Streamlit contra un único juego de los objetos que la app guarda con
+# st.cache_resource (cola de escritura, lector de la hoja, agregados y modelo de ánimo en SQLite, circuit
+# breaker y caché de detecciones), como las sesiones simultáneas de un servidor. No incluye el render de la app.
+#
+#   python benchmarks/load_test.py --sessions 200 --workers 4
+#   python benchmarks/load_test.py --sessions 40 --workers 2 --sheet-users 500 --sheet-days 365 --json
+#   python benchmarks/load_test.py --sessions 200 --workers 1 --threads 16
+import argparse
+import io
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "NutriMind.py")
+sys.path.insert(0, ROOT)
+
+from nutrimind.aggregates import WeeklyPlantAggregates, iso_week_key # noqa: E402
+from nutrimind.detectors import GoogleVisionDetector # noqa: E402
+from nutrimind.fakes import FakeVisionClient, FakeWorksheet # noqa: E402
+from nutrimind.food_ids import get_food_ids # noqa: E402
+from nutrimind.images import prepare_image # noqa: E402
+from nutrimind.importer import canonicalize_foods # noqa: E402
+from nutrimind.mood_models import MoodRegressionStore # noqa: E402
+from nutrimind.sheets_usage import InstrumentedWorksheet, SheetsUsage, TokenBucket # noqa: E402
+from nutrimind.storage import EXPECTED_HEADERS, GSheetsBackend # noqa: E402
+from nutrimind.synthetic import synthetic_rows, user_name # noqa: E402
+from nutrimind.vision_cache import DEFAULT_MAX_DISK_ENTRIES, DetectionCache # noqa: E402
+from nutrimind.vision_labels import CircuitBreaker, VisionLabeler, VisionMetrics # noqa: E402
+from nutrimind.write_behind import WriteBehindStorage # noqa: E402
+
+PASOS = ("inicio", "login", "registro", "foto", "progreso", "resumen")
+PASOS_CONCURRENTES = PASOS[1:] # Sin Streamlit no hay render inicial que medir
+# Errores esperados: la prueba corre a propósito sin credenciales de Google
+ERRORES_IGNORADOS = ("gcp_service_account",)
+ALIMENTOS = ("Manzana", "Ajo", "Cebolla", "Lenteja", "Espinaca", "Kefir", "Avena", "Nuez", "Tomate", "Brócoli",
+             "Zanahoria", "Garbanzo", "Plátano", "Pimiento Rojo", "Calabacín")
+FOTOS_DISTINTAS = 20 # Las fotos se repiten entre sesiones, como en la caché de detecciones real
+
+
+def rss_mb():
+    # Memoria residente actual del proceso (Linux); fuera de Linux, el máximo alcanzado
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentiles(valores):
+    valores = sorted(valores)
+    if not valores:
+        return {}
+    def p(q):
+        return round(valores[min(len(valores) - 1, int(round(q / 100 * (len(valores) - 1))))] * 1000, 1)
+    return {"n": len(valores), "p50_ms": p(50), "p95_ms": p(95), "p99_ms": p(99), "max_ms": round(valores[-1] * 1000, 1)}
+
+
+def meal_photo(indice):
+    # JPEG de 1600×1200 de un color por índice: hace el trabajo real de reducir y recodificar la imagen
+    from PIL import Image
+    rng = random.Random(indice)
+    salida = io.BytesIO()
+    Image.new("RGB", (1600, 1200), tuple(rng.randrange(256) for _ in range(3))).save(salida, "JPEG", quality=90)
+    return salida.getvalue()
+
+
+def errores(at):
+    mensajes = [str(e.value) for e in at.exception] + [str(e.value) for e in at.error]
+    return [m for m in mensajes if not any(i in m for i in ERRORES_IGNORADOS)]
+
+
+def boton(elementos, texto):
+    for b in elementos.button:
+        if texto in b.label:
+            return b
+    raise LookupError(f"No se encontró el botón '{texto}'")
+
+
+class Session:
+    def __init__(self, secretos, usuario, foto, timeout, rng):
+        from streamlit.testing.v1 import AppTest
+        self.at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        for clave, valor in secretos.items():
+            self.at.secrets[clave] = valor
+        self.usuario = usuario
+        self.foto = foto
+        self.rng = rng
+        self.latencias = {}
+        self.errores = []
+
+    def paso(self, nombre, accion):
+        inicio = time.perf_counter()
+        try:
+            accion()
+        except Exception as e: # Un paso roto no para la prueba: cuenta como error de la sesión
+            self.errores.append(f"{nombre}: {type(e).__name__} - {e}")
+        else:
+            self.errores += [f"{nombre}: {m}" for m in errores(self.at)]
+        self.latencias[nombre] = time.perf_counter() - inicio
+
+    def login(self):
+        self.at.sidebar.text_input(key="user_login_input").input(self.usuario)
+        boton(self.at.sidebar, "Acceder").click().run()
+
+    def registro(self):
+        selector = self.at.multiselect[0]
+        selector.set_value(self.rng.sample([a for a in ALIMENTOS if a in selector.options], 5))
+        boton(self.at, "Guardar Registro Manual").click().run()
+
+    def foto_comida(self):
+        self.at.get("file_uploader")[0].upload("comida.jpg", self.foto, "image/jpeg").run()
+        boton(self.at, "Detectar Plantas").click().run()
+
+    def resumen(self):
+        boton(self.at, "Resumen Semanal").click().run()
+
+    def run(self):
+        self.paso("inicio", self.at.run)
+        self.paso("login", self.login)
+        self.paso("registro", self.registro)
+        self.paso("foto", self.foto_comida)
+        self.paso("progreso", self.at.run)
+        self.paso("resumen", self.resumen)
+        return self
+
+
+class SharedResources:
+    # Los objetos que NutriMind.py guarda con st.cache_resource (uno por proceso, compartidos por todas sus
+    # sesiones), creados como en la app con storage_backend = "fake", vision_backend = "fake" y los secretos dados
+    def __init__(self, secretos):
+        usuarios, dias = secretos["fake_sheet_users"], secretos["fake_sheet_days"]
+        filas = synthetic_rows(usuarios, dias, start=date.today() - timedelta(days=dias - 1)) if usuarios and dias else []
+        hoja = InstrumentedWorksheet(FakeWorksheet([EXPECTED_HEADERS, *filas], latency=secretos["fake_sheet_latency"]),
+                                     SheetsUsage(), TokenBucket(float(secretos["sheets_reads_per_minute"])),
+                                     TokenBucket(float(secretos["sheets_writes_per_minute"])))
+        self.storage = WriteBehindStorage(GSheetsBackend(hoja))
+        self.agregados = WeeklyPlantAggregates(":memory:", max_age=600)
+        self.modelos_animo = MoodRegressionStore(":memory:", max_age=600)
+        self.breaker, self.metricas = CircuitBreaker(), VisionMetrics()
+        self.cache = DetectionCache(secretos["vision_cache_path"], max_disk_entries=DEFAULT_MAX_DISK_ENTRIES)
+        labeler = VisionLabeler(FakeVisionClient(latency=secretos["vision_fake_latency"]), deadline=8.0,
+                                breaker=self.breaker, metrics=self.metricas)
+        self.detector = GoogleVisionDetector(labeler, cache=self.cache)
+
+
+class SharedSession:
+    # El recorrido de Session sin Streamlit: cada paso hace las mismas llamadas que la app a los recursos compartidos
+    def __init__(self, recursos, usuario, foto, rng):
+        self.recursos = recursos
+        self.usuario = usuario
+        self.foto = foto
+        self.rng = rng
+        self.latencias = {}
+        self.errores = []
+
+    def paso(self, nombre, accion):
+        inicio = time.perf_counter()
+        try:
+            accion()
+        except Exception as e:
+            self.errores.append(f"{nombre}: {type(e).__name__} - {e}")
+        self.latencias[nombre] = time.perf_counter() - inicio
+
+    def login(self): # cargar_registros_usuario
+        self.recursos.storage.get_records(usuario=self.usuario)
+
+    def registro(self): # guardar_registro
+        food_ids = get_food_ids()
+        hoy = date.today()
+        original, normalizada, mascara, _ = canonicalize_foods(self.rng.sample(ALIMENTOS, 5))
+        plantas = food_ids.count_plants(mascara)
+        self.recursos.storage.append_row([self.usuario, hoy.isoformat(), original, normalizada, 7, "", 4, plantas,
+                                          "registro_diario", food_ids.to_column(mascara)])
+        self.recursos.agregados.add(self.usuario, hoy, food_ids.plants(mascara))
+        self.recursos.modelos_animo.add(self.usuario, {"tipo_registro": "registro_diario", "sueno": 7, "animo": 4,
+                                                       "diversidad_diaria_plantas": plantas})
+
+    def foto_comida(self): # preparar_imagen_cached + detectar_plantas
+        if self.recursos.detector.detect([prepare_image(self.foto).detect_bytes]) is None:
+            raise RuntimeError("circuito de Vision abierto")
+
+    def progreso(self): # plantas_semana_usuario y el modelo de ánimo
+        self.recursos.agregados.get_or_build(self.recursos.storage, self.usuario, iso_week_key(date.today()))
+        self.recursos.modelos_animo.get_or_build(self.recursos.storage, self.usuario)
+
+    def resumen(self): # calcular_y_guardar_resumen_semanal_usuario
+        lunes = date.today() - timedelta(days=date.today().weekday())
+        self.recursos.storage.get_records(usuario=self.usuario, desde=lunes, hasta=lunes + timedelta(days=6),
+                                          tipo_registro="registro_diario")
+
+    def run(self):
+        self.paso("login", self.login)
+        self.paso("registro", self.registro)
+        self.paso("foto", self.foto_comida)
+        self.paso("progreso", self.progreso)
+        self.paso("resumen", self.resumen)
+        return self
+
+
+def run_shared_sessions(indices, usuarios, secretos, fotos, threads, seed):
+    # Fase concurrente de un proceso: sus sesiones repartidas en `threads` hilos sobre un único SharedResources
+    recursos = SharedResources(secretos)
+    SharedSession(recursos, "calentamiento", fotos[0], random.Random(seed)).run()
+    inicio = time.time()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        sesiones = list(pool.map(lambda i: SharedSession(recursos, usuarios[i], fotos[i % FOTOS_DISTINTAS],
+                                                         random.Random(seed + i)).run(), indices))
+    fin = time.time()
+    en_cola = len(recursos.storage.pending_writes()) # Escrituras que la cola aún no ha vaciado al terminar
+    recursos.storage.close()
+    return {
+        "started": inicio, "finished": fin, "queued_writes_at_end": en_cola, "breaker_state": recursos.breaker.state,
+        "sessions": [{"latencies": s.latencias, "errors": s.errores} for s in sesiones],
+    }
+
+
+def run_worker(indices, usuarios, secretos, timeout, seed, threads):
+    # Un proceso: calienta (importaciones, catálogo, cachés), mide la memoria base y ejecuta sus sesiones AppTest
+    # una a una; después, si threads > 0, la fase concurrente. Las sesiones AppTest terminadas se conservan para
+    # medir la memoria que ocupan a la vez
+    logging.disable(logging.WARNING) # Streamlit avisa en cada rerun sin servidor
+    fotos = {}
+    def foto(i):
+        return fotos.setdefault(i % FOTOS_DISTINTAS, meal_photo(seed + i % FOTOS_DISTINTAS))
+    Session(secretos, "calentamiento", foto(0), timeout, random.Random(seed)).run()
+    if os.path.exists(secretos["timing_jsonl_path"]): # Los tiempos del calentamiento no cuentan
+        os.remove(secretos["timing_jsonl_path"])
+    memoria_base = rss_mb()
+    inicio = time.time()
+    sesiones = [Session(secretos, usuarios[i], foto(i), timeout, random.Random(seed + i)).run() for i in indices]
+    resultado = {
+        "started": inicio, "finished": time.time(), "baseline_mb": memoria_base, "final_mb": rss_mb(),
+        "sessions": [{"latencies": s.latencias, "errors": s.errores} for s in sesiones],
+    }
+    if threads:
+        fotos_fase = [foto(i) for i in range(FOTOS_DISTINTAS)] # Se generan antes: los hilos solo las leen
+        resultado["shared"] = run_shared_sessions(indices, usuarios, secretos, fotos_fase, threads, seed)
+    return resultado
+
+
+def phase_percentiles(jsonl_paths):
+    # Tiempos por fase de todos los reruns, de los JSONL que escribe la app en cada proceso
+    fases = {}
+    for path in jsonl_paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding="utf-8") as f:
+            for linea in f:
+                rerun = json.loads(linea)
+                if rerun["total_ms"] is not None:
+                    fases.setdefault("rerun_total", []).append(rerun["total_ms"] / 1000)
+                for tramo in rerun["spans"]:
+                    fases.setdefault(tramo["name"], []).append(tramo["ms"] / 1000)
+    return {fase: percentiles(valores) for fase, valores in sorted(fases.items())}
+
+
+def throughput(resultados, pasos):
+    # La ventana medida va del primer proceso que empieza (ya caliente) al último que termina
+    duracion = max(r["finished"] for r in resultados) - min(r["started"] for r in resultados)
+    terminadas = [s for r in resultados for s in r["sessions"]]
+    con_errores = [s for s in terminadas if s["errors"]]
+    return {
+        "duration_s": round(duracion, 2), "sessions_per_second": round(len(terminadas) / duracion, 2),
+        "latency": {paso: percentiles([s["latencies"][paso] for s in terminadas if paso in s["latencies"]]) for paso in pasos},
+        "session_latency": percentiles([sum(s["latencies"].values()) for s in terminadas]),
+        "failed_sessions": len(con_errores),
+        "errors": sorted({e for s in con_errores for e in s["errors"]})[:20],
+    }
+
+
+def run_load_test(sessions, workers, sheet_users, sheet_days, sheet_latency, vision_latency, sheets_quota,
+                  timeout, seed, directorio, threads=0):
+    secretos = {
+        "storage_backend": "fake", "fake_sheet_users": sheet_users, "fake_sheet_days": sheet_days,
+        "fake_sheet_latency": sheet_latency, "vision_backend": "fake", "vision_fake_latency": vision_latency,
+        "sheets_reads_per_minute": sheets_quota, "sheets_writes_per_minute": sheets_quota,
+        "timing_prometheus_path": "", "vision_cache_path": os.path.join(directorio, "vision_cache.sqlite"),
+    }
+    rng = random.Random(seed)
+    # Con datos sintéticos las sesiones entran como usuarios con historial; sin ellos, como usuarios nuevos
+    usuarios = [user_name(rng.randrange(sheet_users)) if sheet_users and sheet_days else f"carga_{i:05d}" for i in range(sessions)]
+    rutas_jsonl = [os.path.join(directorio, f"timings_{w}.jsonl") for w in range(workers)]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futuros = [pool.submit(run_worker, range(w, sessions, workers), usuarios,
+                               dict(secretos, timing_jsonl_path=rutas_jsonl[w]), timeout, seed, threads)
+                   for w in range(workers)]
+        resultados = [f.result() for f in futuros]
+
+    por_sesion = [(r["final_mb"] - r["baseline_mb"]) / len(r["sessions"]) for r in resultados if r["sessions"]]
+    informe = {
+        "sessions": sessions, "workers": workers, "sheet_rows": sheet_users * sheet_days,
+        # Las sesiones AppTest de cada proceso van en serie: rendimiento por réplica, no carga concurrente
+        "apptest_mode": "serial_per_worker",
+        **throughput(resultados, PASOS),
+        "memory": {"baseline_mb_per_worker": round(sum(r["baseline_mb"] for r in resultados) / workers, 1),
+                   "final_mb_per_worker": round(sum(r["final_mb"] for r in resultados) / workers, 1),
+                   "per_session_mb": round(sum(por_sesion) / len(por_sesion), 2) if por_sesion else None},
+        "phases": phase_percentiles(rutas_jsonl),
+        "shared": None,
+    }
+    if threads:
+        compartidos = [r["shared"] for r in resultados]
+        informe["shared"] = {
+            "threads_per_worker": threads, **throughput(compartidos, PASOS_CONCURRENTES),
+            "queued_writes_at_end": sum(c["queued_writes_at_end"] for c in compartidos),
+            "breaker_states": sorted({c["breaker_state"] for c in compartidos}),
+        }
+    return informe
+
+
+def print_latencies(latencia, sesion):
+    print(f"\n{'paso':<22} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'máx ms':>9}")
+    for nombre, p in [*latencia.items(), ("sesión completa", sesion)]:
+        if p:
+            print(f"{nombre:<22} {p['p50_ms']:>9} {p['p95_ms']:>9} {p['p99_ms']:>9} {p['max_ms']:>9}")
+
+
+def print_errors(fallidas, errores):
+    if fallidas:
+        print(f"\n{fallidas} sesiones con errores:")
+        for error in errores:
+            print(f"  {error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga de NutriMind: sesiones AppTest en serie por proceso y una fase "
+                                                 "concurrente con hilos sobre los recursos compartidos de cada proceso.")
+    parser.add_argument("--sessions", type=int, default=100, help="Sesiones en total")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Procesos (réplicas independientes)")
+    parser.add_argument("--threads", type=int, default=8,
+                        help="Hilos por proceso en la fase concurrente sobre los recursos compartidos (0 la omite)")
+    parser.add_argument("--sheet-users", type=int, default=100, help="Usuarios sintéticos en la hoja en memoria")
+    parser.add_argument("--sheet-days", type=int, default=90, help="Días de historial por usuario sintético")
+    parser.add_argument("--sheet-latency", type=float, default=0.0, help="Segundos añadidos a cada llamada a la hoja")
+    parser.add_argument("--vision-latency", type=float, default=0.2, help="Latencia del Vision falso (s)")
+    parser.add_argument("--sheets-quota", type=float, default=1e9,
+                        help="Llamadas por minuto a la hoja y proceso (60 emula la cuota de Google; por defecto sin límite)")
+    parser.add_argument("--timeout", type=float, default=120, help="Segundos máximos por rerun")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Guarda los resultados en este fichero JSON")
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args(argv)
+
+    workers = max(1, min(args.workers, args.sessions))
+    with tempfile.TemporaryDirectory(prefix="nutrimind_carga_") as directorio:
+        informe = run_load_test(args.sessions, workers, args.sheet_users, args.sheet_days, args.sheet_latency,
+                                args.vision_latency, args.sheets_quota, args.timeout, args.seed, directorio,
+                                max(0, args.threads))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(informe, f, indent=2)
+
+    if args.json:
+        print(json.dumps(informe, indent=2))
+    else:
+        print(f"{informe['sessions']} sesiones AppTest en serie dentro de cada uno de {informe['workers']} procesos "
+              f"en {informe['duration_s']} s: {informe['sessions_per_second']} sesiones/s")
+        print("(rendimiento en serie por réplica, no carga concurrente sobre un mismo servidor)")
+        memoria = informe["memory"]
+        print(f"Memoria por proceso: {memoria['baseline_mb_per_worker']} MB tras calentar, "
+              f"{memoria['final_mb_per_worker']} MB al final; {memoria['per_session_mb']} MB por sesión")
+        print_latencies(informe["latency"], informe["session_latency"])
+        print(f"\n{'fase de la app':<30} {'n':>6} {'p50 ms':>9} {'p95 ms':>9}")
+        for fase, p in informe["phases"].items():
+            print(f"{fase:<30} {p['n']:>6} {p['p50_ms']:>9} {p['p95_ms']:>9}")
+        print_errors(informe["failed_sessions"], informe["errors"])
+
+        compartido = informe["shared"]
+        if compartido:
+            print(f"\nFase concurrente: {compartido['threads_per_worker']} hilos por proceso sobre sus recursos "
+                  f"compartidos (sin render de Streamlit) en {compartido['duration_s']} s: "
+                  f"{compartido['sessions_per_second']} sesiones/s")
+            print(f"Escrituras aún en cola al terminar: {compartido['queued_writes_at_end']}; "
+                  f"circuit breaker: {', '.join(compartido['breaker_states'])}")
+            print_latencies(compartido["latency"], compartido["session_latency"])
+            print_errors(compartido["failed_sessions"], compartido["errors"])
+    fallidas = informe["failed_sessions"] + (informe["shared"]["failed_sessions"] if informe["shared"] else 0)
+    return 1 if fallidas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+# nutrimind: lógica de NutriBioMind independiente de la interfaz de Streamlit
@@ -0,0 +1,166 @@
+# nutrimind/__main__.py
+# Tareas sin interfaz: python -m nutrimind <comando> [--sqlite RUTA | --credentials JSON]
+import argparse
+import sys
+
+from nutrimind.storage import SQLiteBackend, open_gsheets_backend
+
+SCOPE_GSPREAD = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+
+
+def abrir_backend(args):
+    if args.sqlite:
+        return SQLiteBackend(args.sqlite)
+    from oauth2client.service_account import ServiceAccountCredentials
+    credentials = ServiceAccountCredentials.from_json_keyfile_name(args.credentials, SCOPE_GSPREAD)
+    return open_gsheets_backend(credentials, args.spreadsheet)
+
+
+def cmd_rebuild_aggregates(args):
+    from nutrimind.aggregates import WeeklyPlantAggregates
+    from nutrimind.mood_models import MoodRegressionStore
+    backend = abrir_backend(args)
+    path = args.aggregates or args.sqlite or "nutrimind_agregados.sqlite"
+    records = backend.get_records()
+    n_semanas = WeeklyPlantAggregates(path).rebuild(records)
+    n_usuarios = MoodRegressionStore(path).rebuild(records)
+    print(f"Agregados regenerados: {n_semanas} semanas (usuario, semana ISO), modelo de ánimo de {n_usuarios} usuarios.")
+    return 0
+
+
+def cmd_build_catalog(args):
+    from nutrimind.catalog import COMPILED_PATH, SOURCE_PATH, build_catalog
+    compilado = build_catalog(args.source or SOURCE_PATH, args.output or COMPILED_PATH)
+    print(f"Catálogo compilado: {len(compilado['food_details_db'])} alimentos, "
+          f"{len(compilado['plant_items'])} plantas, versión {compilado['source_sha256'][:12]}.")
+    return 0
+
+
+def cmd_build_detector(args):
+    from nutrimind.detectors import ColorHistogramDetector, load_labelled_folder
+    ejemplos = load_labelled_folder(args.images)
+    if not ejemplos:
+        print(f"No hay fotos etiquetadas en {args.images} (se esperan subcarpetas con nombre de alimento).", file=sys.stderr)
+        return 1
+    detector = ColorHistogramDetector.fit([(img, canonical) for _, img, canonical in ejemplos])
+    detector.save(args.output)
+    print(f"Detector local: {len(ejemplos)} fotos de {len(set(detector.labels))} alimentos -> {args.output}")
+    return 0
+
+
+def cmd_fit_cohorts(args):
+    from nutrimind.cohorts import fit_cohorts
+    backend = abrir_backend(args)
+    try:
+        modelo = fit_cohorts(lambda: backend.iter_records("registro_diario", args.chunk_size),
+                             n_clusters=args.clusters, batch_size=args.chunk_size, seed=args.seed)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    modelo.save(args.output)
+    print(f"Cohortes: {modelo.n_clusters} grupos con {modelo.n_rows} días -> {args.output}")
+    for i, (centro, n) in enumerate(zip(modelo.centroids(), modelo.sizes)):
+        print(f"  {i}: {n} días | diversidad {centro[0]:.1f} plantas, sueño {centro[1]:.1f} h, ánimo {centro[2]:.1f}")
+    return 0
+
+
+def semana_iso(texto):
+    from nutrimind.aggregates import iso_week_bounds
+    try:
+        iso_week_bounds(texto)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"semana ISO no válida: {texto!r} (formato 2026-W41)")
+    return texto
+
+
+def cmd_summaries(args):
+    from nutrimind.summaries import previous_week, summary_date, weekly_summary_rows
+    from nutrimind.aggregates import iso_week_bounds
+    semana = args.week or previous_week()
+    lunes, _ = iso_week_bounds(semana)
+    backend = abrir_backend(args)
+    records = backend.get_records(desde=lunes, hasta=summary_date(semana))
+    usuarios = set()
+    if args.include_inactive: # Todos los usuarios con algún registro diario hasta el final de la semana
+        limite = summary_date(semana).strftime('%Y-%m-%d')
+        for chunk in backend.iter_records("registro_diario"):
+            usuarios.update(r["usuario"] for r in chunk if str(r["fecha"])[:10] < limite)
+    filas = weekly_summary_rows(records, semana, usuarios)
+    if filas and not args.dry_run:
+        backend.append_rows(filas)
+    accion = "por escribir (--dry-run)" if args.dry_run else "escritos"
+    print(f"Resúmenes de {semana}: {len(filas)} {accion}.")
+    for fila in filas if args.dry_run else ():
+        print(f"  {fila[0]}: {fila[7]} plantas")
+    return 0
+
+
+def cmd_import_csv(args):
+    from nutrimind.importer import import_csv
+    backend = abrir_backend(args)
+    try:
+        informe = import_csv(backend, args.csv, chunk_rows=args.chunk_size, dry_run=args.dry_run)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    accion = "por importar (--dry-run)" if args.dry_run else "importadas"
+    print(f"{args.csv}: {informe.read} filas leídas, {informe.imported} {accion}, {informe.duplicates} duplicadas, "
+          f"{informe.invalid} inválidas en {informe.elapsed:.1f} s ({informe.rows_per_second:,.0f} filas/s).")
+    if informe.unrecognized:
+        print("Alimentos no reconocidos (no cuentan para la diversidad): "
+              + ", ".join(f"{nombre} ({n})" for nombre, n in informe.unrecognized.most_common(10)))
+    if informe.imported and not args.dry_run:
+        print("Ejecuta rebuild-aggregates para incluir el histórico en los agregados semanales y el modelo de ánimo.")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m nutrimind", description="Tareas de mantenimiento de NutriBioMind.")
+    origen = parser.add_mutually_exclusive_group()
+    origen.add_argument("--sqlite", help="Ruta de la base de datos SQLite (backend local).")
+    origen.add_argument("--credentials", default="gcp_credentials.json", help="JSON de la cuenta de servicio para Google Sheets.")
+    parser.add_argument("--spreadsheet", default="habitos_microbiota", help="Nombre de la hoja de cálculo.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_agg = sub.add_parser("rebuild-aggregates", help="Regenera los agregados semanales de plantas y el modelo de ánimo desde las filas originales.")
+    p_agg.add_argument("--aggregates", help="Ruta SQLite de los agregados (por defecto, la de --sqlite o nutrimind_agregados.sqlite).")
+    p_agg.set_defaults(func=cmd_rebuild_aggregates)
+
+    p_cat = sub.add_parser("build-catalog", help="Compila data/alimentos.json en el artefacto que carga la app.")
+    p_cat.add_argument("--source", help="Fuente editable del catálogo (por defecto nutrimind/data/alimentos.json).")
+    p_cat.add_argument("--output", help="Artefacto compilado (por defecto nutrimind/data/catalogo_compilado.json).")
+    p_cat.set_defaults(func=cmd_build_catalog)
+
+    p_det = sub.add_parser("build-detector", help="Entrena el detector local de plantas con fotos etiquetadas.")
+    p_det.add_argument("--images", required=True, help="Carpeta con una subcarpeta por alimento (p. ej. fotos/tomate/*.jpg).")
+    p_det.add_argument("--output", default="nutrimind_detector.npz", help="Modelo de salida (por defecto nutrimind_detector.npz).")
+    p_det.set_defaults(func=cmd_build_detector)
+
+    p_coh = sub.add_parser("fit-cohorts", help="Agrupa los días de todos los usuarios (MiniBatchKMeans por lotes).")
+    p_coh.add_argument("--clusters", type=int, default=4, help="Número de cohortes (por defecto 4).")
+    p_coh.add_argument("--chunk-size", type=int, default=10000, help="Filas por lote leído y por paso de ajuste.")
+    p_coh.add_argument("--seed", type=int, default=0)
+    p_coh.add_argument("--output", default="nutrimind_cohortes.joblib", help="Modelo de salida (por defecto nutrimind_cohortes.joblib).")
+    p_coh.set_defaults(func=cmd_fit_cohorts)
+
+    p_sum = sub.add_parser("summaries", help="Escribe los resúmenes semanales de todos los usuarios que aún no lo tienen.")
+    p_sum.add_argument("--week", type=semana_iso, help="Semana ISO a resumir, p. ej. 2026-W41 (por defecto, la última completa).")
+    p_sum.add_argument("--include-inactive", action="store_true", help="Incluye (con 0 plantas) a usuarios sin registros esa semana.")
+    p_sum.add_argument("--dry-run", action="store_true", help="Muestra los resúmenes sin escribirlos.")
+    p_sum.set_defaults(func=cmd_summaries)
+
+    p_imp = sub.add_parser("import-csv", help="Importa un histórico CSV (cabeceras de la hoja) por lotes, sin duplicar días.")
+    p_imp.add_argument("csv", help="Fichero CSV, p. ej. habitos.csv.")
+    p_imp.add_argument("--chunk-size", type=int, default=10000, help="Filas por lote leído y escrito.")
+    p_imp.add_argument("--dry-run", action="store_true", help="Valida y cuenta sin escribir.")
+    p_imp.set_defaults(func=cmd_import_csv)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
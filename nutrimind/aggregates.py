@@ -0,0 +1,131 @@
+# nutrimind/aggregates.py
+# Agregados materializados: conjunto de plantas distintas por (usuario, semana ISO).
+# guardar_registro los actualiza al escribir; la barra de progreso y el resumen semanal los consultan.
+# Una semana materializada caduca a los `max_age` segundos y se recalcula desde las filas originales: así entran
+# las filas escritas por otros procesos (otras réplicas, import-csv) que este proceso no ha visto pasar.
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+from nutrimind.food_ids import get_food_ids, union_masks
+
+
+def iso_week_key(fecha):
+    if isinstance(fecha, str):
+        fecha = datetime.strptime(fecha[:10], '%Y-%m-%d').date()
+    elif isinstance(fecha, datetime):
+        fecha = fecha.date()
+    iso_year, iso_week, _ = fecha.isocalendar()
+    return f"{iso_year}-W{iso_week:02d}"
+
+
+def iso_week_bounds(semana):
+    # "2026-W41" -> (lunes, domingo)
+    lunes = datetime.strptime(f"{semana}-1", "%G-W%V-%u").date()
+    return lunes, lunes + timedelta(days=6)
+
+
+class WeeklyPlantAggregates:
+    def __init__(self, path="nutrimind_agregados.sqlite", id_table=None, max_age=None):
+        self.path = path
+        self.id_table = id_table or get_food_ids()
+        self.max_age = max_age # Segundos; None: una semana materializada no caduca
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS plantas_semanales ("
+                " usuario TEXT NOT NULL, semana TEXT NOT NULL, planta TEXT NOT NULL,"
+                " PRIMARY KEY (usuario, semana, planta)) WITHOUT ROWID"
+            )
+            # Semanas calculadas por completo desde las filas originales (una semana vacía también cuenta)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS semanas_materializadas ("
+                " usuario TEXT NOT NULL, semana TEXT NOT NULL, materializada_en REAL NOT NULL DEFAULT 0,"
+                " PRIMARY KEY (usuario, semana)) WITHOUT ROWID"
+            )
+            columnas = {c[1] for c in self._conn.execute("PRAGMA table_info(semanas_materializadas)")}
+            if "materializada_en" not in columnas: # Bases de datos anteriores: sus semanas cuentan como caducadas
+                self._conn.execute("ALTER TABLE semanas_materializadas ADD COLUMN materializada_en REAL NOT NULL DEFAULT 0")
+
+    def add(self, usuario, fecha, plantas):
+        # Actualización incremental al guardar un registro diario (si la escritura acaba fallando: invalidate)
+        semana = iso_week_key(fecha)
+        plantas = self.id_table.plants(self.id_table.encode(plantas))
+        if not plantas:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO plantas_semanales (usuario, semana, planta) VALUES (?, ?, ?)",
+                [(usuario, semana, p) for p in plantas],
+            )
+
+    def get(self, usuario, semana):
+        # None si la semana no está materializada (p. ej. base de datos nueva tras reiniciar el proceso) o ha caducado
+        with self._lock:
+            materializada = self._conn.execute(
+                "SELECT materializada_en FROM semanas_materializadas WHERE usuario = ? AND semana = ?", (usuario, semana)
+            ).fetchone()
+            if not materializada or (self.max_age is not None and time.time() - materializada[0] > self.max_age):
+                return None
+            filas = self._conn.execute(
+                "SELECT planta FROM plantas_semanales WHERE usuario = ? AND semana = ?", (usuario, semana)
+            ).fetchall()
+        return frozenset(f[0] for f in filas)
+
+    def materialize(self, usuario, semana, records):
+        # Recalcula una semana desde las filas originales (registro_diario) del usuario
+        mascara = union_masks(self.id_table.record_mask(r) for r in records if r.get("tipo_registro") == "registro_diario")
+        plantas = self.id_table.plants(mascara)
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM plantas_semanales WHERE usuario = ? AND semana = ?", (usuario, semana))
+            self._conn.executemany(
+                "INSERT INTO plantas_semanales (usuario, semana, planta) VALUES (?, ?, ?)",
+                [(usuario, semana, p) for p in plantas],
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO semanas_materializadas (usuario, semana, materializada_en) VALUES (?, ?, ?)",
+                (usuario, semana, time.time()),
+            )
+        return frozenset(plantas)
+
+    def invalidate(self, usuario, fecha):
+        # La semana de `fecha` se recalculará en la próxima consulta (p. ej. tras fallar la escritura de un registro)
+        semana = iso_week_key(fecha)
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM semanas_materializadas WHERE usuario = ? AND semana = ?", (usuario, semana))
+            self._conn.execute("DELETE FROM plantas_semanales WHERE usuario = ? AND semana = ?", (usuario, semana))
+
+    def get_or_build(self, storage, usuario, semana):
+        plantas = self.get(usuario, semana)
+        if plantas is None:
+            lunes, domingo = iso_week_bounds(semana)
+            records = storage.get_records(usuario=usuario, desde=lunes, hasta=domingo, tipo_registro="registro_diario")
+            plantas = self.materialize(usuario, semana, records)
+        return plantas
+
+    def rebuild(self, records):
+        # Regenera todos los agregados desde las filas originales
+        por_semana = {}
+        for record in records:
+            if record.get("tipo_registro") != "registro_diario":
+                continue
+            try:
+                clave = (record.get("usuario"), iso_week_key(str(record.get("fecha", ""))))
+            except ValueError:
+                continue
+            por_semana[clave] = por_semana.get(clave, 0) | self.id_table.record_mask(record)
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM plantas_semanales")
+            self._conn.execute("DELETE FROM semanas_materializadas")
+            self._conn.executemany(
+                "INSERT INTO plantas_semanales (usuario, semana, planta) VALUES (?, ?, ?)",
+                [(u, w, p) for (u, w), mascara in por_semana.items() for p in self.id_table.plants(mascara)],
+            )
+            ahora = time.time()
+            self._conn.executemany(
+                "INSERT INTO semanas_materializadas (usuario, semana, materializada_en) VALUES (?, ?, ?)",
+                [(u, w, ahora) for u, w in por_semana],
+            )
+        return len(por_semana)
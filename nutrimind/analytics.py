@@ -0,0 +1,105 @@
+# nutrimind/analytics.py
+# Pipeline vectorizado de análisis: split -> explode -> join categórico con el catálogo -> groupby.
+# Sirve igual para un usuario que para todos los usuarios en una sola pasada.
+from functools import lru_cache
+
+import pandas as pd
+
+from nutrimind.catalog import get_catalog
+
+
+@lru_cache(maxsize=1)
+def catalog_frame():
+    catalogo = get_catalog()
+    nombres = list(catalogo.food_details_db)
+    return pd.DataFrame({
+        "alimento": pd.Categorical(nombres, categories=nombres),
+        "nombre_original": [catalogo.food_details_db[n]["original_name"] for n in nombres],
+        "es_planta": [n in catalogo.normalized_plant_food_items for n in nombres],
+        "es_probiotico": [n in catalogo.normalized_probiotic_foods for n in nombres],
+        "es_prebiotico": [n in catalogo.normalized_prebiotic_foods for n in nombres],
+    })
+
+
+def explode_alimentos(df, tipo_registro="registro_diario"):
+    # Una fila por (registro, alimento reconocido), con los atributos del catálogo ya unidos
+    catalogo = catalog_frame()
+    columnas = ["usuario", "fecha", "comida_normalizada_canonica"]
+    if tipo_registro is not None and "tipo_registro" in df.columns:
+        df = df[df["tipo_registro"] == tipo_registro]
+    largo = df[columnas].copy()
+    largo["fecha"] = pd.to_datetime(largo["fecha"], errors="coerce").dt.normalize()
+    largo["alimento"] = largo.pop("comida_normalizada_canonica").fillna("").astype(str).str.split(",")
+    largo = largo.explode("alimento", ignore_index=True)
+    alimentos = largo["alimento"].str.strip()
+    categorias = catalogo["alimento"].cat.categories
+    # Los no reconocidos pasan a NaN antes de la categoría (pandas dejará de aceptar valores fuera de categorías)
+    largo["alimento"] = pd.Categorical(alimentos.where(alimentos.isin(categorias)), categories=categorias)
+    largo = largo.dropna(subset=["fecha", "alimento"])
+    return largo.merge(catalogo, on="alimento", how="inner")
+
+
+def _descomponer(df, largo):
+    # Las vistas aceptan las filas (df) o su descomposición ya hecha (largo); sin ninguna no hay nada que analizar
+    if largo is not None:
+        return largo
+    if df is None:
+        raise ValueError("Hace falta df (filas de registros) o largo (resultado de explode_alimentos).")
+    return explode_alimentos(df)
+
+
+def _semana_iso(fechas):
+    iso = fechas.dt.isocalendar()
+    return iso["year"].astype(str) + "-W" + iso["week"].astype(str).str.zfill(2)
+
+
+def plantas_por_dia(df=None, largo=None):
+    # usuario, fecha, n_plantas, plantas (nombres originales ordenados y unidos por ", ")
+    largo = _descomponer(df, largo)
+    plantas = largo.loc[largo["es_planta"], ["usuario", "fecha", "nombre_original"]].drop_duplicates()
+    plantas = plantas.sort_values(["usuario", "fecha", "nombre_original"])
+    agrupado = plantas.groupby(["usuario", "fecha"], sort=False)["nombre_original"]
+    resultado = pd.DataFrame({"n_plantas": agrupado.size(), "plantas": agrupado.agg(", ".join)}).reset_index()
+    # Los días con registro pero sin plantas también se muestran (0 plantas)
+    dias = df[df["tipo_registro"] == "registro_diario"] if df is not None and "tipo_registro" in df.columns else df
+    if dias is not None:
+        todos = pd.DataFrame({"usuario": dias["usuario"], "fecha": pd.to_datetime(dias["fecha"], errors="coerce").dt.normalize()})
+        todos = todos.dropna(subset=["fecha"]).drop_duplicates()
+        resultado = todos.merge(resultado, on=["usuario", "fecha"], how="left")
+        resultado["n_plantas"] = resultado["n_plantas"].fillna(0).astype(int)
+        resultado["plantas"] = resultado["plantas"].fillna("")
+    return resultado.sort_values(["usuario", "fecha"], ignore_index=True)
+
+
+def plantas_por_semana(df=None, largo=None):
+    # usuario, semana ISO ("2026-W41"), plantas distintas
+    largo = _descomponer(df, largo)
+    plantas = largo.loc[largo["es_planta"], ["usuario", "fecha", "alimento"]].copy()
+    plantas["semana"] = _semana_iso(plantas["fecha"])
+    resultado = plantas.groupby(["usuario", "semana"], observed=True)["alimento"].nunique()
+    return resultado.rename("diversidad_semanal_plantas").reset_index()
+
+
+def presencia_pre_probioticos(df=None, hoy=None, dias=3, largo=None):
+    # usuario, probiotico_reciente, prebiotico_reciente (últimos `dias` días, incluido hoy)
+    hoy = pd.Timestamp.now().normalize() if hoy is None else pd.Timestamp(hoy).normalize()
+    desde = hoy - pd.Timedelta(days=dias)
+    if largo is None and df is not None: # Solo se descomponen las filas recientes, no todo el historial
+        largo = explode_alimentos(df[pd.to_datetime(df["fecha"], errors="coerce") >= desde])
+    largo = _descomponer(df, largo)
+    recientes = largo[largo["fecha"] >= desde]
+    resultado = recientes.groupby("usuario")[["es_probiotico", "es_prebiotico"]].any()
+    if df is not None:
+        resultado = resultado.reindex(df["usuario"].unique(), fill_value=False)
+    resultado = resultado.rename(columns={"es_probiotico": "probiotico_reciente", "es_prebiotico": "prebiotico_reciente"})
+    return resultado.rename_axis("usuario").reset_index()
+
+
+def analizar(df, hoy=None, dias_recientes=3):
+    # Las tres vistas con un único explode
+    largo = explode_alimentos(df)
+    return {
+        "plantas_por_dia": plantas_por_dia(df, largo=largo),
+        "plantas_por_semana": plantas_por_semana(largo=largo),
+        "pre_probioticos": presencia_pre_probioticos(df, hoy=hoy, dias=dias_recientes, largo=largo),
+    }
@@ -0,0 +1,152 @@
+# nutrimind/catalog.py
+# Catálogo de alimentos e índices derivados (plantas, probióticos, prebióticos, sinónimos).
+# Fuente editable: data/alimentos.json. El paso de compilación (python -m nutrimind build-catalog)
+# normaliza las claves y precalcula los índices en data/catalogo_compilado.json, que se carga
+# una sola vez por proceso, de forma perezosa e inmutable.
+import hashlib
+import json
+import os
+from functools import lru_cache
+from types import MappingProxyType
+
+from unidecode import unidecode # Para quitar acentos
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+SOURCE_PATH = os.path.join(DATA_DIR, "alimentos.json")
+COMPILED_PATH = os.path.join(DATA_DIR, "catalogo_compilado.json")
+COMPILED_FORMAT_VERSION = 2
+DEFAULT_VISION_MIN_SCORE = 0.6 # Confianza mínima de una etiqueta de Vision para proponer su alimento
+
+
+def normalize_text(text):
+    if text is None:
+        return ""
+    return _normalize_str(str(text))
+
+
+@lru_cache(maxsize=4096)
+def _normalize_str(text):
+    # Se repiten mucho (etiquetas de Vision, opciones seleccionadas): unidecode solo una vez por texto
+    return unidecode(text).lower().strip()
+
+
+# --- Compilación (fuente editable -> artefacto con claves normalizadas e índices) ---
+def _sha256_file(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def compile_catalog(source, source_sha256=""):
+    plant_categories = source["plant_categories"]
+    explicit_prebiotics = {normalize_text(n) for n in source.get("explicit_prebiotics", [])}
+
+    food_details_db = {}
+    for entrada in source["alimentos"]:
+        datos = {k: v for k, v in entrada.items() if k != "nombre"}
+        food_details_db[normalize_text(entrada["nombre"])] = datos
+
+    plant_items, probiotic_items, prebiotic_items = [], [], []
+    for norm_name, data in food_details_db.items():
+        if data.get("category_key") in plant_categories:
+            plant_items.append(norm_name)
+        if data.get("category_key") == "🦠 PROBIÓTICOS":
+            probiotic_items.append(norm_name)
+        # Definición de prebióticos
+        is_prebiotic_category = data.get("category_key") == "🌿 PREBIÓTICOS"
+        has_prebiotic_benefit = "prebiótico" in " ".join(data.get("pni_benefits", [])).lower()
+        has_prebiotic_tag = "prebiótico" in " ".join(data.get("tags", [])).lower()
+        if is_prebiotic_category or has_prebiotic_benefit or has_prebiotic_tag or norm_name in explicit_prebiotics:
+            prebiotic_items.append(norm_name)
+
+    synonyms = {normalize_text(k): normalize_text(v) for k, v in source.get("sinonimos", {}).items()}
+    # Etiqueta de Vision (inglés) -> [alimento, score mínimo]; "orange" también es un color y exige más confianza
+    vision_labels = {}
+    for etiqueta, destino in source.get("etiquetas_vision", {}).items():
+        if isinstance(destino, str):
+            destino = {"alimento": destino}
+        alimento = normalize_text(destino["alimento"])
+        if alimento in food_details_db:
+            vision_labels[normalize_text(etiqueta)] = [alimento, destino.get("min_score", DEFAULT_VISION_MIN_SCORE)]
+    return {
+        "format_version": COMPILED_FORMAT_VERSION,
+        "source_sha256": source_sha256,
+        "plant_categories": plant_categories,
+        "food_details_db": food_details_db,
+        "plant_items": plant_items,
+        "probiotic_items": probiotic_items,
+        "prebiotic_items": prebiotic_items,
+        "synonyms": synonyms,
+        "vision_labels": vision_labels,
+    }
+
+
+def build_catalog(source_path=SOURCE_PATH, compiled_path=COMPILED_PATH):
+    with open(source_path, encoding="utf-8") as f:
+        source = json.load(f)
+    compilado = compile_catalog(source, _sha256_file(source_path))
+    with open(compiled_path, "w", encoding="utf-8") as f:
+        json.dump(compilado, f, ensure_ascii=False, separators=(",", ":"))
+        f.write("\n")
+    return compilado
+
+
+# --- Carga en tiempo de ejecución ---
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+class Catalog:
+    def __init__(self, compilado):
+        db = compilado["food_details_db"]
+        self.version = compilado["source_sha256"][:12]
+        self.PLANT_CATEGORIES_KEYS = tuple(compilado["plant_categories"])
+        self.food_details_db = _freeze(db)
+        self.food_synonyms_map = MappingProxyType(dict(compilado["synonyms"]))
+        self.vision_label_map = _freeze(compilado["vision_labels"])
+        self.normalized_to_original_food_map = MappingProxyType({n: d["original_name"] for n, d in db.items()})
+        self.all_selectable_food_items_original_case = tuple(sorted({d["original_name"] for d in db.values()}))
+        self.normalized_plant_food_items = frozenset(compilado["plant_items"])
+        self.normalized_probiotic_foods = frozenset(compilado["probiotic_items"])
+        self.normalized_prebiotic_foods = frozenset(compilado["prebiotic_items"])
+        self.plant_food_items_original_case = frozenset(db[n]["original_name"] for n in compilado["plant_items"])
+        self.probiotic_foods_original_case = frozenset(db[n]["original_name"] for n in compilado["probiotic_items"])
+        self.prebiotic_foods_original_case = frozenset(db[n]["original_name"] for n in compilado["prebiotic_items"])
+
+
+@lru_cache(maxsize=1)
+def get_catalog():
+    source_sha256 = _sha256_file(SOURCE_PATH) if os.path.exists(SOURCE_PATH) else None
+    try:
+        with open(COMPILED_PATH, encoding="utf-8") as f:
+            compilado = json.load(f)
+    except (OSError, ValueError):
+        compilado = None
+    vigente = (
+        compilado is not None
+        and compilado.get("format_version") == COMPILED_FORMAT_VERSION
+        and (source_sha256 is None or compilado.get("source_sha256") == source_sha256)
+    )
+    if not vigente:
+        # Se editó la fuente sin recompilar: se compila en memoria para no servir un catálogo desfasado
+        with open(SOURCE_PATH, encoding="utf-8") as f:
+            compilado = compile_catalog(json.load(f), source_sha256)
+    return Catalog(compilado)
+
+
+def __getattr__(name):
+    # Compatibilidad: from nutrimind.catalog import food_details_db (carga el catálogo al primer acceso)
+    catalogo = get_catalog()
+    if name in vars(catalogo):
+        return getattr(catalogo, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def get_canonical_food_info(input_name):
+    # Nombre exacto, alias o sinónimo; si no, prefijo único o errata clara (ver food_search)
+    if not input_name: return None, None
+    from nutrimind.food_search import get_food_search_index
+    return get_food_search_index().resolve(input_name)
@@ -0,0 +1,89 @@
+# nutrimind/charts.py
+# Capa de datos de los gráficos: lo que llega al navegador está acotado aunque el historial crezca.
+#  - Series temporales: por día, semana o mes según el rango de fechas, y LTTB (Largest-Triangle-Three-Buckets)
+#    si aún quedan más de MAX_LINE_POINTS puntos. LTTB conserva picos y valles, a diferencia de tomar 1 de cada n.
+#  - Dispersión: los puntos repetidos (sueño y ánimo son casi discretos) se agrupan con su número de días y,
+#    por encima de MAX_SCATTER_POINTS, se toma una muestra fija. Desde WEBGL_THRESHOLD puntos se pinta con WebGL.
+import numpy as np
+import pandas as pd
+
+MAX_LINE_POINTS = 250
+MAX_SCATTER_POINTS = 2000
+WEBGL_THRESHOLD = 1000
+DAILY_MAX_SPAN_DAYS = 365 # Hasta un año se ve por días
+WEEKLY_MAX_SPAN_DAYS = 5 * 365 # Hasta cinco años, por semanas; después, por meses
+
+GRANULARITIES = {"dia": None, "semana": "W-MON", "mes": "MS"}
+GRANULARITY_LABELS = {"dia": "diaria", "semana": "media semanal", "mes": "media mensual"}
+
+
+def choose_granularity(fechas):
+    fechas = pd.to_datetime(pd.Series(fechas), errors="coerce").dropna()
+    if fechas.empty:
+        return "dia"
+    rango = (fechas.max() - fechas.min()).days
+    if rango <= DAILY_MAX_SPAN_DAYS:
+        return "dia"
+    return "semana" if rango <= WEEKLY_MAX_SPAN_DAYS else "mes"
+
+
+def lttb(x, y, n_out):
+    # Índices de los n_out puntos elegidos por LTTB (siempre incluye el primero y el último)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    bordes = np.linspace(1, n - 1, n_out - 1).astype(int) # n_out - 2 cubos entre el primer y el último punto
+    indices = [0]
+    a = 0
+    for i in range(n_out - 2):
+        inicio, fin = bordes[i], bordes[i + 1]
+        if i + 2 < len(bordes):
+            media_x, media_y = x[fin:bordes[i + 2]].mean(), y[fin:bordes[i + 2]].mean()
+        else:
+            media_x, media_y = x[-1], y[-1]
+        # Punto del cubo que forma el triángulo de mayor área con el anterior elegido y la media del siguiente cubo
+        areas = np.abs((x[a] - media_x) * (y[inicio:fin] - y[a]) - (x[a] - x[inicio:fin]) * (media_y - y[a]))
+        a = inicio + int(np.argmax(areas))
+        indices.append(a)
+    indices.append(n - 1)
+    return np.asarray(indices)
+
+
+def line_series(df, x, y, granularity=None, max_points=MAX_LINE_POINTS):
+    # (serie con columnas x, y, granularidad). Por día se toma el máximo del día (varios registros el mismo día);
+    # por semana o mes, la media de los valores diarios
+    datos = df[[x, y]].copy()
+    datos[x] = pd.to_datetime(datos[x], errors="coerce")
+    datos[y] = pd.to_numeric(datos[y], errors="coerce")
+    datos = datos.dropna()
+    granularity = granularity or choose_granularity(datos[x])
+    serie = datos.groupby(datos[x].dt.normalize())[y].max()
+    if GRANULARITIES[granularity] is not None:
+        serie = serie.resample(GRANULARITIES[granularity]).mean().dropna()
+    serie = serie.rename_axis(x).reset_index()
+    if len(serie) > max_points:
+        serie = serie.iloc[lttb(serie[x].astype("int64"), serie[y], max_points)].reset_index(drop=True)
+    return serie, granularity
+
+
+def scatter_points(df, x, y, color=None, hover=(), max_points=MAX_SCATTER_POINTS, seed=0):
+    # (puntos, agrupado). Sin agrupar si caben; agrupados llevan "dias" (tamaño) y el hover del día más reciente
+    columnas = [c for c in (x, y, color) if c is not None]
+    datos = df.dropna(subset=columnas)
+    if len(datos) <= max_points:
+        return datos, False
+    if "fecha" in datos.columns:
+        datos = datos.sort_values("fecha")
+    agregacion = {h: "last" for h in hover if h not in columnas}
+    puntos = datos.groupby(columnas, observed=True, sort=False).agg(dias=(x, "size"), **{h: (h, f) for h, f in agregacion.items()})
+    puntos = puntos.reset_index()
+    if len(puntos) > max_points:
+        puntos = puntos.sample(n=max_points, random_state=seed)
+    return puntos, True
+
+
+def render_mode(n_points):
+    # Plotly pinta en SVG un nodo por punto; con muchos puntos WebGL (scattergl) es mucho más rápido
+    return "webgl" if n_points > WEBGL_THRESHOLD else "auto"
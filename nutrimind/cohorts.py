@@ -0,0 +1,113 @@
+# nutrimind/cohorts.py
+# Cohortes de días de toda la población (diversidad, sueño, ánimo), entrenadas fuera de la app:
+#   python -m nutrimind fit-cohorts --sqlite nutrimind.sqlite
+# La tarea recorre los registros diarios en lotes (storage.iter_records): una pasada ajusta el escalado
+# (StandardScaler.partial_fit), otra los centroides (MiniBatchKMeans.partial_fit) y la última cuenta los días
+# de cada cohorte. La memoria depende del tamaño de lote, no del número de filas. La app solo carga el modelo y asigna los días de un usuario.
+import os
+from datetime import datetime
+
+FEATURES = ("diversidad_diaria_plantas", "sueno", "animo")
+MODEL_VERSION = 1
+DEFAULT_CLUSTERS = 4
+DEFAULT_CHUNK_SIZE = 10000
+
+
+def _numero(valor):
+    try:
+        numero = float(valor)
+    except (TypeError, ValueError):
+        return None
+    return None if numero != numero else numero # NaN
+
+
+def day_features(record):
+    # (diversidad, sueño, ánimo) de un registro diario o None; diversidad vacía cuenta como 0, como en la app
+    if record.get("tipo_registro") != "registro_diario":
+        return None
+    sueno, animo = _numero(record.get("sueno")), _numero(record.get("animo"))
+    if sueno is None or animo is None:
+        return None
+    return (_numero(record.get("diversidad_diaria_plantas")) or 0.0, sueno, animo)
+
+
+def feature_batches(chunks, batch_size):
+    # Lotes de registros -> matrices de `batch_size` filas de características (la última puede ser menor)
+    import numpy as np
+    pendientes = []
+    for chunk in chunks:
+        pendientes.extend(f for f in map(day_features, chunk) if f is not None)
+        while len(pendientes) >= batch_size:
+            yield np.asarray(pendientes[:batch_size], dtype=float)
+            del pendientes[:batch_size]
+    if pendientes:
+        yield np.asarray(pendientes, dtype=float)
+
+
+class CohortModel:
+    def __init__(self, scaler, kmeans, n_rows, sizes, fitted_at=None):
+        self.scaler = scaler
+        self.kmeans = kmeans
+        self.n_rows = n_rows # Días usados en el ajuste
+        self.sizes = list(sizes) # Días asignados a cada cohorte
+        self.fitted_at = fitted_at or datetime.now().isoformat(timespec="seconds")
+
+    @property
+    def n_clusters(self):
+        return self.kmeans.n_clusters
+
+    def predict(self, X):
+        # X: DataFrame o matriz con las columnas de FEATURES -> cohorte de cada fila
+        import numpy as np
+        datos = X[list(FEATURES)].to_numpy(dtype=float) if hasattr(X, "columns") else np.asarray(X, dtype=float)
+        return self.kmeans.predict(self.scaler.transform(datos))
+
+    def centroids(self):
+        # Centroides en las unidades originales (plantas, horas, ánimo 1-5)
+        return self.scaler.inverse_transform(self.kmeans.cluster_centers_)
+
+    def save(self, path):
+        import joblib
+        joblib.dump({"version": MODEL_VERSION, "features": FEATURES, "scaler": self.scaler, "kmeans": self.kmeans,
+                     "n_rows": self.n_rows, "sizes": self.sizes, "fitted_at": self.fitted_at}, path, compress=3)
+
+    @classmethod
+    def load(cls, path):
+        import joblib
+        datos = joblib.load(path)
+        if datos.get("version") != MODEL_VERSION or tuple(datos.get("features", ())) != FEATURES:
+            raise ValueError(f"Modelo de cohortes incompatible en {path}: vuelve a ejecutar fit-cohorts")
+        return cls(datos["scaler"], datos["kmeans"], datos["n_rows"], datos["sizes"], datos["fitted_at"])
+
+
+def fit_cohorts(make_chunks, n_clusters=DEFAULT_CLUSTERS, batch_size=DEFAULT_CHUNK_SIZE, seed=0):
+    # make_chunks() -> iterador nuevo de lotes de registros (p. ej. lambda: backend.iter_records("registro_diario"))
+    import numpy as np
+    from sklearn.cluster import MiniBatchKMeans
+    from sklearn.preprocessing import StandardScaler
+    batch_size = max(batch_size, n_clusters)
+
+    scaler, n_rows = StandardScaler(), 0
+    for X in feature_batches(make_chunks(), batch_size):
+        scaler.partial_fit(X)
+        n_rows += len(X)
+    if n_rows < n_clusters:
+        raise ValueError(f"Hay {n_rows} días con diversidad, sueño y ánimo; se necesitan al menos {n_clusters}")
+
+    kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=seed, batch_size=batch_size, n_init=3)
+    # El primer lote tiene al menos n_clusters filas (batch_size >= n_clusters y n_rows >= n_clusters)
+    for X in feature_batches(make_chunks(), batch_size):
+        kmeans.partial_fit(scaler.transform(X))
+
+    sizes = np.zeros(n_clusters, dtype=int)
+    for X in feature_batches(make_chunks(), batch_size):
+        sizes += np.bincount(kmeans.predict(scaler.transform(X)), minlength=n_clusters)
+    return CohortModel(scaler, kmeans, n_rows, sizes.tolist())
+
+
+def model_mtime(path):
+    # Clave de caché: la app recarga el modelo cuando la tarea lo reescribe
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
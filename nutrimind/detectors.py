@@ -0,0 +1,176 @@
+# nutrimind/detectors.py
+# Detectores de plantas en fotos. Todos devuelven, por imagen, candidatos puntuados del catálogo.
+#  - GoogleVisionDetector: etiquetas de Vision (con caché, plazo y circuit breaker) -> alimentos,
+#    mediante el índice etiqueta -> alimento precompilado en el catálogo (etiquetas_vision) y sus umbrales.
+#  - ColorHistogramDetector: local y sin red. Compara un histograma de color HSV de la foto con fotos
+#    de referencia etiquetadas (python -m nutrimind build-detector) por similitud coseno.
+import io
+import os
+from collections import namedtuple
+from functools import lru_cache
+
+from nutrimind.catalog import DEFAULT_VISION_MIN_SCORE, get_canonical_food_info, get_catalog, normalize_text
+
+Candidate = namedtuple("Candidate", ["canonical", "original_name", "score", "label"])
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def merge_candidates(candidatos):
+    # Un candidato por alimento (el de mayor score), de mayor a menor score
+    mejores = {}
+    for c in candidatos:
+        if c.canonical not in mejores or c.score > mejores[c.canonical].score:
+            mejores[c.canonical] = c
+    return sorted(mejores.values(), key=lambda c: (-c.score, c.original_name))
+
+
+class LabelFoodIndex:
+    def __init__(self, catalogo):
+        self.catalogo = catalogo
+
+    def match(self, labels):
+        # labels: [{"description", "score"}] de Vision -> candidatos del catálogo
+        candidatos = []
+        for label in labels:
+            score = label.get("score") or 0.0
+            destino = self.catalogo.vision_label_map.get(normalize_text(label["description"]))
+            if destino is not None:
+                canonical, min_score = destino
+                if score >= min_score:
+                    original = self.catalogo.food_details_db[canonical]["original_name"]
+                    candidatos.append(Candidate(canonical, original, score, label["description"]))
+                continue
+            # Etiquetas sin entrada: nombre, alias, sinónimo o errata clara del catálogo
+            canonical, original = get_canonical_food_info(label["description"])
+            if canonical and score >= DEFAULT_VISION_MIN_SCORE:
+                candidatos.append(Candidate(canonical, original, score, label["description"]))
+        return merge_candidates(candidatos)
+
+
+@lru_cache(maxsize=1)
+def get_label_index():
+    return LabelFoodIndex(get_catalog())
+
+
+class PlantDetector:
+    name = "base"
+
+    def detect(self, images):
+        # [(candidatos, error)] por imagen, en el mismo orden; None si el detector no está disponible ahora
+        raise NotImplementedError
+
+
+class GoogleVisionDetector(PlantDetector):
+    name = "google"
+
+    def __init__(self, labeler, cache=None, label_index=None):
+        self.labeler = labeler # nutrimind.vision_labels.VisionLabeler
+        self.cache = cache # nutrimind.vision_cache.DetectionCache, opcional
+        self.label_index = label_index or get_label_index()
+
+    def labels(self, images):
+        # [(etiquetas, error)] por imagen. Las fotos ya vistas salen de la caché y no llaman a la API
+        resultados = [(self.cache.get(img) if self.cache is not None else None, None) for img in images]
+        pendientes = [i for i, (etiquetas, _) in enumerate(resultados) if etiquetas is None]
+        if not pendientes:
+            return resultados
+        respuestas = self.labeler.annotate([images[i] for i in pendientes])
+        if respuestas is None:
+            return None
+        for i, (etiquetas, error) in zip(pendientes, respuestas):
+            resultados[i] = (etiquetas, error)
+            if error is None and self.cache is not None:
+                self.cache.put(images[i], etiquetas)
+        return resultados
+
+    def detect(self, images):
+        resultados = self.labels(images)
+        if resultados is None:
+            return None
+        return [(None, error) if error is not None else (self.label_index.match(etiquetas), None)
+                for etiquetas, error in resultados]
+
+
+# --- Detector local por histograma de color ---
+def embed_image(image_bytes, bins=(16, 4, 4), size=128):
+    # Histograma HSV normalizado (raíz cuadrada + L2: el coseno aproxima la distancia de Hellinger).
+    # Cada píxel pesa según su saturación al cuadrado: platos, manteles y fondos claros apenas cuentan
+    import numpy as np
+    from PIL import Image, ImageOps
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        img.draft("RGB", (size, size))
+        img = ImageOps.exif_transpose(img).convert("RGB")
+        img.thumbnail((size, size))
+        hsv = np.asarray(img.convert("HSV"), dtype=np.uint16).reshape(-1, 3)
+    indices = [(hsv[:, c] * b) >> 8 for c, b in enumerate(bins)]
+    plano = (indices[0] * bins[1] + indices[1]) * bins[2] + indices[2]
+    histograma = np.bincount(plano, weights=(hsv[:, 1] / 255.0) ** 2, minlength=bins[0] * bins[1] * bins[2]).astype(np.float32)
+    histograma = np.sqrt(histograma / max(histograma.sum(), 1.0))
+    return histograma / max(float(np.linalg.norm(histograma)), 1e-12)
+
+
+def load_labelled_folder(path):
+    # carpeta/<alimento>/*.jpg -> [(ruta, bytes, canónico)]; las subcarpetas que no son alimentos se ignoran
+    ejemplos = []
+    for carpeta in sorted(os.listdir(path)):
+        ruta_carpeta = os.path.join(path, carpeta)
+        canonical, _ = get_canonical_food_info(carpeta.replace("_", " "))
+        if not canonical or not os.path.isdir(ruta_carpeta):
+            continue
+        for nombre in sorted(os.listdir(ruta_carpeta)):
+            if nombre.lower().endswith(IMAGE_EXTENSIONS):
+                with open(os.path.join(ruta_carpeta, nombre), "rb") as f:
+                    ejemplos.append((os.path.join(carpeta, nombre), f.read(), canonical))
+    return ejemplos
+
+
+class ColorHistogramDetector(PlantDetector):
+    name = "local"
+
+    def __init__(self, embeddings, labels, k=5, min_score=0.6, max_candidates=3):
+        self.embeddings = embeddings # matriz (n, d) de vectores L2-normalizados
+        self.labels = list(labels) # canónico de cada fila
+        self.k = k
+        self.min_score = min_score
+        self.max_candidates = max_candidates
+        catalogo = get_catalog()
+        self._originales = {c: catalogo.food_details_db[c]["original_name"] for c in set(self.labels) if c in catalogo.food_details_db}
+
+    @classmethod
+    def fit(cls, ejemplos, **kwargs):
+        # ejemplos: [(bytes, canónico)]
+        import numpy as np
+        embeddings = np.stack([embed_image(img) for img, _ in ejemplos])
+        return cls(embeddings, [c for _, c in ejemplos], **kwargs)
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        import numpy as np
+        with np.load(path, allow_pickle=False) as datos:
+            return cls(datos["embeddings"], [str(l) for l in datos["labels"]], **kwargs)
+
+    def save(self, path):
+        import numpy as np
+        with open(path, "wb") as f: # Con un objeto fichero, np.savez no añade ".npz" a la ruta
+            np.savez_compressed(f, embeddings=self.embeddings, labels=np.array(self.labels))
+
+    def rank(self, embedding, exclude=None):
+        # Vecinos más cercanos por coseno; cada alimento puntúa con su mejor vecino entre los k primeros
+        import numpy as np
+        similitudes = self.embeddings @ embedding
+        if exclude is not None:
+            similitudes[exclude] = -1.0
+        vecinos = np.argsort(-similitudes)[:self.k]
+        candidatos = [Candidate(self.labels[i], self._originales.get(self.labels[i], self.labels[i]), float(similitudes[i]), "color")
+                      for i in vecinos if similitudes[i] >= self.min_score]
+        return merge_candidates(candidatos)[:self.max_candidates]
+
+    def detect(self, images):
+        resultados = []
+        for img in images:
+            try:
+                resultados.append((self.rank(embed_image(img)), None))
+            except Exception as e:
+                resultados.append((None, e))
+        return resultados
@@ -0,0 +1,115 @@
+# nutrimind/export.py
+# Exportación de registros por lotes: CSV comprimido con gzip, o Parquet/Feather (columnar, con las columnas
+# repetitivas como categorías). Cada lote se serializa y se escribe antes de leer el siguiente, así nunca se
+# construye el fichero entero como texto en memoria. Parquet y Feather necesitan pyarrow (opcional).
+import gzip
+import importlib.util
+import io
+
+import pandas as pd
+
+from nutrimind.storage import EXPECTED_HEADERS
+
+# formato -> (etiqueta, tipo MIME)
+EXPORT_FORMATS = {
+    "csv.gz": ("CSV comprimido (gzip)", "application/gzip"),
+    "parquet": ("Parquet", "application/vnd.apache.parquet"),
+    "feather": ("Feather (Arrow)", "application/vnd.apache.arrow.file"),
+}
+CATEGORICAL_COLUMNS = ("usuario", "tipo_registro", "ejercicio")
+NUMERIC_COLUMNS = ("sueno", "animo", "diversidad_diaria_plantas")
+DEFAULT_CHUNK_ROWS = 5000
+
+
+def available_formats():
+    if importlib.util.find_spec("pyarrow") is None:
+        return ["csv.gz"]
+    return list(EXPORT_FORMATS)
+
+
+def record_chunks(records, chunk_rows=DEFAULT_CHUNK_ROWS):
+    for i in range(0, len(records), chunk_rows):
+        yield records[i:i + chunk_rows]
+
+
+def _frame(chunk):
+    df = pd.DataFrame(chunk, columns=EXPECTED_HEADERS)
+    for columna in NUMERIC_COLUMNS:
+        df[columna] = pd.to_numeric(df[columna], errors="coerce")
+    return df
+
+
+def write_csv_gz(chunks, fileobj):
+    filas = 0
+    with gzip.GzipFile(fileobj=fileobj, mode="wb") as comprimido:
+        texto = io.TextIOWrapper(comprimido, encoding="utf-8", newline="")
+        for chunk in chunks:
+            _frame(chunk).to_csv(texto, header=filas == 0, index=False)
+            filas += len(chunk)
+        if filas == 0:
+            texto.write(",".join(EXPECTED_HEADERS) + "\n")
+        texto.flush()
+        texto.detach() # Sin cerrar el gzip dos veces
+    return filas
+
+
+def _arrow_schema():
+    import pyarrow as pa
+    tipos = {"fecha": pa.date32(), "sueno": pa.float64(), "animo": pa.int64(), "diversidad_diaria_plantas": pa.int64()}
+    return pa.schema([
+        (c, pa.dictionary(pa.int32(), pa.string()) if c in CATEGORICAL_COLUMNS else tipos.get(c, pa.string()))
+        for c in EXPECTED_HEADERS
+    ])
+
+
+def _arrow_batch(chunk, schema, vocabularios):
+    # Las categorías crecen lote a lote conservando los índices anteriores: en Feather (IPC) el diccionario de
+    # cada lote solo puede ampliar el del anterior (delta), nunca reemplazarlo
+    import pyarrow as pa
+    df = _frame(chunk)
+    df["fecha"] = pd.to_datetime(df["fecha"], errors="coerce").dt.date
+    columnas = []
+    for campo in schema:
+        serie = df[campo.name]
+        if campo.name in CATEGORICAL_COLUMNS:
+            vocabulario = vocabularios.setdefault(campo.name, {})
+            indices = [None if pd.isna(v) else vocabulario.setdefault(str(v), len(vocabulario)) for v in serie]
+            columnas.append(pa.DictionaryArray.from_arrays(pa.array(indices, pa.int32()), pa.array(list(vocabulario), pa.string())))
+        elif campo.type == pa.string():
+            columnas.append(pa.array([None if pd.isna(v) else str(v) for v in serie], pa.string()))
+        else:
+            columnas.append(pa.array(serie.astype(object).where(serie.notna(), None), campo.type))
+    return pa.record_batch(columnas, schema=schema)
+
+
+def write_arrow(chunks, fileobj, fmt):
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+    schema, vocabularios, filas = _arrow_schema(), {}, 0
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(fileobj, schema, compression="zstd")
+    else:
+        writer = ipc.new_file(fileobj, schema, options=ipc.IpcWriteOptions(compression="zstd", emit_dictionary_deltas=True))
+    with writer:
+        for chunk in chunks:
+            if chunk:
+                writer.write_batch(_arrow_batch(chunk, schema, vocabularios))
+                filas += len(chunk)
+    return filas
+
+
+def export_records(chunks, fmt, fileobj):
+    # Escribe los lotes de registros en fileobj; devuelve el número de filas
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Formato de exportación desconocido: {fmt}")
+    if fmt == "csv.gz":
+        return write_csv_gz(chunks, fileobj)
+    return write_arrow(chunks, fileobj, fmt)
+
+
+def export_bytes(records, fmt, chunk_rows=DEFAULT_CHUNK_ROWS):
+    # Contenido del fichero exportado. st.download_button solo acepta str, bytes o ficheros en memoria
+    # (BytesIO): el fichero comprimido se construye entero, pero los registros se serializan por lotes
+    destino = io.BytesIO()
+    export_records(record_chunks(records, chunk_rows), fmt, destino)
+    return destino.getvalue()
@@ -0,0 +1,158 @@
+# nutrimind/fakes.py
+# Dobles locales de servicios externos, para probar y medir la app sin red ni credenciales.
+# secrets.toml: vision_backend = "fake" usa FakeVisionClient en lugar de Google Vision.
+# FakeWorksheet es una hoja de gspread en memoria (benchmarks/app_hot_paths.py la usa con GSheetsBackend).
+import itertools
+import random
+import re
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+
+class FakeVisionError(Exception):
+    # Imita los errores de google.api_core: el código HTTP va en .code
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+def _response(descriptions, error_message=""):
+    return SimpleNamespace(
+        error=SimpleNamespace(message=error_message),
+        label_annotations=[SimpleNamespace(description=d, score=round(0.95 - 0.05 * i, 2)) for i, d in enumerate(descriptions)],
+    )
+
+
+class FakeVisionClient:
+    # Misma interfaz que vision.ImageAnnotatorClient para label_detection y batch_annotate_images.
+    # labels_for(image_bytes) decide las etiquetas; latency (s) y error_rate se aplican por llamada.
+    def __init__(self, labels_for=None, default_labels=("Food", "Vegetable", "Apple", "Broccoli"),
+                 latency=0.0, jitter=0.0, error_rate=0.0, error_code=503, seed=None):
+        self.labels_for = labels_for or (lambda image_bytes: default_labels)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.images = 0
+
+    def _simulate(self, n_images, timeout):
+        with self._lock:
+            self.calls += 1
+            self.images += n_images
+            espera = self.latency + self._random.uniform(0, self.jitter)
+            falla = self._random.random() < self.error_rate
+        if timeout is not None and espera > timeout:
+            time.sleep(timeout)
+            raise FakeVisionError(504, "Deadline Exceeded")
+        time.sleep(espera)
+        if falla:
+            raise FakeVisionError(self.error_code, "Fake Vision error")
+
+    def label_detection(self, image, timeout=None, retry=None, **kwargs):
+        self._simulate(1, timeout)
+        return _response(self.labels_for(image.content))
+
+    def batch_annotate_images(self, requests, timeout=None, retry=None, **kwargs):
+        self._simulate(len(requests), timeout)
+        return SimpleNamespace(responses=[_response(self.labels_for(r.image.content)) for r in requests])
+
+
+_worksheet_ids = itertools.count(1)
+_RANGO_A1 = re.compile(r"^[A-Z]+(\d+)(?::[A-Z]+(\d*))?$")
+
+
+def _celda(valor):
+    # Sheets devuelve todas las celdas como texto
+    return "" if valor is None else str(valor)
+
+
+def _numericise(valor):
+    for tipo in (int, float):
+        try:
+            return tipo(valor)
+        except ValueError:
+            pass
+    return valor
+
+
+class FakeWorksheet:
+    # Subconjunto del worksheet de gspread que usan la app y GSheetsBackend, con las filas en memoria.
+    # latency (s) se añade a cada llamada; calls cuenta las llamadas por método
+    def __init__(self, rows=(), latency=0.0, title="habitos_microbiota"):
+        self.id = next(_worksheet_ids)
+        self.spreadsheet = SimpleNamespace(id=f"fake-spreadsheet-{self.id}")
+        self.title = title
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._rows = [[_celda(v) for v in fila] for fila in rows]
+        self.calls = Counter()
+
+    def _llamada(self, metodo):
+        self.calls[metodo] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    @property
+    def row_count(self):
+        return len(self._rows)
+
+    # --- Lecturas ---
+    def row_values(self, row):
+        self._llamada("row_values")
+        with self._lock:
+            fila = self._rows[row - 1] if 0 < row <= len(self._rows) else []
+            while fila and fila[-1] == "": # Sheets no devuelve las celdas vacías del final
+                fila = fila[:-1]
+            return list(fila)
+
+    def get_all_values(self):
+        self._llamada("get_all_values")
+        with self._lock:
+            return [list(f) for f in self._rows]
+
+    def get_all_records(self):
+        self._llamada("get_all_records")
+        with self._lock:
+            if not self._rows:
+                return []
+            encabezados = self._rows[0]
+            return [dict(zip(encabezados, map(_numericise, f))) for f in self._rows[1:]]
+
+    def batch_get(self, ranges):
+        # Solo rangos de filas completas ("A1:J1", "A5:J"), los que usa IncrementalSheetReader
+        self._llamada("batch_get")
+        resultado = []
+        with self._lock:
+            for rango in ranges:
+                coincidencia = _RANGO_A1.match(rango)
+                if coincidencia is None:
+                    raise ValueError(f"Rango no soportado por FakeWorksheet: {rango}")
+                desde = int(coincidencia.group(1))
+                hasta = int(coincidencia.group(2)) if coincidencia.group(2) else len(self._rows)
+                resultado.append([list(f) for f in self._rows[desde - 1:hasta]])
+        return resultado
+
+    # --- Escrituras ---
+    def append_row(self, values, **kwargs):
+        self._llamada("append_row")
+        with self._lock:
+            self._rows.append([_celda(v) for v in values])
+
+    def append_rows(self, values, **kwargs):
+        self._llamada("append_rows")
+        with self._lock:
+            self._rows.extend([_celda(v) for v in fila] for fila in values)
+
+    def update_cell(self, row, col, value):
+        self._llamada("update_cell")
+        with self._lock:
+            while len(self._rows) < row:
+                self._rows.append([])
+            fila = self._rows[row - 1]
+            fila.extend([""] * (col - len(fila)))
+            fila[col - 1] = _celda(value)
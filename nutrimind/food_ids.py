@@ -0,0 +1,75 @@
+# nutrimind/food_ids.py
+# IDs enteros para los alimentos del catálogo y máscaras de bits por registro.
+# Con ~235 alimentos, un int de Python hace de bitset: uniones con |, intersecciones con & y conteo con popcount.
+import hashlib
+from functools import lru_cache, reduce
+from operator import or_
+
+from nutrimind.catalog import get_catalog
+
+
+def popcount(mask):
+    return bin(mask).count("1")
+
+
+def union_masks(masks):
+    return reduce(or_, masks, 0)
+
+
+class FoodIdTable:
+    def __init__(self, food_db, plant_items, probiotic_items, prebiotic_items):
+        self.names = tuple(food_db) # El orden del catálogo define el ID
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        # La huella identifica la tabla de IDs: si el catálogo cambia, las máscaras guardadas se recalculan
+        self.fingerprint = hashlib.sha1("\n".join(self.names).encode("utf-8")).hexdigest()[:8]
+        self.plant_mask = self.encode(plant_items)
+        self.probiotic_mask = self.encode(probiotic_items)
+        self.prebiotic_mask = self.encode(prebiotic_items)
+
+    def encode(self, names):
+        mask = 0
+        for name in names:
+            food_id = self.ids.get(name)
+            if food_id is not None:
+                mask |= 1 << food_id
+        return mask
+
+    def decode(self, mask):
+        names = []
+        while mask:
+            low_bit = mask & -mask
+            names.append(self.names[low_bit.bit_length() - 1])
+            mask ^= low_bit
+        return names
+
+    def encode_csv(self, comida_normalizada_canonica):
+        return self.encode(i.strip() for i in str(comida_normalizada_canonica or "").split(","))
+
+    def to_column(self, mask):
+        return f"{self.fingerprint}:{mask:x}"
+
+    def from_column(self, value, comida_normalizada_canonica=""):
+        # Valor de la columna mascara_alimentos; si falta o es de otra versión del catálogo, se recalcula
+        prefijo, _, hex_mask = str(value or "").partition(":")
+        if prefijo == self.fingerprint and hex_mask:
+            try:
+                return int(hex_mask, 16)
+            except ValueError:
+                pass
+        return self.encode_csv(comida_normalizada_canonica)
+
+    def record_mask(self, record):
+        return self.from_column(record.get("mascara_alimentos"), record.get("comida_normalizada_canonica"))
+
+    def count_plants(self, mask):
+        return popcount(mask & self.plant_mask)
+
+    def plants(self, mask):
+        return self.decode(mask & self.plant_mask)
+
+
+@lru_cache(maxsize=1)
+def get_food_ids():
+    catalogo = get_catalog()
+    return FoodIdTable(catalogo.food_details_db, catalogo.normalized_plant_food_items,
+                       catalogo.normalized_probiotic_foods, catalogo.normalized_prebiotic_foods)
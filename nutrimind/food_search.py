@@ -0,0 +1,149 @@
+# nutrimind/food_search.py
+# Índice de búsqueda sobre el catálogo: nombres, alias, sinónimos y tags.
+# Un trie resuelve prefijos (también por palabra: "blanca" -> "Judía Blanca (Alubia)") y un índice
+# de trigramas tolera erratas ("manzanna" -> "Manzana"). Se construye una vez por proceso.
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from nutrimind.catalog import get_catalog, normalize_text
+
+FoodMatch = namedtuple("FoodMatch", ["canonical", "original_name", "score", "via"])
+
+# Puntuaciones por tipo de coincidencia; los trigramas puntúan con su coeficiente de Dice (0-1)
+SCORE_EXACT = 1.0
+SCORE_PREFIX = 0.9
+SCORE_WORD_PREFIX = 0.8
+SCORE_TAG = 0.5
+MIN_NGRAM_SCORE = 0.5 # Por debajo no se ofrece como candidato
+MIN_RESOLVE_SCORE = 0.75 # Mínimo para resolver sin intervención del usuario
+MIN_RESOLVE_MARGIN = 0.05 # Ventaja mínima sobre el siguiente alimento para no resolver a ciegas
+MIN_PREFIX_LEN = 3
+MIN_WORD_PREFIX_LEN = 4 # Prefijos a mitad de nombre: "nut" no debe llevar a "levadura nutricional"
+
+_PARENTESIS = re.compile(r"\s*\(([^)]*)\)\s*")
+
+
+def _alias(original_name):
+    # "Judía Blanca (Alubia)" -> "judia blanca (alubia)", "judia blanca", "alubia"
+    # "Miso (no pasteurizado)" -> ..., "miso" (las aclaraciones tipo "no/sin/con ..." no son alias)
+    completo = normalize_text(original_name)
+    alias = {completo}
+    sin_parentesis = _PARENTESIS.sub(" ", completo).strip()
+    if sin_parentesis:
+        alias.add(sin_parentesis)
+    for contenido in _PARENTESIS.findall(completo):
+        contenido = contenido.strip()
+        if contenido and "," not in contenido and contenido.split()[0] not in ("no", "sin", "con"):
+            alias.add(contenido)
+    return alias
+
+
+def trigrams(key):
+    padded = f" {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FoodSearchIndex:
+    def __init__(self, catalogo):
+        self.catalogo = catalogo
+        self._exact = {} # clave normalizada -> (canónico, vía)
+        for norm_name in catalogo.food_details_db:
+            self._exact[norm_name] = (norm_name, "nombre")
+        for norm_name, data in catalogo.food_details_db.items():
+            for alias in _alias(data["original_name"]):
+                self._exact.setdefault(alias, (norm_name, "alias"))
+        for sinonimo, canonico in catalogo.food_synonyms_map.items():
+            if canonico in catalogo.food_details_db:
+                self._exact.setdefault(sinonimo, (canonico, "sinonimo"))
+
+        self._tags = {}
+        for norm_name, data in catalogo.food_details_db.items():
+            for tag in data.get("tags", ()):
+                self._tags.setdefault(normalize_text(tag), set()).add(norm_name)
+
+        # Trie de dicts: cada nodo guarda en "" los (canónico, es_inicio_de_clave) que pasan por él
+        self._trie = {}
+        for key, (canonico, _) in self._exact.items():
+            for inicio in [0] + [m.end() for m in re.finditer(r"\s+", key)]:
+                nodo = self._trie
+                for char in key[inicio:]:
+                    nodo = nodo.setdefault(char, {})
+                    nodo.setdefault("", set()).add((canonico, inicio == 0))
+
+        self._keys = list(self._exact)
+        self._key_grams = [trigrams(k) for k in self._keys]
+        self._ngram_index = {}
+        for i, grams in enumerate(self._key_grams):
+            for gram in grams:
+                self._ngram_index.setdefault(gram, []).append(i)
+
+    def _original(self, canonico):
+        return self.catalogo.food_details_db[canonico]["original_name"]
+
+    def prefix(self, normalized):
+        nodo = self._trie
+        for char in normalized:
+            nodo = nodo.get(char)
+            if nodo is None:
+                return set()
+        return nodo.get("", set())
+
+    def fuzzy(self, normalized):
+        # Coeficiente de Dice sobre trigramas, contando solo las claves que comparten algún trigrama
+        grams = trigrams(normalized)
+        compartidos = {}
+        for gram in grams:
+            for i in self._ngram_index.get(gram, ()):
+                compartidos[i] = compartidos.get(i, 0) + 1
+        resultado = {}
+        for i, n in compartidos.items():
+            dice = 2 * n / (len(grams) + len(self._key_grams[i]))
+            if dice >= MIN_NGRAM_SCORE:
+                canonico = self._exact[self._keys[i]][0]
+                resultado[canonico] = max(dice, resultado.get(canonico, 0.0))
+        return resultado
+
+    def search(self, query, limit=5):
+        normalized = normalize_text(query)
+        if not normalized:
+            return []
+        mejores = {} # canónico -> (puntuación, vía)
+
+        def proponer(canonico, score, via):
+            if score > mejores.get(canonico, (0.0, ""))[0]:
+                mejores[canonico] = (score, via)
+
+        exacto = self._exact.get(normalized)
+        if exacto:
+            proponer(exacto[0], SCORE_EXACT, exacto[1])
+        if len(normalized) >= MIN_PREFIX_LEN:
+            for canonico, desde_inicio in self.prefix(normalized):
+                if not desde_inicio and len(normalized) < MIN_WORD_PREFIX_LEN:
+                    continue
+                proponer(canonico, SCORE_PREFIX if desde_inicio else SCORE_WORD_PREFIX, "prefijo")
+        for canonico in self._tags.get(normalized, ()):
+            proponer(canonico, SCORE_TAG, "tag")
+        for canonico, dice in self.fuzzy(normalized).items():
+            proponer(canonico, dice, "ngram")
+
+        ordenados = sorted(mejores.items(), key=lambda kv: (-kv[1][0], self._original(kv[0])))
+        return [FoodMatch(c, self._original(c), round(s, 3), via) for c, (s, via) in ordenados[:limit]]
+
+    def resolve(self, query):
+        # (canónico, nombre original) si hay un alimento claro; (None, None) si no
+        normalized = normalize_text(query)
+        exacto = self._exact.get(normalized)
+        if exacto:
+            return exacto[0], self._original(exacto[0])
+        candidatos = [c for c in self.search(normalized, limit=3) if c.via != "tag"]
+        if not candidatos or candidatos[0].score < MIN_RESOLVE_SCORE:
+            return None, None
+        if len(candidatos) > 1 and candidatos[0].score - candidatos[1].score < MIN_RESOLVE_MARGIN:
+            return None, None
+        return candidatos[0].canonical, candidatos[0].original_name
+
+
+@lru_cache(maxsize=1)
+def get_food_search_index():
+    return FoodSearchIndex(get_catalog())
@@ -0,0 +1,43 @@
+# nutrimind/images.py
+# Preparación de fotos antes de enviarlas a Vision y de mostrarlas: decodificar, enderezar según EXIF,
+# reducir y recodificar en JPEG. Para LABEL_DETECTION Google recomienda 640x480; más resolución
+# solo añade bytes de subida y latencia.
+import io
+from collections import namedtuple
+
+DETECT_MAX_SIDE = 640
+THUMBNAIL_MAX_SIDE = 320
+JPEG_QUALITY = 85
+
+PreparedImage = namedtuple("PreparedImage", [
+    "detect_bytes", "thumbnail_bytes", "original_size", "detect_size", "original_bytes_len",
+])
+
+
+def _jpeg(img, quality):
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def prepare_image(raw_bytes, max_side=DETECT_MAX_SIDE, thumbnail_side=THUMBNAIL_MAX_SIDE, quality=JPEG_QUALITY):
+    # Si la imagen no se puede decodificar se devuelven los bytes originales: Vision dará su propio error
+    from PIL import Image, ImageOps
+    try:
+        with Image.open(io.BytesIO(raw_bytes)) as img:
+            original_size = img.size
+            img.draft("RGB", (max_side, max_side)) # Los JPEG se decodifican ya a escala reducida (mucho más rápido)
+            img = ImageOps.exif_transpose(img)
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+            img.thumbnail((max_side, max_side), Image.LANCZOS)
+            detect_bytes = _jpeg(img, quality)
+            # No se reenvían imágenes más pesadas que el original (p. ej. fotos ya pequeñas)
+            if len(detect_bytes) >= len(raw_bytes) and max(original_size) <= max_side:
+                detect_bytes = raw_bytes
+            detect_size = img.size
+            img.thumbnail((thumbnail_side, thumbnail_side), Image.LANCZOS)
+            thumbnail_bytes = _jpeg(img, quality)
+    except Exception:
+        return PreparedImage(raw_bytes, raw_bytes, None, None, len(raw_bytes))
+    return PreparedImage(detect_bytes, thumbnail_bytes, original_size, detect_size, len(raw_bytes))
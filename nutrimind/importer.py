@@ -0,0 +1,135 @@
+# nutrimind/importer.py
+# Importación masiva de históricos en CSV con el formato de EXPECTED_HEADERS (o el antiguo, sin mascara_alimentos):
+#   python -m nutrimind import-csv habitos.csv --sqlite nutrimind.sqlite
+# El CSV se lee por lotes (pandas chunksize). Cada registro diario se vuelve a canonizar con el catálogo actual,
+# como hace guardar_registro, y se recalculan diversidad y máscara. Se saltan las claves (usuario, fecha,
+# tipo_registro) ya guardadas en el backend y las filas idénticas repetidas en el fichero (un mismo día puede
+# tener varios registros diarios, como los que escribe la app), y cada lote se escribe con un único append_rows.
+import time
+from collections import Counter
+from functools import lru_cache
+
+import pandas as pd
+
+from nutrimind.catalog import get_canonical_food_info, normalize_text
+from nutrimind.food_ids import get_food_ids
+from nutrimind.storage import EXPECTED_HEADERS, LEGACY_HEADERS
+
+DEFAULT_CHUNK_ROWS = 10000
+
+
+def canonicalize_foods(items, resolver=get_canonical_food_info):
+    # (comida_original, comida_normalizada_canonica, máscara, no reconocidos) de una lista de alimentos escritos
+    originales, canonicos, no_reconocidos = set(), set(), []
+    for item in items:
+        item = str(item).strip()
+        if not item:
+            continue
+        norm_canonical, original_canonical = resolver(item)
+        if norm_canonical and original_canonical:
+            originales.add(original_canonical)
+            canonicos.add(norm_canonical)
+        else:
+            originales.add(item) # Se guarda tal cual, pero no cuenta para la diversidad
+            no_reconocidos.append(item)
+    mascara = get_food_ids().encode(canonicos)
+    return ", ".join(sorted(originales)), ", ".join(sorted(canonicos)), mascara, no_reconocidos
+
+
+def _normalizar_lote(chunk):
+    # Columnas del lote en bloque (parsear fechas fila a fila domina el tiempo de importación)
+    chunk = chunk.reindex(columns=EXPECTED_HEADERS, fill_value="")
+    fechas = pd.to_datetime(chunk["fecha"].str.strip(), errors="coerce", format="ISO8601")
+    chunk["fecha"] = fechas.dt.strftime('%Y-%m-%d').where(fechas.notna(), "")
+    # El usuario se normaliza como en el acceso de la app (normalize_text): "José" se guarda y se lee como "jose"
+    chunk["usuario"] = [normalize_text(u) for u in chunk["usuario"]]
+    chunk["tipo_registro"] = chunk["tipo_registro"].str.strip()
+    for columna in ("sueno", "animo", "diversidad_diaria_plantas"):
+        numeros = pd.to_numeric(chunk[columna], errors="coerce")
+        chunk[columna] = numeros.astype(object).where(numeros.notna(), None)
+    chunk["animo"] = [None if v is None else int(v) for v in chunk["animo"]]
+    chunk["diversidad_diaria_plantas"] = [None if v is None else int(v) for v in chunk["diversidad_diaria_plantas"]]
+    return chunk
+
+
+class ImportReport:
+    def __init__(self):
+        self.read = 0
+        self.imported = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.unrecognized = Counter()
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.read / self.elapsed if self.elapsed else 0.0
+
+
+class CsvImporter:
+    def __init__(self, backend, chunk_rows=DEFAULT_CHUNK_ROWS, dry_run=False):
+        self.backend = backend
+        self.chunk_rows = chunk_rows
+        self.dry_run = dry_run
+        self.food_ids = get_food_ids()
+        # Un historial repite mucho los mismos alimentos: cada texto distinto se resuelve una sola vez
+        self._resolver = lru_cache(maxsize=None)(get_canonical_food_info)
+
+    def existing_keys(self):
+        claves = set()
+        for chunk in self.backend.iter_records(chunk_size=self.chunk_rows):
+            # Normalizado también aquí: importaciones anteriores guardaban el usuario tal cual
+            claves.update((normalize_text(r["usuario"]), str(r["fecha"])[:10], r["tipo_registro"]) for r in chunk)
+        return claves
+
+    def convert(self, record, informe):
+        # Fila lista para append_rows a partir de un registro ya pasado por _normalizar_lote
+        fila = [record[h] for h in EXPECTED_HEADERS]
+        if record["tipo_registro"] == "registro_diario":
+            original, canonica, mascara, no_reconocidos = canonicalize_foods(str(fila[2]).split(","), self._resolver)
+            informe.unrecognized.update(no_reconocidos)
+            fila[2], fila[3] = original, canonica
+            fila[7] = self.food_ids.count_plants(mascara)
+            fila[9] = self.food_ids.to_column(mascara)
+        else:
+            fila[9] = ""
+        return fila
+
+    def run(self, path):
+        informe = ImportReport()
+        claves = self.existing_keys() # Solo lo guardado antes de importar
+        vistas = set() # Filas canónicas ya importadas de este fichero
+        lector = pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=self.chunk_rows)
+        for chunk in lector:
+            if list(chunk.columns) not in (EXPECTED_HEADERS, LEGACY_HEADERS):
+                raise ValueError(f"Cabeceras inesperadas en {path}: {list(chunk.columns)}")
+            filas = []
+            for record in _normalizar_lote(chunk).to_dict("records"):
+                informe.read += 1
+                clave = (record["usuario"], record["fecha"], record["tipo_registro"])
+                if not all(clave): # Sin usuario, tipo o fecha válida
+                    informe.invalid += 1
+                    continue
+                if clave in claves:
+                    informe.duplicates += 1
+                    continue
+                fila = self.convert(record, informe)
+                canonica = tuple(map(str, fila))
+                if canonica in vistas:
+                    informe.duplicates += 1
+                    continue
+                vistas.add(canonica)
+                filas.append(fila)
+            if filas and not self.dry_run:
+                self.backend.append_rows(filas)
+            informe.imported += len(filas)
+        informe.elapsed = time.perf_counter() - informe.started
+        return informe
+
+
+def import_csv(backend, path, chunk_rows=DEFAULT_CHUNK_ROWS, dry_run=False):
+    try:
+        return CsvImporter(backend, chunk_rows, dry_run).run(path)
+    except pd.errors.EmptyDataError: # Fichero vacío, sin cabeceras
+        return ImportReport()
@@ -0,0 +1,156 @@
+# nutrimind/mood_models.py
+# Modelos de ánimo sin reentrenar en cada rerun.
+#  - Regresión lineal online: por usuario se guardan los estadísticos suficientes XᵀX y Xᵀy
+#    (con columna de intercepto). guardar_registro los actualiza en O(1) y los coeficientes salen
+#    de resolver un sistema 3x3, sea cual sea la longitud del historial.
+#    Como los agregados semanales, los estadísticos de un usuario caducan a los `max_age` segundos y se
+#    rematerializan desde sus filas (así entran las escritas por otros procesos).
+#  - Huella de datos (data_fingerprint) para cachear modelos que sí necesitan todas las filas (KMeans).
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+FEATURES = ("sueno", "diversidad_diaria_plantas")
+TARGET = "animo"
+MIN_ROWS = 4 # Igual que antes: el modelo necesita más de 3 registros completos
+
+
+def _numero(valor):
+    try:
+        numero = float(valor)
+    except (TypeError, ValueError):
+        return None
+    return None if numero != numero else numero # NaN
+
+
+def mood_row(record):
+    # (x, y) de un registro diario, o None si le falta el sueño o el ánimo (diversidad vacía cuenta como 0)
+    if record.get("tipo_registro") != "registro_diario":
+        return None
+    sueno, animo = _numero(record.get("sueno")), _numero(record.get(TARGET))
+    if sueno is None or animo is None:
+        return None
+    diversidad = _numero(record.get("diversidad_diaria_plantas")) or 0.0
+    return (sueno, diversidad), animo
+
+
+class OnlineLinearRegression:
+    def __init__(self, n_features=len(FEATURES), xtx=None, xty=None, n=0):
+        d = n_features + 1 # + intercepto
+        self.xtx = np.zeros((d, d)) if xtx is None else np.asarray(xtx, dtype=float)
+        self.xty = np.zeros(d) if xty is None else np.asarray(xty, dtype=float)
+        self.n = n
+
+    def update(self, x, y):
+        fila = np.append(np.asarray(x, dtype=float), 1.0)
+        self.xtx += np.outer(fila, fila)
+        self.xty += fila * y
+        self.n += 1
+
+    def coefficients(self):
+        # (coeficientes, intercepto) por mínimos cuadrados, o None con pocos datos.
+        # lstsq da la solución de norma mínima si el sistema es singular (p. ej. siempre las mismas horas de sueño)
+        if self.n < MIN_ROWS:
+            return None
+        solucion = np.linalg.lstsq(self.xtx, self.xty, rcond=None)[0]
+        return solucion[:-1], float(solucion[-1])
+
+    def to_json(self):
+        return json.dumps({"xtx": self.xtx.tolist(), "xty": self.xty.tolist(), "n": self.n})
+
+    @classmethod
+    def from_json(cls, texto):
+        datos = json.loads(texto)
+        return cls(len(datos["xty"]) - 1, datos["xtx"], datos["xty"], datos["n"])
+
+
+class MoodRegressionStore:
+    # Estadísticos por usuario en SQLite (junto a los agregados semanales)
+    def __init__(self, path="nutrimind_agregados.sqlite", max_age=None):
+        self.path = path
+        self.max_age = max_age # Segundos; None: los estadísticos materializados no caducan
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS regresion_animo ("
+                " usuario TEXT PRIMARY KEY, estadisticos TEXT NOT NULL, materializado_en REAL NOT NULL DEFAULT 0) WITHOUT ROWID"
+            )
+            columnas = {c[1] for c in self._conn.execute("PRAGMA table_info(regresion_animo)")}
+            if "materializado_en" not in columnas: # Bases de datos anteriores: sus estadísticos cuentan como caducados
+                self._conn.execute("ALTER TABLE regresion_animo ADD COLUMN materializado_en REAL NOT NULL DEFAULT 0")
+
+    def get(self, usuario):
+        # None si el usuario no está materializado o sus estadísticos han caducado
+        with self._lock:
+            fila = self._conn.execute(
+                "SELECT estadisticos, materializado_en FROM regresion_animo WHERE usuario = ?", (usuario,)
+            ).fetchone()
+        if fila is None or (self.max_age is not None and time.time() - fila[1] > self.max_age):
+            return None
+        return OnlineLinearRegression.from_json(fila[0])
+
+    def add(self, usuario, record):
+        # Actualización O(1) al guardar un registro; si el usuario aún no está materializado no hace nada
+        # (la materialización leerá también esta fila). Si la escritura acaba fallando: invalidate
+        fila = mood_row(record)
+        if fila is None:
+            return
+        with self._lock, self._conn:
+            actual = self._conn.execute("SELECT estadisticos FROM regresion_animo WHERE usuario = ?", (usuario,)).fetchone()
+            if actual is None:
+                return
+            modelo = OnlineLinearRegression.from_json(actual[0])
+            modelo.update(*fila)
+            self._conn.execute("UPDATE regresion_animo SET estadisticos = ? WHERE usuario = ?", (modelo.to_json(), usuario))
+
+    def materialize(self, usuario, records):
+        modelo = OnlineLinearRegression()
+        for record in records:
+            fila = mood_row(record)
+            if fila is not None:
+                modelo.update(*fila)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO regresion_animo (usuario, estadisticos, materializado_en) VALUES (?, ?, ?)",
+                (usuario, modelo.to_json(), time.time()),
+            )
+        return modelo
+
+    def invalidate(self, usuario):
+        # Los estadísticos del usuario se rematerializarán en la próxima consulta
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM regresion_animo WHERE usuario = ?", (usuario,))
+
+    def rebuild(self, records):
+        # Regenera los estadísticos de todos los usuarios desde las filas originales
+        modelos = {}
+        for record in records:
+            fila = mood_row(record)
+            if fila is not None:
+                modelos.setdefault(record.get("usuario"), OnlineLinearRegression()).update(*fila)
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM regresion_animo")
+            ahora = time.time()
+            self._conn.executemany(
+                "INSERT INTO regresion_animo (usuario, estadisticos, materializado_en) VALUES (?, ?, ?)",
+                [(u, m.to_json(), ahora) for u, m in modelos.items()],
+            )
+        return len(modelos)
+
+    def get_or_build(self, storage, usuario):
+        modelo = self.get(usuario)
+        if modelo is None:
+            modelo = self.materialize(usuario, storage.get_records(usuario=usuario, tipo_registro="registro_diario"))
+        return modelo
+
+
+def data_fingerprint(df, columns):
+    # Huella estable del contenido de las columnas: cambia si cambia cualquier fila
+    import pandas as pd
+    hashes = pd.util.hash_pandas_object(df[list(columns)], index=False).to_numpy()
+    return hashlib.sha1(hashes.tobytes()).hexdigest()
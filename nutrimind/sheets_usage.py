@@ -0,0 +1,152 @@
+# nutrimind/sheets_usage.py
+# Contabilidad y presupuesto de llamadas a la API de Google Sheets.
+#  - InstrumentedWorksheet envuelve el worksheet de gspread: cada lectura o escritura cuenta llamadas, bytes
+#    aproximados y latencia, en total, por usuario y por rerun de Streamlit (SheetsUsage.start_rerun).
+#  - TokenBucket aplica la cuota por minuto de Google (por defecto 60 lecturas y 60 escrituras por minuto y
+#    usuario; la cuenta de servicio es un único usuario). Sin fichas se espera un poco y después se lanza
+#    SheetsBudgetExceeded, que la cola de escritura trata como un 429 y reintenta.
+import contextvars
+import threading
+import time
+from collections import Counter
+
+READ_METHODS = frozenset({"row_values", "col_values", "get_all_values", "get_all_records", "get_values", "batch_get", "get", "acell", "cell"})
+WRITE_METHODS = frozenset({"append_row", "append_rows", "update", "update_cell", "batch_update", "insert_row", "insert_rows", "delete_rows"})
+DEFAULT_READS_PER_MINUTE = 60
+DEFAULT_WRITES_PER_MINUTE = 60
+DEFAULT_WAIT = 2.0 # Segundos que una llamada puede esperar una ficha antes de fallar
+BACKGROUND_USER = "(segundo plano)"
+
+_rerun_actual = contextvars.ContextVar("nutrimind_sheets_rerun", default=(None, None))
+
+
+class SheetsBudgetExceeded(Exception):
+    code = 429 # is_retryable_error lo trata como el 429 de cuota de Google
+
+
+class TokenBucket:
+    def __init__(self, per_minute, capacity=None, clock=time.monotonic):
+        self.rate = per_minute / 60.0 # Fichas por segundo
+        self.capacity = float(capacity if capacity is not None else per_minute)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._updated = clock()
+
+    def _refill(self):
+        ahora = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (ahora - self._updated) * self.rate)
+        self._updated = ahora
+
+    @property
+    def available(self):
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def try_acquire(self, n=1):
+        with self._lock:
+            self._refill()
+            if self._tokens >= n:
+                self._tokens -= n
+                return True
+            return False
+
+    def acquire(self, n=1, timeout=DEFAULT_WAIT):
+        limite = time.monotonic() + timeout
+        while not self.try_acquire(n):
+            with self._lock:
+                espera = (n - self._tokens) / self.rate if self.rate else float("inf")
+            if time.monotonic() + espera > limite:
+                raise SheetsBudgetExceeded(f"Presupuesto de llamadas a Google Sheets agotado (reintenta en {espera:.1f} s)")
+            time.sleep(espera)
+
+
+class CallStats:
+    def __init__(self):
+        self.calls = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.errors = 0
+        self.by_method = Counter()
+
+    def add(self, method, nbytes, seconds, error=False):
+        self.calls += 1
+        self.bytes += nbytes
+        self.seconds += seconds
+        self.errors += error
+        self.by_method[method] += 1
+
+    def snapshot(self):
+        return {"calls": self.calls, "bytes": self.bytes, "latency_ms": round(self.seconds * 1000, 1),
+                "errors": self.errors, "by_method": dict(self.by_method)}
+
+
+class SheetsUsage:
+    # Uno por proceso: totales, por usuario y del rerun en curso (una variable de contexto por hilo de script)
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.total = CallStats()
+        self.per_user = {}
+
+    def start_rerun(self, usuario):
+        rerun = CallStats()
+        _rerun_actual.set((usuario, rerun))
+        return rerun
+
+    def current_rerun(self):
+        return _rerun_actual.get()[1]
+
+    def record(self, method, nbytes, seconds, error=False):
+        usuario, rerun = _rerun_actual.get()
+        with self._lock:
+            self.total.add(method, nbytes, seconds, error)
+            self.per_user.setdefault(usuario or BACKGROUND_USER, CallStats()).add(method, nbytes, seconds, error)
+            if rerun is not None:
+                rerun.add(method, nbytes, seconds, error)
+
+    def snapshot(self):
+        with self._lock:
+            return {"total": self.total.snapshot(), "per_user": {u: s.snapshot() for u, s in self.per_user.items()}}
+
+
+def approx_bytes(valor):
+    # Tamaño aproximado del contenido (celdas como texto), sin serializar la respuesta
+    if isinstance(valor, dict):
+        return sum(approx_bytes(k) + approx_bytes(v) for k, v in valor.items())
+    if isinstance(valor, (list, tuple)):
+        return sum(approx_bytes(v) for v in valor)
+    return 0 if valor is None else len(str(valor))
+
+
+class InstrumentedWorksheet:
+    # Mismo uso que el worksheet de gspread; lo que no es una llamada a la API se delega sin tocar
+    def __init__(self, worksheet, usage, read_bucket=None, write_bucket=None, wait=DEFAULT_WAIT):
+        self.worksheet = worksheet
+        self.usage = usage
+        self.read_bucket = read_bucket
+        self.write_bucket = write_bucket
+        self.wait = wait
+
+    def __getattr__(self, name):
+        atributo = getattr(self.worksheet, name)
+        if name in READ_METHODS:
+            bucket, lectura = self.read_bucket, True
+        elif name in WRITE_METHODS:
+            bucket, lectura = self.write_bucket, False
+        else:
+            return atributo
+
+        def llamada(*args, **kwargs):
+            if bucket is not None:
+                bucket.acquire(timeout=self.wait)
+            inicio = time.monotonic()
+            try:
+                resultado = atributo(*args, **kwargs)
+            except Exception:
+                self.usage.record(name, 0, time.monotonic() - inicio, error=True)
+                raise
+            nbytes = approx_bytes(resultado) if lectura else approx_bytes([args, kwargs])
+            self.usage.record(name, nbytes, time.monotonic() - inicio)
+            return resultado
+        return llamada
@@ -0,0 +1,318 @@
+# nutrimind/storage.py
+# Backends de almacenamiento para los registros de hábitos.
+# La app habla siempre con un StorageBackend; la hoja de Google y SQLite son dos implementaciones.
+import sqlite3
+import sys
+import threading
+import time
+
+EXPECTED_HEADERS = ["usuario", "fecha", "comida_original", "comida_normalizada_canonica", "sueno", "ejercicio", "animo", "diversidad_diaria_plantas", "tipo_registro", "mascara_alimentos"]
+# Columnas añadidas después de crear la hoja: se agregan al final para no mover los datos existentes
+LEGACY_HEADERS = EXPECTED_HEADERS[:9]
+
+
+def is_gspread_error(error, name="GSpreadException"):
+    # gspread se importa solo al usar la hoja; si no se ha importado, el error no puede venir de ahí
+    gspread = sys.modules.get("gspread")
+    return gspread is not None and isinstance(error, getattr(gspread.exceptions, name))
+
+
+def _completar_fila(row, default=""):
+    row = list(row)
+    return (row + [default] * len(EXPECTED_HEADERS))[:len(EXPECTED_HEADERS)]
+
+
+def _fecha_str(fecha):
+    # Las fechas se guardan como texto 'YYYY-MM-DD', así las comparaciones de texto respetan el orden cronológico
+    if fecha is None:
+        return None
+    if hasattr(fecha, "strftime"):
+        return fecha.strftime('%Y-%m-%d')
+    return str(fecha)
+
+
+def _coincide(record, usuario, desde, hasta, tipo_registro):
+    if usuario is not None and record.get("usuario") != usuario:
+        return False
+    if tipo_registro is not None and record.get("tipo_registro") != tipo_registro:
+        return False
+    fecha = str(record.get("fecha", ""))
+    if desde is not None and fecha < desde:
+        return False
+    if hasta is not None and fecha > hasta:
+        return False
+    return True
+
+
+class StorageBackend:
+    # Interfaz común. Los registros son dicts con las claves de EXPECTED_HEADERS.
+    name = "base"
+
+    def ensure_headers(self):
+        pass
+
+    def append_rows(self, rows):
+        raise NotImplementedError
+
+    def append_row(self, row):
+        self.append_rows([row])
+
+    def get_records(self, usuario=None, desde=None, hasta=None, tipo_registro=None):
+        raise NotImplementedError
+
+    def get_all_records(self):
+        return self.get_records()
+
+    def iter_records(self, tipo_registro=None, chunk_size=10000):
+        # Lotes de registros para tareas por lotes sobre todos los usuarios; por defecto, troceando get_records
+        records = self.get_records(tipo_registro=tipo_registro)
+        for i in range(0, len(records), chunk_size):
+            yield records[i:i + chunk_size]
+
+
+# --- Lector incremental de la hoja (la hoja es, en la práctica, solo de añadir filas) ---
+# Caché por proceso: los lectores sobreviven a los reruns de Streamlit y a la renovación del worksheet cacheado
+_incremental_readers = {}
+_incremental_readers_lock = threading.Lock()
+
+
+class IncrementalSheetReader:
+    def __init__(self, worksheet, full_reload_after=600, min_refresh_interval=2.0):
+        self.worksheet = worksheet
+        self.full_reload_after = full_reload_after # Las ediciones en mitad de la hoja solo se ven con una recarga completa
+        # Un rerun llama varias veces a get_records: dentro de este intervalo se sirven las filas ya leídas sin
+        # llamar a la API. Las escrituras de este proceso (mark_stale) fuerzan la siguiente lectura
+        self.min_refresh_interval = min_refresh_interval
+        self._lock = threading.Lock()
+        self._last_refresh = None
+        self._reset()
+
+    def _reset(self):
+        self.headers = None
+        from gspread.utils import rowcol_to_a1 # Solo el backend de la hoja necesita gspread
+        self._last_col = rowcol_to_a1(1, len(EXPECTED_HEADERS)).rstrip("0123456789")
+        self._raw_rows = [] # Filas tal cual (sin encabezado), para detectar cambios en la última fila conocida
+        self.records = []
+        self._indices_por_usuario = {}
+        self._last_full_reload = 0.0
+
+    def _append_parsed(self, raw_rows):
+        from gspread.utils import numericise_all
+        n_cols = len(self.headers)
+        for raw in raw_rows:
+            raw = (list(raw) + [""] * n_cols)[:n_cols]
+            self._raw_rows.append(raw)
+            if not any(str(v).strip() for v in raw):
+                continue
+            record = dict(zip(self.headers, numericise_all(raw, default_blank="")))
+            self._indices_por_usuario.setdefault(record.get("usuario"), []).append(len(self.records))
+            self.records.append(record)
+
+    def _full_reload(self):
+        all_values = self.worksheet.get_all_values()
+        self._reset()
+        self.headers = all_values[0] if all_values else []
+        if self.headers:
+            from gspread.utils import rowcol_to_a1
+            self._last_col = rowcol_to_a1(1, len(self.headers)).rstrip("0123456789")
+        self._append_parsed(all_values[1:])
+        self._last_full_reload = time.monotonic()
+
+    def mark_stale(self):
+        with self._lock:
+            self._last_refresh = None
+
+    def refresh(self):
+        with self._lock:
+            ahora = time.monotonic()
+            if self._last_refresh is not None and ahora - self._last_refresh < self.min_refresh_interval:
+                return
+            self._refresh()
+            self._last_refresh = ahora # Solo si la lectura salió bien
+
+    def _refresh(self):
+        # Una sola llamada batch_get: encabezado, última fila conocida y todo lo que haya después
+        if self.headers is None or not self.headers or time.monotonic() - self._last_full_reload > self.full_reload_after:
+            self._full_reload()
+            return
+        ultima = len(self._raw_rows) + 1 # Índice en la hoja de la última fila leída (la fila 1 es el encabezado)
+        rangos = [f"A1:{self._last_col}1", f"A{ultima}:{self._last_col}{ultima}", f"A{ultima + 1}:{self._last_col}"]
+        try:
+            header_range, last_range, new_range = self.worksheet.batch_get(rangos)
+        except Exception as e:
+            if not is_gspread_error(e, "APIError"):
+                raise
+            # Si la última fila leída es también la última de la cuadrícula, el rango de filas nuevas no existe
+            if 'exceeds grid limits' not in str(e).lower():
+                raise
+            header_range, last_range = self.worksheet.batch_get(rangos[:2])
+            new_range = []
+        headers = list(header_range[0]) if header_range else []
+        last_row = list(last_range[0]) if last_range else []
+        last_row += [""] * (len(self.headers) - len(last_row))
+        if headers != self.headers or (self._raw_rows and last_row != self._raw_rows[-1]):
+            # Se editaron o borraron filas: la posición ya no es fiable
+            self._full_reload()
+            return
+        self._append_parsed(new_range)
+
+    def get_records(self, usuario=None):
+        self.refresh()
+        with self._lock:
+            if usuario is None:
+                return list(self.records)
+            return [self.records[i] for i in self._indices_por_usuario.get(usuario, [])]
+
+
+def get_incremental_reader(worksheet):
+    key = (worksheet.spreadsheet.id, worksheet.id)
+    with _incremental_readers_lock:
+        reader = _incremental_readers.get(key)
+        if reader is None:
+            reader = _incremental_readers[key] = IncrementalSheetReader(worksheet)
+        else:
+            reader.worksheet = worksheet
+        return reader
+
+
+# --- Backend Google Sheets (hoja "habitos_microbiota") ---
+# Hojas cuyos encabezados ya se validaron en este proceso: la comprobación no se repite en cada rerun
+_headers_checked = set()
+_headers_checked_lock = threading.Lock()
+
+
+class GSheetsBackend(StorageBackend):
+    name = "gsheets"
+
+    def __init__(self, worksheet):
+        self.worksheet = worksheet
+        self.reader = get_incremental_reader(worksheet)
+
+    def ensure_headers(self):
+        key = (self.worksheet.spreadsheet.id, self.worksheet.id)
+        with _headers_checked_lock:
+            if key in _headers_checked:
+                return "ok"
+        headers = self.worksheet.row_values(1)
+        if headers == EXPECTED_HEADERS:
+            estado = "ok"
+        elif not headers:
+            self.worksheet.append_row(EXPECTED_HEADERS)
+            estado = "created"
+        elif headers == LEGACY_HEADERS:
+            for col in range(len(LEGACY_HEADERS), len(EXPECTED_HEADERS)):
+                self.worksheet.update_cell(1, col + 1, EXPECTED_HEADERS[col])
+            estado = "migrated"
+        else:
+            return "mismatch" # Se vuelve a comprobar en el siguiente rerun, por si se corrige la hoja
+        with _headers_checked_lock:
+            _headers_checked.add(key)
+        return estado
+
+    def append_rows(self, rows):
+        rows = [_completar_fila(r) for r in rows]
+        if not rows:
+            return
+        try:
+            if len(rows) == 1:
+                self.worksheet.append_row(rows[0])
+            else:
+                self.worksheet.append_rows(rows)
+        finally:
+            # Lectura de lo propio: la siguiente get_records trae las filas recién escritas (o lo que llegara a escribirse)
+            self.reader.mark_stale()
+
+    def get_records(self, usuario=None, desde=None, hasta=None, tipo_registro=None):
+        # La API de Sheets no permite filtrar en servidor: el lector incremental mantiene las filas en memoria
+        # y solo descarga las nuevas; el filtrado por usuario usa su índice
+        records = self.reader.get_records(usuario)
+        desde, hasta = _fecha_str(desde), _fecha_str(hasta)
+        return [r for r in records if _coincide(r, usuario, desde, hasta, tipo_registro)]
+
+
+# --- Backend SQLite local, indexado por (usuario, fecha, tipo_registro) ---
+class SQLiteBackend(StorageBackend):
+    name = "sqlite"
+
+    def __init__(self, path="nutrimind.sqlite"):
+        self.path = path
+        # Streamlit ejecuta cada sesión en su propio hilo: una conexión compartida protegida por un lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self.ensure_headers()
+
+    def ensure_headers(self):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS registros ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " usuario TEXT NOT NULL, fecha TEXT NOT NULL,"
+                " comida_original TEXT, comida_normalizada_canonica TEXT,"
+                " sueno REAL, ejercicio TEXT, animo INTEGER,"
+                " diversidad_diaria_plantas INTEGER, tipo_registro TEXT NOT NULL,"
+                " mascara_alimentos TEXT)"
+            )
+            columnas = {fila[1] for fila in self._conn.execute("PRAGMA table_info(registros)")}
+            if "mascara_alimentos" not in columnas: # Bases de datos creadas antes de la columna
+                self._conn.execute("ALTER TABLE registros ADD COLUMN mascara_alimentos TEXT")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_registros_usuario_fecha_tipo"
+                " ON registros (usuario, fecha, tipo_registro)"
+            )
+        return "ok"
+
+    def append_rows(self, rows):
+        rows = [_completar_fila(r, None) for r in rows]
+        if not rows:
+            return
+        placeholders = ", ".join("?" for _ in EXPECTED_HEADERS)
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT INTO registros ({', '.join(EXPECTED_HEADERS)}) VALUES ({placeholders})",
+                rows,
+            )
+
+    def get_records(self, usuario=None, desde=None, hasta=None, tipo_registro=None):
+        condiciones, params = [], []
+        if usuario is not None:
+            condiciones.append("usuario = ?"); params.append(usuario)
+        if desde is not None:
+            condiciones.append("fecha >= ?"); params.append(_fecha_str(desde))
+        if hasta is not None:
+            condiciones.append("fecha <= ?"); params.append(_fecha_str(hasta))
+        if tipo_registro is not None:
+            condiciones.append("tipo_registro = ?"); params.append(tipo_registro)
+        sql = f"SELECT {', '.join(EXPECTED_HEADERS)} FROM registros"
+        if condiciones:
+            sql += " WHERE " + " AND ".join(condiciones)
+        sql += " ORDER BY id"
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            return [dict(row) for row in cursor.fetchall()]
+
+    def iter_records(self, tipo_registro=None, chunk_size=10000):
+        # Paginación por id: memoria acotada a un lote y el lock no se retiene entre lotes
+        columnas = f"id, {', '.join(EXPECTED_HEADERS)}"
+        filtro = "" if tipo_registro is None else " AND tipo_registro = ?"
+        ultimo_id = 0
+        while True:
+            params = [ultimo_id] + ([] if tipo_registro is None else [tipo_registro]) + [chunk_size]
+            with self._lock:
+                filas = self._conn.execute(
+                    f"SELECT {columnas} FROM registros WHERE id > ?{filtro} ORDER BY id LIMIT ?", params
+                ).fetchall()
+            if not filas:
+                return
+            ultimo_id = filas[-1]["id"]
+            yield [{k: fila[k] for k in EXPECTED_HEADERS} for fila in filas]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_gsheets_backend(credentials, spreadsheet_name="habitos_microbiota"):
+    import gspread
+    client_gspread = gspread.authorize(credentials)
+    return GSheetsBackend(client_gspread.open(spreadsheet_name).sheet1)
@@ -0,0 +1,44 @@
+# nutrimind/summaries.py
+# Resúmenes semanales (filas tipo_registro = "resumen_semanal") para todos los usuarios a la vez:
+#   python -m nutrimind summaries --week 2026-W41
+# Una sola lectura (la semana y su lunes siguiente), un groupby vectorizado y un único append por lotes.
+# Los usuarios que ya tienen resumen de esa semana se saltan, así la tarea se puede repetir (cron) sin duplicar.
+from datetime import date, timedelta
+
+import pandas as pd
+
+from nutrimind.aggregates import iso_week_bounds, iso_week_key
+from nutrimind.analytics import plantas_por_semana
+from nutrimind.storage import EXPECTED_HEADERS
+
+
+def previous_week(hoy=None):
+    # Última semana ISO completa
+    hoy = hoy or date.today()
+    return iso_week_key(hoy - timedelta(days=hoy.weekday() + 1))
+
+
+def summary_date(semana):
+    # El resumen de una semana se fecha el lunes siguiente (como el botón de la app)
+    return iso_week_bounds(semana)[1] + timedelta(days=1)
+
+
+def summary_row(usuario, semana, n_plantas):
+    lunes, domingo = iso_week_bounds(semana)
+    return [usuario, summary_date(semana).strftime('%Y-%m-%d'),
+            f"Resumen semana {lunes.strftime('%Y-%m-%d')} - {domingo.strftime('%Y-%m-%d')}",
+            "", "", "", "", n_plantas, "resumen_semanal", ""]
+
+
+def weekly_summary_rows(records, semana, usuarios=()):
+    # records: al menos los registros entre el lunes de `semana` y el lunes siguiente.
+    # Filas nuevas para los usuarios con registros esa semana (y los de `usuarios`) que aún no tienen resumen
+    lunes, domingo = iso_week_bounds(semana)
+    df = pd.DataFrame(records, columns=EXPECTED_HEADERS)
+    fechas = df["fecha"].astype(str).str[:10]
+    existentes = set(df.loc[(df["tipo_registro"] == "resumen_semanal") & (fechas == summary_date(semana).strftime('%Y-%m-%d')), "usuario"])
+    diarios = df[(df["tipo_registro"] == "registro_diario") & fechas.between(lunes.strftime('%Y-%m-%d'), domingo.strftime('%Y-%m-%d'))]
+    por_usuario = plantas_por_semana(diarios) if not diarios.empty else pd.DataFrame(columns=["usuario", "semana", "diversidad_semanal_plantas"])
+    n_plantas = por_usuario[por_usuario["semana"] == semana].set_index("usuario")["diversidad_semanal_plantas"]
+    pendientes = (set(diarios["usuario"]) | set(usuarios)) - existentes
+    return [summary_row(u, semana, int(n_plantas.get(u, 0))) for u in sorted(pendientes)]
@@ -0,0 +1,58 @@
+# nutrimind/synthetic.py
+# Datos sintéticos deterministas para medir la app a escala: N usuarios × M días de registros diarios con
+# alimentos del catálogo real (food_details_db), ya canonizados y con su máscara, como los escribe guardar_registro.
+#   rows = synthetic_rows(n_users=100, n_days=365, seed=0)
+# Canonizar fila a fila domina el tiempo a millones de filas: las comidas salen de un repertorio de
+# `n_meals` combinaciones canonizadas una sola vez, y cada usuario repite sobre todo las suyas.
+import random
+from datetime import date, timedelta
+
+from nutrimind.catalog import get_catalog
+from nutrimind.food_ids import get_food_ids
+from nutrimind.importer import canonicalize_foods
+from nutrimind.storage import EXPECTED_HEADERS
+
+DEFAULT_START = date(2025, 1, 1)
+EJERCICIOS = ("", "", "Caminar 30 min", "Yoga", "Pesas", "Correr 5 km", "Bicicleta 45 min", "Natación")
+SUENO = (5.0, 5.5, 6.0, 6.5, 7.0, 7.0, 7.5, 7.5, 8.0, 8.0, 8.5, 9.0)
+
+
+def meal_repertoire(n_meals=512, seed=0):
+    # [(comida_original, comida_normalizada_canonica, diversidad, mascara_alimentos)]
+    rng = random.Random(seed)
+    catalogo = get_catalog()
+    food_ids = get_food_ids()
+    plantas = sorted(catalogo.plant_food_items_original_case)
+    otros = sorted(set(catalogo.all_selectable_food_items_original_case) - catalogo.plant_food_items_original_case)
+    comidas = []
+    for _ in range(n_meals):
+        items = rng.sample(plantas, rng.randint(2, 12)) + rng.sample(otros, rng.randint(0, min(3, len(otros))))
+        original, canonica, mascara, _ = canonicalize_foods(items)
+        comidas.append((original, canonica, food_ids.count_plants(mascara), food_ids.to_column(mascara)))
+    return comidas
+
+
+def user_name(i):
+    return f"usuario_{i:05d}"
+
+
+def synthetic_rows(n_users, n_days, seed=0, start=DEFAULT_START, n_meals=512):
+    # Genera filas en el orden de EXPECTED_HEADERS, día a día (como llegan a la hoja) y reproducibles por semilla.
+    # El ánimo depende del sueño y de la diversidad, para que el modelo de ánimo y los clusters tengan señal
+    comidas = meal_repertoire(n_meals, seed)
+    rng = random.Random(seed)
+    favoritas = [rng.sample(range(len(comidas)), min(24, len(comidas))) for _ in range(n_users)]
+    fechas = [(start + timedelta(days=d)).strftime('%Y-%m-%d') for d in range(n_days)]
+    for fecha in fechas:
+        for u in range(n_users):
+            indice = rng.choice(favoritas[u]) if rng.random() < 0.8 else rng.randrange(len(comidas))
+            original, canonica, diversidad, mascara = comidas[indice]
+            sueno = rng.choice(SUENO)
+            animo = max(1, min(5, round(0.4 * (sueno - 7) + 0.15 * (diversidad - 6) + 3 + rng.gauss(0, 0.7))))
+            yield [user_name(u), fecha, original, canonica, sueno, rng.choice(EJERCICIOS), animo, diversidad,
+                   "registro_diario", mascara]
+
+
+def synthetic_records(n_users, n_days, seed=0, start=DEFAULT_START):
+    # Igual que synthetic_rows, como diccionarios (formato de StorageBackend.get_records)
+    return [dict(zip(EXPECTED_HEADERS, fila)) for fila in synthetic_rows(n_users, n_days, seed, start)]
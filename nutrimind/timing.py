@@ -0,0 +1,184 @@
+# nutrimind/timing.py
+# Tramos de tiempo por fase de cada rerun (lectura de la hoja, DataFrames, gráficos, modelos, Vision...).
+#   with tracer.span("sheet_fetch"): ...
+# Cada rerun guarda sus tramos (panel de depuración de la barra lateral y, si se pide, una línea JSON por rerun)
+# y el proceso acumula por fase un histograma y las últimas muestras, que se pueden exportar en formato de texto
+# de Prometheus con p50/p95. Un fallo al escribir esos ficheros (disco lleno, sistema de solo lectura) se avisa
+# una vez y no interrumpe el rerun.
+import contextvars
+import json
+import os
+import threading
+import time
+import warnings
+from collections import deque
+from contextlib import contextmanager
+
+# Límites (segundos) de los cubos del histograma
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MAX_JSONL_BYTES = 10 * 1024 * 1024 # Al superarlo, el fichero pasa a .1 y se empieza otro
+PROMETHEUS_INTERVAL = 10.0 # Segundos mínimos entre reescrituras del fichero de métricas
+
+_rerun_actual = contextvars.ContextVar("nutrimind_timing_rerun", default=None)
+
+
+class Rerun:
+    def __init__(self, page, user):
+        self.page = page
+        self.user = user
+        self.started_at = time.time()
+        self._inicio = time.perf_counter()
+        self.spans = [] # [nombre, profundidad, segundos] en orden de inicio; segundos es None hasta que el tramo termina
+        self.depth = 0
+        self.total = None
+
+    def to_json(self):
+        return json.dumps({
+            "ts": round(self.started_at, 3), "page": self.page, "user": self.user,
+            "total_ms": None if self.total is None else round(self.total * 1000, 2),
+            "spans": [{"name": n, "depth": d, "ms": round(s * 1000, 2)} for n, d, s in self.spans if s is not None],
+        }, ensure_ascii=False)
+
+
+class PhaseHistogram:
+    def __init__(self, window=1000):
+        self.counts = [0] * (len(BUCKETS) + 1) # El último cubo es +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.samples = deque(maxlen=window) # Para p50/p95 de las últimas `window` muestras
+
+    def observe(self, segundos):
+        for i, limite in enumerate(BUCKETS):
+            if segundos <= limite:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += segundos
+        self.count += 1
+        self.samples.append(segundos)
+
+    def percentile(self, p):
+        muestras = sorted(self.samples)
+        if not muestras:
+            return None
+        return muestras[min(len(muestras) - 1, int(round(p / 100 * (len(muestras) - 1))))]
+
+
+def _etiqueta(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Tracer:
+    def __init__(self, jsonl_path=None, prometheus_path=None, clock=time.monotonic):
+        self.jsonl_path = jsonl_path or None
+        self.prometheus_path = prometheus_path or None
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.phases = {}
+        self._ultimo_prometheus = None
+        self._avisados = set() # Rutas cuyo fallo de escritura ya se ha avisado
+
+    # --- Reruns ---
+    def start_rerun(self, page=None, user=None):
+        rerun = Rerun(page, user)
+        _rerun_actual.set(rerun)
+        return rerun
+
+    def current_rerun(self):
+        return _rerun_actual.get()
+
+    def finish_rerun(self):
+        rerun = _rerun_actual.get()
+        if rerun is None or rerun.total is not None:
+            return rerun
+        rerun.total = time.perf_counter() - rerun._inicio
+        self.observe("rerun_total", rerun.total)
+        if self.jsonl_path:
+            self._exportar(self.jsonl_path, self._append_jsonl, rerun.to_json())
+        if self.prometheus_path:
+            ahora = self._clock()
+            if self._ultimo_prometheus is None or ahora - self._ultimo_prometheus >= PROMETHEUS_INTERVAL:
+                self._ultimo_prometheus = ahora
+                self._exportar(self.prometheus_path, self.write_prometheus, self.prometheus_path)
+        return rerun
+
+    # --- Tramos ---
+    @contextmanager
+    def span(self, name):
+        rerun = _rerun_actual.get()
+        tramo = None
+        if rerun is not None:
+            tramo = [name, rerun.depth, None]
+            rerun.spans.append(tramo)
+            rerun.depth += 1
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            segundos = time.perf_counter() - inicio
+            if tramo is not None:
+                tramo[2] = segundos
+                rerun.depth -= 1
+            self.observe(name, segundos)
+
+    def observe(self, name, segundos):
+        with self._lock:
+            self.phases.setdefault(name, PhaseHistogram()).observe(segundos)
+
+    # --- Exportación ---
+    def _exportar(self, path, funcion, *args):
+        try:
+            funcion(*args)
+        except OSError as e:
+            if path not in self._avisados:
+                self._avisados.add(path)
+                warnings.warn(f"No se pueden escribir los tiempos en {path} ({type(e).__name__} - {e}); se sigue sin ese fichero.")
+
+    def _append_jsonl(self, linea):
+        with self._lock:
+            try:
+                if os.path.getsize(self.jsonl_path) > MAX_JSONL_BYTES:
+                    os.replace(self.jsonl_path, self.jsonl_path + ".1")
+            except OSError:
+                pass
+            with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                f.write(linea + "\n")
+
+    def prometheus_text(self):
+        lineas = ["# HELP nutrimind_phase_seconds Duración de cada fase de un rerun de la app.",
+                  "# TYPE nutrimind_phase_seconds histogram"]
+        with self._lock:
+            fases = sorted(self.phases.items())
+            for fase, h in fases:
+                acumulado = 0
+                for limite, n in zip(BUCKETS + ("+Inf",), h.counts):
+                    acumulado += n
+                    lineas.append(f'nutrimind_phase_seconds_bucket{{phase="{_etiqueta(fase)}",le="{limite}"}} {acumulado}')
+                lineas.append(f'nutrimind_phase_seconds_sum{{phase="{_etiqueta(fase)}"}} {h.sum:.6f}')
+                lineas.append(f'nutrimind_phase_seconds_count{{phase="{_etiqueta(fase)}"}} {h.count}')
+            lineas += ["# HELP nutrimind_phase_latency_seconds p50/p95 de las últimas muestras de cada fase.",
+                       "# TYPE nutrimind_phase_latency_seconds summary"]
+            for fase, h in fases:
+                for cuantil, p in (("0.5", 50), ("0.95", 95)):
+                    lineas.append(f'nutrimind_phase_latency_seconds{{phase="{_etiqueta(fase)}",quantile="{cuantil}"}} {h.percentile(p):.6f}')
+                lineas.append(f'nutrimind_phase_latency_seconds_sum{{phase="{_etiqueta(fase)}"}} {h.sum:.6f}')
+                lineas.append(f'nutrimind_phase_latency_seconds_count{{phase="{_etiqueta(fase)}"}} {h.count}')
+        return "\n".join(lineas) + "\n"
+
+    def write_prometheus(self, path):
+        # Escritura atómica: quien lea el fichero (node_exporter textfile) nunca ve uno a medias
+        temporal = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temporal, "w", encoding="utf-8") as f:
+                f.write(self.prometheus_text())
+            os.replace(temporal, path)
+        except OSError:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            raise
+
+    def summary(self):
+        # {fase: (n, p50_ms, p95_ms)}
+        with self._lock:
+            return {fase: (h.count, h.percentile(50) * 1000, h.percentile(95) * 1000) for fase, h in sorted(self.phases.items())}
@@ -0,0 +1,176 @@
+# nutrimind/vision_cache.py
+# Caché de detecciones de Google Vision direccionada por contenido (sha256 de los bytes de la imagen).
+# Dos niveles, los dos acotados: LRU en memoria y SQLite en disco con caducidad y LRU por último uso
+# (la búsqueda de casi-duplicados recorre el disco, su coste crece con él). Opcionalmente, un hash
+# perceptual (dHash de 64 bits) reconoce la misma foto recomprimida o redimensionada.
+# Se guardan las etiquetas en bruto, no las plantas: un cambio de catálogo no invalida la caché.
+import hashlib
+import io
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_TTL = 30 * 24 * 3600 # Segundos
+DEFAULT_MAX_DISK_ENTRIES = 5000
+
+
+def content_key(image_bytes):
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def perceptual_hash(image_bytes, size=8):
+    # dHash: gris (size+1)x size, un bit por par de píxeles vecinos. None si PIL no está o la imagen no se lee
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            pixels = img.convert("L").resize((size + 1, size)).tobytes() # Un byte por píxel
+    except Exception:
+        return None
+    bits = 0
+    for fila in range(size):
+        for col in range(size):
+            izquierda = pixels[fila * (size + 1) + col]
+            derecha = pixels[fila * (size + 1) + col + 1]
+            bits = (bits << 1) | (izquierda > derecha)
+    return bits
+
+
+def _phash_from_db(valor):
+    # Se guarda en hexadecimal: 64 bits no caben en un INTEGER con signo de SQLite
+    return None if valor is None else int(valor, 16)
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+class DetectionCache:
+    def __init__(self, path="nutrimind_vision_cache.sqlite", max_entries=256, ttl=DEFAULT_TTL, phash_max_distance=None,
+                 max_disk_entries=DEFAULT_MAX_DISK_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self.phash_max_distance = phash_max_distance # None desactiva la búsqueda de casi-duplicados
+        self._memory = OrderedDict() # clave -> (phash, etiquetas, creado)
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "phash_hits": 0, "misses": 0, "stores": 0}
+        self._conn = None
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS detecciones ("
+                    " clave TEXT PRIMARY KEY, phash TEXT, etiquetas TEXT NOT NULL, creado REAL NOT NULL,"
+                    " usado REAL NOT NULL DEFAULT 0)"
+                )
+                columnas = {c[1] for c in self._conn.execute("PRAGMA table_info(detecciones)")}
+                if "usado" not in columnas: # Cachés anteriores: el último uso empieza siendo la creación
+                    self._conn.execute("ALTER TABLE detecciones ADD COLUMN usado REAL NOT NULL DEFAULT 0")
+                    self._conn.execute("UPDATE detecciones SET usado = creado")
+                self._conn.execute("CREATE INDEX IF NOT EXISTS detecciones_usado ON detecciones (usado)")
+                self._conn.execute("DELETE FROM detecciones WHERE creado < ?", (time.time() - ttl,))
+                self._evict_disk()
+
+    def _remember(self, clave, phash, etiquetas, creado):
+        self._memory[clave] = (phash, etiquetas, creado)
+        self._memory.move_to_end(clave)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _vigente(self, creado):
+        return time.time() - creado <= self.ttl
+
+    def _evict_disk(self):
+        # Con self._lock y la transacción abiertas: se borran las entradas usadas hace más tiempo
+        sobrantes = self._conn.execute("SELECT COUNT(*) FROM detecciones").fetchone()[0] - self.max_disk_entries
+        if sobrantes > 0:
+            self._conn.execute(
+                "DELETE FROM detecciones WHERE clave IN (SELECT clave FROM detecciones ORDER BY usado LIMIT ?)", (sobrantes,)
+            )
+
+    def _touch_disk(self, clave):
+        with self._conn:
+            self._conn.execute("UPDATE detecciones SET usado = ? WHERE clave = ?", (time.time(), clave))
+
+    def get(self, image_bytes):
+        # Etiquetas [{"description", "score"}, ...] o None si no está en caché
+        clave = content_key(image_bytes)
+        with self._lock:
+            entrada = self._memory.get(clave)
+            if entrada is not None and self._vigente(entrada[2]):
+                self._memory.move_to_end(clave)
+                self.stats["memory_hits"] += 1
+                return entrada[1]
+            if self._conn is not None:
+                fila = self._conn.execute(
+                    "SELECT phash, etiquetas, creado FROM detecciones WHERE clave = ?", (clave,)
+                ).fetchone()
+                if fila is not None and self._vigente(fila[2]):
+                    self._touch_disk(clave)
+                    etiquetas = json.loads(fila[1])
+                    self._remember(clave, _phash_from_db(fila[0]), etiquetas, fila[2])
+                    self.stats["disk_hits"] += 1
+                    return etiquetas
+        if self.phash_max_distance is not None:
+            etiquetas = self._get_near_duplicate(perceptual_hash(image_bytes))
+            if etiquetas is not None:
+                with self._lock:
+                    self.stats["phash_hits"] += 1
+                return etiquetas
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def _get_near_duplicate(self, phash):
+        # Del disco solo se leen clave y phash; las etiquetas se decodifican únicamente para la más cercana
+        if phash is None:
+            return None
+        mejor = None # (distancia, clave, etiquetas en memoria o None si están solo en disco)
+        with self._lock:
+            candidatos = [(p, clave, e) for clave, (p, e, c) in self._memory.items() if p is not None and self._vigente(c)]
+            if self._conn is not None:
+                filas = self._conn.execute(
+                    "SELECT clave, phash FROM detecciones WHERE phash IS NOT NULL AND creado >= ?",
+                    (time.time() - self.ttl,),
+                ).fetchall()
+                candidatos.extend((_phash_from_db(p), clave, None) for clave, p in filas if clave not in self._memory)
+            for p, clave, etiquetas in candidatos:
+                distancia = hamming(p, phash)
+                if distancia <= self.phash_max_distance and (mejor is None or distancia < mejor[0]):
+                    mejor = (distancia, clave, etiquetas)
+            if mejor is None:
+                return None
+            if mejor[2] is not None:
+                return mejor[2]
+            fila = self._conn.execute("SELECT etiquetas FROM detecciones WHERE clave = ?", (mejor[1],)).fetchone()
+            if fila is not None:
+                self._touch_disk(mejor[1])
+        return None if fila is None else json.loads(fila[0])
+
+    def put(self, image_bytes, etiquetas):
+        clave = content_key(image_bytes)
+        phash = perceptual_hash(image_bytes) if self.phash_max_distance is not None else None
+        etiquetas = [dict(e) for e in etiquetas]
+        creado = time.time()
+        with self._lock:
+            self._remember(clave, phash, etiquetas, creado)
+            self.stats["stores"] += 1
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO detecciones (clave, phash, etiquetas, creado, usado) VALUES (?, ?, ?, ?, ?)",
+                        (clave, None if phash is None else f"{phash:016x}", json.dumps(etiquetas, ensure_ascii=False), creado, creado),
+                    )
+                    self._evict_disk()
+
+    def hit_rate(self):
+        with self._lock:
+            hits = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["phash_hits"]
+            total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
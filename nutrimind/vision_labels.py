@@ -0,0 +1,220 @@
+# nutrimind/vision_labels.py
+# Llamadas de etiquetado a Google Vision para varias fotos a la vez.
+# Las fotos van en lotes de batch_annotate_images (una petición por lote) y los lotes se envían en
+# paralelo, así N fotos tardan lo mismo que una sola ida y vuelta. Con un cliente sin API por lotes
+# se usa un pool acotado de label_detection.
+# Cada ronda tiene un plazo total; los errores transitorios se reintentan dentro de ese plazo y un
+# circuit breaker deja de llamar a Vision tras varios fallos seguidos hasta que pasa un tiempo de espera.
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from nutrimind.write_behind import is_retryable_error
+
+MAX_IMAGES_PER_BATCH = 16 # Límite de Vision por petición de batch_annotate_images
+MAX_WORKERS = 4
+DEFAULT_DEADLINE = 8.0 # Segundos para toda la ronda de peticiones
+DEFAULT_RETRIES = 1
+RETRY_BACKOFF = 0.25
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=3, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout # Segundos en abierto antes de dejar pasar una petición de prueba
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self):
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and self._clock() - self._opened_at < self.reset_timeout:
+                return False
+            # Medio abierto: una sola petición de prueba a la vez
+            if self._probe_in_flight:
+                return False
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+
+
+class VisionMetrics:
+    def __init__(self, window=500):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window) # Segundos por llamada a la API, últimas `window`
+        self.counts = {"calls": 0, "images": 0, "failures": 0, "timeouts": 0, "retries": 0, "short_circuits": 0}
+
+    def incr(self, clave, n=1):
+        with self._lock:
+            self.counts[clave] += n
+
+    def observe(self, segundos):
+        with self._lock:
+            self._latencies.append(segundos)
+
+    def percentile(self, p):
+        with self._lock:
+            muestras = sorted(self._latencies)
+        if not muestras:
+            return None
+        return muestras[min(len(muestras) - 1, int(round(p / 100 * (len(muestras) - 1))))]
+
+    def snapshot(self):
+        with self._lock:
+            datos = dict(self.counts)
+        p50, p95 = self.percentile(50), self.percentile(95)
+        datos["latency_p50_ms"] = None if p50 is None else round(p50 * 1000, 1)
+        datos["latency_p95_ms"] = None if p95 is None else round(p95 * 1000, 1)
+        return datos
+
+
+def _labels(response):
+    return [{"description": l.description, "score": l.score} for l in response.label_annotations]
+
+
+def _result(response):
+    # (etiquetas, None) o (None, mensaje de error)
+    if response.error.message:
+        return None, response.error.message
+    return _labels(response), None
+
+
+def _call_with_retry(llamada, limite, retries, metrics):
+    # llamada(timeout) con reintentos de errores transitorios mientras quede plazo; (respuesta, error)
+    for intento in range(retries + 1):
+        restante = limite - time.monotonic()
+        if restante <= 0:
+            return None, TimeoutError("plazo agotado")
+        inicio = time.monotonic()
+        try:
+            respuesta = llamada(restante)
+        except Exception as e:
+            if metrics is not None:
+                metrics.observe(time.monotonic() - inicio)
+                metrics.incr("calls")
+            reintentable = is_retryable_error(e)
+            if not reintentable or intento >= retries or limite - time.monotonic() <= RETRY_BACKOFF:
+                return None, e
+            if metrics is not None:
+                metrics.incr("retries")
+            time.sleep(RETRY_BACKOFF * (2 ** intento))
+            continue
+        if metrics is not None:
+            metrics.observe(time.monotonic() - inicio)
+            metrics.incr("calls")
+        return respuesta, None
+    return None, TimeoutError("plazo agotado")
+
+
+def _annotate_batch(client, images, limite, retries, metrics):
+    from google.cloud import vision
+    feature = vision.Feature(type_=vision.Feature.Type.LABEL_DETECTION)
+    requests = [vision.AnnotateImageRequest(image=vision.Image(content=img), features=[feature]) for img in images]
+    response, error = _call_with_retry(
+        lambda timeout: client.batch_annotate_images(requests=requests, timeout=timeout, retry=None), limite, retries, metrics)
+    if error is not None:
+        return [(None, error)] * len(images)
+    return [_result(r) for r in response.responses]
+
+
+def _annotate_one(client, image, limite, retries, metrics):
+    from google.cloud import vision
+    response, error = _call_with_retry(
+        lambda timeout: client.label_detection(image=vision.Image(content=image), timeout=timeout, retry=None), limite, retries, metrics)
+    if error is not None:
+        return [(None, error)]
+    return [_result(response)]
+
+
+def annotate_labels(client, images, max_batch=MAX_IMAGES_PER_BATCH, max_workers=MAX_WORKERS,
+                    deadline=DEFAULT_DEADLINE, retries=DEFAULT_RETRIES, metrics=None):
+    # Una entrada (etiquetas, error) por imagen, en el mismo orden. El error es un mensaje de la API o una excepción
+    images = list(images)
+    if not images:
+        return []
+    limite = time.monotonic() + deadline
+    if hasattr(client, "batch_annotate_images"):
+        grupos = [images[i:i + max_batch] for i in range(0, len(images), max_batch)]
+        tarea = lambda grupo: _annotate_batch(client, grupo, limite, retries, metrics)
+    else:
+        grupos = [[img] for img in images]
+        tarea = lambda grupo: _annotate_one(client, grupo[0], limite, retries, metrics)
+    if metrics is not None:
+        metrics.incr("images", len(images))
+
+    # Siempre en el pool: el plazo se cumple aunque el cliente ignore su timeout
+    pool = ThreadPoolExecutor(max_workers=min(max_workers, len(grupos)), thread_name_prefix="nutrimind-vision")
+    futuros = [pool.submit(tarea, grupo) for grupo in grupos]
+    wait(futuros, timeout=max(0.0, limite - time.monotonic()))
+    pool.shutdown(wait=False, cancel_futures=True)
+    resultados = []
+    for futuro, grupo in zip(futuros, grupos):
+        if futuro.done() and not futuro.cancelled():
+            resultados.extend(futuro.result())
+        else:
+            resultados.extend([(None, TimeoutError(f"Vision no respondió en {deadline:g} s"))] * len(grupo))
+    if metrics is not None:
+        fallidas = [e for _, e in resultados if e is not None]
+        metrics.incr("failures", len(fallidas))
+        metrics.incr("timeouts", sum(isinstance(e, TimeoutError) or getattr(e, "code", None) == 504 for e in fallidas))
+    return resultados
+
+
+class VisionLabeler:
+    # Cliente de Vision con plazo, reintentos, circuit breaker y métricas; uno por proceso
+    def __init__(self, client, deadline=DEFAULT_DEADLINE, retries=DEFAULT_RETRIES, breaker=None, metrics=None):
+        self.client = client
+        self.deadline = deadline
+        self.retries = retries
+        self.breaker = breaker or CircuitBreaker()
+        self.metrics = metrics or VisionMetrics()
+
+    def annotate(self, images):
+        # None si el circuito está abierto (Vision se da por caído): el llamante pasa al registro manual
+        if not self.breaker.allow():
+            self.metrics.incr("short_circuits")
+            return None
+        try:
+            resultados = annotate_labels(self.client, images, deadline=self.deadline, retries=self.retries, metrics=self.metrics)
+        except BaseException:
+            # Sin esto, una petición de prueba que lanza deja el breaker medio abierto para siempre
+            self.breaker.record_failure()
+            raise
+        errores = [e for _, e in resultados if e is not None]
+        # Solo cuentan como fallo del servicio los errores transitorios (plazos, 429, 5xx, red)
+        if errores and len(errores) == len(resultados) and any(isinstance(e, Exception) and is_retryable_error(e) for e in errores):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return resultados
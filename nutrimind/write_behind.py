@@ -0,0 +1,190 @@
+# nutrimind/write_behind.py
+# Escritura diferida: las filas se encolan y un hilo en segundo plano las envía en lotes con append_rows.
+# Ante errores de cuota (429) o de servidor (5xx) se reintenta con backoff exponencial y jitter.
+import atexit
+import random
+import threading
+import time
+import warnings
+
+from nutrimind.storage import EXPECTED_HEADERS, StorageBackend, _coincide, _completar_fila, _fecha_str
+
+QUEUED = "queued"
+PERSISTED = "persisted"
+FAILED = "failed"
+
+
+class PendingWrite:
+    def __init__(self, row):
+        self.row = list(row)
+        self.status = QUEUED
+        self.error = None
+        self.enqueued_at = time.monotonic()
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+
+    def add_done_callback(self, callback):
+        # callback(pendiente) cuando la escritura termina (PERSISTED o FAILED), desde el hilo de escritura;
+        # si ya terminó, se llama en el momento
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def _finish(self, status, error=None):
+        with self._lock:
+            self.status = status
+            self.error = error
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception as e: # Un callback roto no debe parar el hilo de escritura
+                warnings.warn(f"Callback de escritura diferida fallido: {type(e).__name__} - {e}")
+
+    def wait(self, timeout=None):
+        self._done.wait(timeout)
+        return self.status
+
+
+def is_retryable_error(error):
+    response = getattr(error, "response", None)
+    status_code = getattr(response, "status_code", None)
+    if status_code is None:
+        status_code = getattr(error, "code", None)
+    if isinstance(status_code, int):
+        return status_code == 429 or 500 <= status_code < 600
+    # Errores de red sin respuesta HTTP (timeouts, conexiones cortadas) también son transitorios
+    return isinstance(error, (ConnectionError, TimeoutError))
+
+
+class WriteBehindStorage(StorageBackend):
+    def __init__(self, backend, max_batch=50, max_delay=2.0, max_retries=6, base_backoff=1.0, max_backoff=32.0):
+        self.backend = backend
+        self.name = f"{backend.name}+write_behind"
+        self.max_batch = max_batch
+        self.max_delay = max_delay # Segundos máximos que una fila espera en cola antes de enviarse
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._pending = []
+        self._in_flight = []
+        self._cond = threading.Condition()
+        # Envío al backend y lectura de get_records no se solapan: cada fila está en el backend y marcada
+        # PERSISTED, o aún no se ha enviado
+        self._escritura = threading.Lock()
+        self._flush_requested = False
+        self._closed = False
+        self.stats = {"batches": 0, "rows_persisted": 0, "rows_failed": 0, "retries": 0}
+        self._thread = threading.Thread(target=self._run, name="nutrimind-write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # --- Interfaz StorageBackend ---
+    def ensure_headers(self):
+        return self.backend.ensure_headers()
+
+    def append_rows(self, rows):
+        pendientes = [PendingWrite(r) for r in rows]
+        with self._cond:
+            self._pending.extend(pendientes)
+            # Se despierta siempre al hilo: con la cola vacía espera sin plazo y debe empezar a contar max_delay
+            self._cond.notify()
+        return pendientes
+
+    def append_row(self, row):
+        return self.append_rows([row])[0]
+
+    def get_records(self, usuario=None, desde=None, hasta=None, tipo_registro=None):
+        # Lectura de lo propio: las filas aún sin enviar (en cola o en vuelo) se suman a las del backend.
+        # Con _escritura tomado ningún lote está a medio enviar: las PERSISTED ya salen en la lectura del backend
+        # y las QUEUED no, así que se decide por identidad de cada PendingWrite (dos filas iguales cuentan dos veces).
+        # Como mucho se espera a que termine un envío en curso
+        with self._escritura:
+            pendientes = [p for p in self.pending_writes() if p.status == QUEUED]
+            records = list(self.backend.get_records(usuario=usuario, desde=desde, hasta=hasta, tipo_registro=tipo_registro))
+        desde, hasta = _fecha_str(desde), _fecha_str(hasta)
+        for pendiente in pendientes:
+            record = dict(zip(EXPECTED_HEADERS, _completar_fila(pendiente.row)))
+            if _coincide(record, usuario, desde, hasta, tipo_registro):
+                records.append(record)
+        return records
+
+    # --- Control de la cola ---
+    def pending_writes(self):
+        with self._cond:
+            return list(self._in_flight) + list(self._pending)
+
+    def flush(self, timeout=None):
+        with self._cond:
+            pendientes = list(self._in_flight) + list(self._pending)
+            self._flush_requested = True
+            self._cond.notify()
+        limite = None if timeout is None else time.monotonic() + timeout
+        for pendiente in pendientes:
+            restante = None if limite is None else max(0.0, limite - time.monotonic())
+            pendiente.wait(restante)
+        return all(p.status != QUEUED for p in pendientes)
+
+    def close(self, timeout=30.0):
+        if self._closed:
+            return
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+    def _take_batch(self):
+        # Espera hasta que haya un lote lleno, la fila más antigua supere max_delay o se pida un flush
+        with self._cond:
+            while True:
+                if self._closed and not self._pending:
+                    return None
+                if self._pending:
+                    edad = time.monotonic() - self._pending[0].enqueued_at
+                    if self._flush_requested or len(self._pending) >= self.max_batch or edad >= self.max_delay or self._closed:
+                        lote = self._pending[:self.max_batch]
+                        del self._pending[:self.max_batch]
+                        if not self._pending:
+                            self._flush_requested = False
+                        self._in_flight = lote
+                        return lote
+                    self._cond.wait(self.max_delay - edad)
+                else:
+                    self._flush_requested = False
+                    self._cond.wait()
+
+    def _run(self):
+        while True:
+            lote = self._take_batch()
+            if lote is None:
+                return
+            self._write_with_retry(lote)
+            with self._cond:
+                self._in_flight = []
+
+    def _write_with_retry(self, lote):
+        for intento in range(self.max_retries + 1):
+            try:
+                with self._escritura:
+                    self.backend.append_rows([p.row for p in lote])
+                    for pendiente in lote: # Marcadas antes de soltar el cerrojo; los callbacks, fuera
+                        pendiente.status = PERSISTED
+            except Exception as e:
+                if intento >= self.max_retries or not is_retryable_error(e):
+                    self.stats["rows_failed"] += len(lote)
+                    for pendiente in lote:
+                        pendiente._finish(FAILED, e)
+                    return
+                self.stats["retries"] += 1
+                # Backoff exponencial con "full jitter" para no sincronizar reintentos entre procesos
+                time.sleep(random.uniform(0, min(self.max_backoff, self.base_backoff * (2 ** intento))))
+                continue
+            self.stats["batches"] += 1
+            self.stats["rows_persisted"] += len(lote)
+            for pendiente in lote:
+                pendiente._finish(PERSISTED)
+            return
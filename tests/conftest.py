@@ -0,0 +1,37 @@
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "NutriMind.py")
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def app_secrets(tmp_path):
+    # Secretos de una app sin Google: SQLite, Vision falso y sin ficheros fuera de tmp_path
+    return {
+        "storage_backend": "sqlite", "sqlite_path": str(tmp_path / "nutrimind.sqlite"),
+        "vision_backend": "fake", "vision_cache_path": str(tmp_path / "vision_cache.sqlite"),
+    }
+
+
+@pytest.fixture
+def app_test(app_secrets):
+    from streamlit.testing.v1 import AppTest
+
+    def crear():
+        at = AppTest.from_file(APP_PATH, default_timeout=120)
+        for clave, valor in app_secrets.items():
+            at.secrets[clave] = valor
+        return at
+    return crear
+
+
+def login(at, usuario):
+    at.run()
+    at.sidebar.text_input(key="user_login_input").input(usuario)
+    next(b for b in at.sidebar.button if "Acceder" in b.label).click().run()
+    return at
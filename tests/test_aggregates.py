@@ -0,0 +1,68 @@
+# tests/test_aggregates.py
+# Caducidad e invalidación de las semanas materializadas de WeeklyPlantAggregates
+import sqlite3
+from datetime import date
+
+from nutrimind.aggregates import WeeklyPlantAggregates, iso_week_key
+from nutrimind.storage import SQLiteBackend
+from nutrimind.write_behind import FAILED, WriteBehindStorage
+
+FECHA = date(2026, 3, 10)
+SEMANA = iso_week_key(FECHA)
+
+
+def registro(usuario, comida):
+    return [usuario, FECHA.strftime('%Y-%m-%d'), comida, comida, 7, "", 4, 1, "registro_diario", ""]
+
+
+def envejecer(agregados, segundos):
+    with agregados._conn:
+        agregados._conn.execute("UPDATE semanas_materializadas SET materializada_en = materializada_en - ?", (segundos,))
+
+
+def test_materialized_week_expires_and_picks_up_rows_from_other_processes(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "nutrimind.sqlite"))
+    backend.ensure_headers()
+    backend.append_rows([registro("ana", "manzana")])
+    agregados = WeeklyPlantAggregates(str(tmp_path / "agregados.sqlite"), max_age=600)
+    assert agregados.get_or_build(backend, "ana", SEMANA) == {"manzana"}
+
+    backend.append_rows([registro("ana", "espinaca")]) # Otra réplica o import-csv: este proceso no llama a add
+    envejecer(agregados, 590)
+    assert agregados.get_or_build(backend, "ana", SEMANA) == {"manzana"}
+    envejecer(agregados, 20)
+    assert agregados.get_or_build(backend, "ana", SEMANA) == {"manzana", "espinaca"}
+    backend.close()
+
+
+def test_weeks_from_databases_without_timestamp_count_as_expired(tmp_path):
+    path = str(tmp_path / "agregados.sqlite")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE semanas_materializadas (usuario TEXT NOT NULL, semana TEXT NOT NULL,"
+                     " PRIMARY KEY (usuario, semana)) WITHOUT ROWID")
+        conn.execute("INSERT INTO semanas_materializadas VALUES ('ana', ?)", (SEMANA,))
+    conn.close()
+    assert WeeklyPlantAggregates(path).get("ana", SEMANA) == frozenset()
+    assert WeeklyPlantAggregates(path, max_age=600).get("ana", SEMANA) is None
+
+
+def test_failed_write_invalidates_the_week(tmp_path):
+    class BackendRechaza(SQLiteBackend):
+        def append_rows(self, rows):
+            raise ValueError("fila rechazada")
+
+    backend = BackendRechaza(str(tmp_path / "nutrimind.sqlite"))
+    backend.ensure_headers()
+    storage = WriteBehindStorage(backend, max_delay=0.0)
+    agregados = WeeklyPlantAggregates(":memory:")
+    assert agregados.get_or_build(storage, "ana", SEMANA) == frozenset()
+
+    # Lo que hace guardar_registro: actualización al encolar e invalidación si la escritura falla
+    pendiente = storage.append_row(registro("ana", "manzana"))
+    agregados.add("ana", FECHA, ["manzana"])
+    pendiente.add_done_callback(lambda p: agregados.invalidate("ana", FECHA) if p.status == FAILED else None)
+    assert pendiente.wait(5) == FAILED
+    assert agregados.get("ana", SEMANA) is None
+    assert agregados.get_or_build(storage, "ana", SEMANA) == frozenset()
+    storage.close(5)
+    backend.close()
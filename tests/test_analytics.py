@@ -0,0 +1,112 @@
+# tests/test_analytics.py
+# El pipeline vectorizado debe dar lo mismo que los bucles originales de la app y que las máscaras de bits
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+from nutrimind.aggregates import iso_week_key
+from nutrimind.analytics import explode_alimentos, plantas_por_dia, plantas_por_semana, presencia_pre_probioticos
+from nutrimind.catalog import get_catalog
+from nutrimind.food_ids import get_food_ids, union_masks
+from nutrimind.storage import EXPECTED_HEADERS
+from nutrimind.synthetic import synthetic_rows
+
+HOY = date(2026, 3, 10)
+
+
+@pytest.fixture(scope="module")
+def registros():
+    filas = list(synthetic_rows(6, 40, seed=3, start=HOY - timedelta(days=39)))
+    # Casos que los bucles originales también veían: dos registros el mismo día, alimentos no reconocidos,
+    # espacios, comida vacía, un día sin plantas y filas de resumen semanal
+    usuario = filas[0][0]
+    filas.append([usuario, filas[0][1], "Manzana, Kefir", "manzana ,  kefir", 7, "", 3, 1, "registro_diario", ""])
+    filas.append([usuario, HOY.strftime('%Y-%m-%d'), "Pizza rara", "pizza rara", 7, "", 3, 0, "registro_diario", ""])
+    filas.append(["sin_plantas", HOY.strftime('%Y-%m-%d'), "", "", 6, "", 2, 0, "registro_diario", ""])
+    filas.append([usuario, HOY.strftime('%Y-%m-%d'), "Resumen semana", "", "", "", "", 12, "resumen_semanal", ""])
+    return pd.DataFrame(filas, columns=EXPECTED_HEADERS)
+
+
+def items(comida_norm_str):
+    return [i.strip() for i in str(comida_norm_str).split(",") if i.strip()]
+
+
+def diarios(df):
+    df = df[df["tipo_registro"] == "registro_diario"].copy()
+    df["fecha"] = pd.to_datetime(df["fecha"]).dt.date
+    return df
+
+
+def mascaras(df):
+    food_ids = get_food_ids()
+    return [food_ids.from_column(m, c) for m, c in zip(df["mascara_alimentos"], df["comida_normalizada_canonica"])]
+
+
+def test_plantas_por_dia_matches_loop_and_masks(registros):
+    catalogo, food_ids = get_catalog(), get_food_ids()
+    df = diarios(registros)
+    df["mascara"] = mascaras(df)
+    esperado = {}
+    for (usuario, fecha), grupo in df.groupby(["usuario", "fecha"]):
+        # Bucle original de "Tus vegetales únicos por día"
+        plantas = set()
+        for comida_norm_str in grupo["comida_normalizada_canonica"].dropna():
+            for item in items(comida_norm_str):
+                if item in catalogo.normalized_plant_food_items:
+                    plantas.add(catalogo.food_details_db.get(item, {}).get("original_name", item))
+        esperado[(usuario, fecha)] = (len(plantas), ", ".join(sorted(plantas)))
+        assert len(plantas) == len(food_ids.plants(union_masks(grupo["mascara"])))
+
+    resultado = plantas_por_dia(registros)
+    obtenido = {(r.usuario, r.fecha.date()): (r.n_plantas, r.plantas) for r in resultado.itertuples()}
+    assert obtenido == esperado
+
+
+def test_plantas_por_semana_matches_loop_and_masks(registros):
+    catalogo, food_ids = get_catalog(), get_food_ids()
+    df = diarios(registros)
+    df["mascara"] = mascaras(df)
+    df["semana"] = [iso_week_key(f) for f in df["fecha"]]
+    esperado = {}
+    for (usuario, semana), grupo in df.groupby(["usuario", "semana"]):
+        # Bucle original de la diversidad semanal
+        plantas = {i for c in grupo["comida_normalizada_canonica"].dropna() for i in items(c)
+                   if i in catalogo.normalized_plant_food_items}
+        assert plantas == set(food_ids.plants(union_masks(grupo["mascara"])))
+        if plantas:
+            esperado[(usuario, semana)] = len(plantas)
+
+    resultado = plantas_por_semana(registros)
+    assert {(r.usuario, r.semana): r.diversidad_semanal_plantas for r in resultado.itertuples()} == esperado
+
+
+@pytest.mark.parametrize("hoy", [HOY, HOY - timedelta(days=10), HOY + timedelta(days=5)])
+def test_presencia_pre_probioticos_matches_loop_and_masks(registros, hoy):
+    catalogo, food_ids = get_catalog(), get_food_ids()
+    df = diarios(registros)
+    df["mascara"] = mascaras(df)
+    resultado = presencia_pre_probioticos(registros[registros["tipo_registro"] == "registro_diario"], hoy=hoy, dias=3)
+    assert set(resultado["usuario"]) == set(df["usuario"])
+    for r in resultado.itertuples():
+        # Bucle original de mostrar_mensajes_pre_probioticos
+        recientes = df[(df["usuario"] == r.usuario) & (df["fecha"] >= hoy - timedelta(days=3))]
+        consumidos = {i.strip() for c in recientes["comida_normalizada_canonica"] for i in str(c).split(",")}
+        assert r.probiotico_reciente == bool(catalogo.normalized_probiotic_foods & consumidos)
+        assert r.prebiotico_reciente == bool(catalogo.normalized_prebiotic_foods & consumidos)
+        mascara = union_masks(recientes["mascara"])
+        assert r.probiotico_reciente == bool(mascara & food_ids.probiotic_mask)
+        assert r.prebiotico_reciente == bool(mascara & food_ids.prebiotic_mask)
+
+
+@pytest.mark.parametrize("vista", [plantas_por_dia, plantas_por_semana, presencia_pre_probioticos])
+def test_views_without_rows_raise_value_error(vista):
+    with pytest.raises(ValueError):
+        vista()
+
+
+def test_presencia_pre_probioticos_from_exploded_rows(registros):
+    # Con largo y sin df solo salen los usuarios con algún alimento reconocido
+    con_df = presencia_pre_probioticos(registros, hoy=HOY).set_index("usuario")
+    solo_largo = presencia_pre_probioticos(hoy=HOY, largo=explode_alimentos(registros)).set_index("usuario")
+    assert solo_largo.equals(con_df.loc[solo_largo.index])
@@ -0,0 +1,63 @@
+# tests/test_export.py
+import gzip
+import io
+from datetime import date
+
+import pandas as pd
+import pytest
+from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+from streamlit.runtime.media_file_manager import MediaFileManager
+
+from conftest import login
+from nutrimind.export import available_formats, export_bytes
+from nutrimind.storage import EXPECTED_HEADERS, SQLiteBackend
+from nutrimind.synthetic import synthetic_rows
+
+
+def leer(contenido, fmt):
+    if fmt == "csv.gz":
+        return pd.read_csv(io.BytesIO(gzip.decompress(contenido)))
+    if fmt == "parquet":
+        return pd.read_parquet(io.BytesIO(contenido))
+    return pd.read_feather(io.BytesIO(contenido))
+
+
+@pytest.mark.parametrize("fmt", available_formats())
+def test_export_bytes_is_accepted_by_download_button(fmt):
+    filas = [dict(zip(EXPECTED_HEADERS, f)) for f in synthetic_rows(3, 20)]
+    contenido = export_bytes(filas, fmt, chunk_rows=7)
+    datos, _ = convert_data_to_bytes_and_infer_mime(contenido, unsupported_error=TypeError("tipo no soportado"))
+    df = leer(datos, fmt)
+    assert len(df) == len(filas)
+    assert list(df.columns) == EXPECTED_HEADERS
+    assert sorted(df["usuario"].astype(str).unique()) == sorted({f["usuario"] for f in filas})
+
+
+@pytest.mark.parametrize("fmt", available_formats())
+def test_export_bytes_without_records(fmt):
+    assert leer(export_bytes([], fmt), fmt).empty
+
+
+def test_download_button_generates_file(app_test, app_secrets, monkeypatch):
+    # El botón de descarga registra un callable diferido; se ejecuta como lo haría el servidor al pulsarlo
+    backend = SQLiteBackend(app_secrets["sqlite_path"])
+    backend.ensure_headers()
+    backend.append_rows(list(synthetic_rows(2, 10, start=date(2026, 9, 1))))
+    backend.close()
+    diferidos = []
+    add_deferred = MediaFileManager.add_deferred
+    def registrar(self, *args, **kwargs):
+        file_id = add_deferred(self, *args, **kwargs)
+        diferidos.append((self, file_id))
+        return file_id
+    monkeypatch.setattr(MediaFileManager, "add_deferred", registrar)
+
+    at = login(app_test(), "usuario_00000")
+    assert not at.exception
+    assert diferidos
+    gestor, file_id = diferidos[-1]
+    url = gestor.execute_deferred(file_id)
+    contenido = gestor._storage.get_file(url.rsplit("/", 1)[-1]).content
+    df = leer(contenido, "csv.gz")
+    assert len(df) == 10
+    assert set(df["usuario"]) == {"usuario_00000"}
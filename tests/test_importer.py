@@ -0,0 +1,53 @@
+# tests/test_importer.py
+# Duplicados de import-csv: se saltan las claves ya guardadas y las filas idénticas del fichero, no las del mismo día
+import csv
+
+from nutrimind.importer import import_csv
+from nutrimind.storage import EXPECTED_HEADERS, SQLiteBackend
+
+
+def fila(usuario, fecha, comida, tipo="registro_diario"):
+    return [usuario, fecha, comida, "", 7, "", 4, "", tipo, ""]
+
+
+def escribir_csv(path, filas):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows([EXPECTED_HEADERS, *filas])
+    return str(path)
+
+
+def test_import_keeps_same_day_rows_and_skips_stored_keys_and_identical_rows(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "nutrimind.sqlite"))
+    backend.ensure_headers()
+    backend.append_rows([fila("ana", "2026-03-09", "Manzana")])
+    path = escribir_csv(tmp_path / "habitos.csv", [
+        fila("ana", "2026-03-09", "Ajo"), # Clave ya guardada
+        fila("ana", "2026-03-10", "Manzana, Ajo"),
+        fila("ana", "2026-03-10", "Kefir"), # Segundo registro del mismo día
+        fila("ana", "2026-03-10", "ajo, manzana"), # Idéntica a la primera una vez canonizada
+        fila("ana", "2026-03-10", "", "resumen_semanal"),
+        fila("luis", "2026-03-10", "Kefir"),
+    ])
+    informe = import_csv(backend, path, chunk_rows=2)
+    assert (informe.read, informe.imported, informe.duplicates, informe.invalid) == (6, 4, 2, 0)
+    comidas = sorted((r["usuario"], r["fecha"], r["comida_original"]) for r in backend.get_records(tipo_registro="registro_diario"))
+    assert comidas == [("ana", "2026-03-09", "Manzana"), ("ana", "2026-03-10", "Ajo, Manzana"),
+                       ("ana", "2026-03-10", "Kefir"), ("luis", "2026-03-10", "Kefir")]
+
+    # Reimportar el mismo fichero no añade nada: todas sus claves ya están guardadas
+    assert import_csv(backend, path).imported == 0
+    backend.close()
+
+
+def test_import_normalizes_users_like_the_app_login(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "nutrimind.sqlite"))
+    backend.ensure_headers()
+    backend.append_rows([fila("ana", "2026-03-09", "Manzana")]) # Guardada desde la app
+    path = escribir_csv(tmp_path / "habitos.csv", [
+        fila("Ana", "2026-03-09", "Ajo"), # Misma clave que la guardada
+        fila(" José ", "2026-03-10", "Kefir"),
+    ])
+    informe = import_csv(backend, path)
+    assert (informe.imported, informe.duplicates) == (1, 1)
+    assert [r["comida_original"] for r in backend.get_records(usuario="jose")] == ["Kefir"]
+    backend.close()
@@ -0,0 +1,64 @@
+# tests/test_mood_models.py
+# Los estadísticos XᵀX/Xᵀy de MoodRegressionStore no deben conservar escrituras fallidas ni quedarse viejos
+import numpy as np
+
+from nutrimind.mood_models import MoodRegressionStore
+from nutrimind.storage import SQLiteBackend
+from nutrimind.synthetic import synthetic_rows
+from nutrimind.write_behind import FAILED, PERSISTED, WriteBehindStorage
+
+
+class BackendIntermitente(SQLiteBackend):
+    rechazar = False
+
+    def append_rows(self, rows):
+        if self.rechazar:
+            raise ValueError("fila rechazada")
+        super().append_rows(rows)
+
+
+def registrar(storage, store, fila):
+    # Lo que hace guardar_registro: actualización al encolar e invalidación si la escritura falla
+    pendiente = storage.append_row(fila)
+    store.add(fila[0], {"tipo_registro": fila[8], "sueno": fila[4], "animo": fila[6], "diversidad_diaria_plantas": fila[7]})
+    pendiente.add_done_callback(lambda p: store.invalidate(fila[0]) if p.status == FAILED else None)
+    return pendiente.wait(5)
+
+
+def test_failed_write_does_not_stay_in_the_statistics(tmp_path):
+    backend = BackendIntermitente(str(tmp_path / "nutrimind.sqlite"))
+    backend.ensure_headers()
+    filas = list(synthetic_rows(1, 12))
+    backend.append_rows(filas[:8])
+    storage = WriteBehindStorage(backend, max_delay=0.0)
+    store = MoodRegressionStore(":memory:")
+    store.get_or_build(storage, "usuario_00000")
+
+    assert registrar(storage, store, filas[8]) == PERSISTED
+    backend.rechazar = True
+    assert registrar(storage, store, filas[9]) == FAILED
+    assert store.get("usuario_00000") is None
+
+    modelo = store.get_or_build(storage, "usuario_00000")
+    esperado = MoodRegressionStore(":memory:").materialize("usuario_00000", backend.get_records())
+    assert modelo.n == esperado.n == 9
+    np.testing.assert_allclose(modelo.xtx, esperado.xtx)
+    np.testing.assert_allclose(modelo.xty, esperado.xty)
+    storage.close(5)
+    backend.close()
+
+
+def test_statistics_expire_and_pick_up_rows_from_other_processes(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "nutrimind.sqlite"))
+    backend.ensure_headers()
+    filas = list(synthetic_rows(1, 10))
+    backend.append_rows(filas[:6])
+    store = MoodRegressionStore(str(tmp_path / "agregados.sqlite"), max_age=600)
+    assert store.get_or_build(backend, "usuario_00000").n == 6
+
+    backend.append_rows(filas[6:]) # Otra réplica o import-csv: este proceso no llama a add
+    assert store.get_or_build(backend, "usuario_00000").n == 6
+    with store._conn:
+        store._conn.execute("UPDATE regresion_animo SET materializado_en = materializado_en - 601")
+    assert store.get_or_build(backend, "usuario_00000").n == 10
+    backend.close()
@@ -0,0 +1,39 @@
+# tests/test_storage.py
+# Llamadas a la API de Sheets de GSheetsBackend: las lecturas de un mismo rerun comparten un solo refresco
+import pytest
+
+from nutrimind.fakes import FakeWorksheet
+from nutrimind.storage import EXPECTED_HEADERS, GSheetsBackend
+from nutrimind.synthetic import synthetic_rows
+
+pytest.importorskip("gspread")
+
+NUEVA = ["usuario_00001", "2026-03-10", "Kefir", "kefir", 7, "", 4, 0, "registro_diario", ""]
+
+
+@pytest.fixture
+def hoja():
+    return FakeWorksheet([EXPECTED_HEADERS, *synthetic_rows(3, 10)])
+
+
+def test_repeated_reads_within_the_interval_make_one_api_call(hoja):
+    backend = GSheetsBackend(hoja)
+    for _ in range(5): # Como las varias get_records de un rerun
+        assert len(backend.get_records(usuario="usuario_00001")) == 10
+    assert hoja.calls["get_all_values"] == 1 and hoja.calls["batch_get"] == 0
+
+    hoja.append_row(NUEVA) # Fila de otra réplica: se ve al vencer el intervalo
+    assert len(backend.get_records(usuario="usuario_00001")) == 10
+    backend.reader.min_refresh_interval = 0.0
+    for _ in range(3):
+        assert len(backend.get_records(usuario="usuario_00001")) == 11
+    assert hoja.calls["batch_get"] == 3
+
+
+def test_own_writes_are_read_back_immediately(hoja):
+    backend = GSheetsBackend(hoja)
+    backend.get_records()
+    backend.append_rows([NUEVA])
+    assert len(backend.get_records(usuario="usuario_00001")) == 11
+    assert len(backend.get_records(usuario="usuario_00001")) == 11
+    assert hoja.calls["batch_get"] == 1
@@ -0,0 +1,45 @@
+# tests/test_timing.py
+# Las salidas a fichero del Tracer son opcionales y un fallo de escritura no rompe el rerun
+import json
+import warnings
+
+import pytest
+
+from nutrimind.timing import Tracer
+
+
+def rerun(tracer):
+    tracer.start_rerun("pagina", "ana")
+    with tracer.span("lectura"):
+        pass
+    return tracer.finish_rerun()
+
+
+def test_no_files_by_default(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert rerun(Tracer()).total is not None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_writes_jsonl_and_prometheus_when_enabled(tmp_path):
+    tracer = Tracer(str(tmp_path / "tiempos.jsonl"), str(tmp_path / "metricas.prom"))
+    rerun(tracer)
+    linea = json.loads((tmp_path / "tiempos.jsonl").read_text(encoding="utf-8"))
+    assert linea["user"] == "ana" and [s["name"] for s in linea["spans"]] == ["lectura"]
+    assert 'nutrimind_phase_seconds_count{phase="lectura"} 1' in (tmp_path / "metricas.prom").read_text(encoding="utf-8")
+
+
+def test_unwritable_outputs_warn_once_and_do_not_break_reruns(tmp_path):
+    # Un fichero normal como directorio: open() falla con OSError, como en un disco de solo lectura
+    bloqueo = tmp_path / "no_es_directorio"
+    bloqueo.write_text("")
+    tracer = Tracer(str(bloqueo / "tiempos.jsonl"), str(bloqueo / "metricas.prom"), clock=iter(range(0, 1000, 60)).__next__)
+    with pytest.warns(UserWarning) as avisos:
+        rerun(tracer)
+    assert len(avisos) == 2
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        for _ in range(3):
+            assert rerun(tracer).total is not None
+    assert tracer.summary()["rerun_total"][0] == 4
+    assert list(tmp_path.iterdir()) == [bloqueo]
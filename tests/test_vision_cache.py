@@ -0,0 +1,63 @@
+# tests/test_vision_cache.py
+# Casi-duplicados (dHash) de DetectionCache: la foto recomprimida da las etiquetas de la más cercana
+import io
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from nutrimind import vision_cache
+from nutrimind.vision_cache import DetectionCache
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def foto(semilla, calidad=95):
+    # Degradado con un patrón propio por semilla, para que los dHash de fotos distintas se alejen
+    img = Image.new("RGB", (64, 64))
+    img.putdata([((x * semilla * 7) % 256, (y * 13 + semilla * 40) % 256, ((x ^ y) * semilla) % 256)
+                 for y in range(64) for x in range(64)])
+    salida = io.BytesIO()
+    img.save(salida, format="JPEG", quality=calidad)
+    return salida.getvalue()
+
+
+def test_near_duplicate_from_disk_decodes_only_the_best_match(tmp_path, monkeypatch):
+    path = str(tmp_path / "vision_cache.sqlite")
+    escrita = DetectionCache(path, phash_max_distance=6)
+    for semilla in range(1, 30):
+        escrita.put(foto(semilla), [{"description": f"foto {semilla}", "score": 0.9}])
+
+    decodificadas = []
+    def loads(texto):
+        decodificadas.append(texto)
+        return json.loads(texto)
+    monkeypatch.setattr(vision_cache, "json", SimpleNamespace(loads=loads, dumps=json.dumps))
+
+    cache = DetectionCache(path, phash_max_distance=6) # Memoria vacía: todo sale del disco
+    assert cache.get(foto(5, calidad=60)) == [{"description": "foto 5", "score": 0.9}]
+    assert cache.stats["phash_hits"] == 1
+    assert len(decodificadas) == 1
+
+
+def test_near_duplicate_prefers_memory_and_respects_distance(tmp_path):
+    cache = DetectionCache(str(tmp_path / "vision_cache.sqlite"), phash_max_distance=6)
+    cache.put(foto(3), [{"description": "foto 3", "score": 0.8}])
+    assert cache.get(foto(3, calidad=60)) == [{"description": "foto 3", "score": 0.8}]
+    assert cache.get(foto(17)) is None
+    assert cache.stats["phash_hits"] == 1 and cache.stats["misses"] == 1
+
+
+def test_disk_tier_is_capped_by_last_use(tmp_path):
+    path = str(tmp_path / "vision_cache.sqlite")
+    cache = DetectionCache(path, max_disk_entries=3)
+    for semilla in range(1, 4):
+        cache.put(foto(semilla), [{"description": f"foto {semilla}", "score": 0.9}])
+    # Otro proceso (memoria vacía) usa la foto 1: pasa a ser la más reciente del disco
+    assert DetectionCache(path, max_disk_entries=3).get(foto(1)) == [{"description": "foto 1", "score": 0.9}]
+    cache.put(foto(4), [{"description": "foto 4", "score": 0.9}])
+
+    nueva = DetectionCache(path, max_disk_entries=3)
+    assert nueva._conn.execute("SELECT COUNT(*) FROM detecciones").fetchone()[0] == 3
+    assert nueva.get(foto(2)) is None # La usada hace más tiempo
+    assert all(nueva.get(foto(s)) is not None for s in (1, 3, 4))
@@ -0,0 +1,42 @@
+# tests/test_vision_labels.py
+# El circuit breaker de VisionLabeler se recupera aunque la petición de prueba (medio abierto) lance
+from types import SimpleNamespace
+
+import pytest
+
+from nutrimind.fakes import FakeVisionClient
+from nutrimind.vision_labels import CircuitBreaker, VisionLabeler
+
+pytest.importorskip("google.cloud.vision")
+
+
+class ClienteRoto(FakeVisionClient):
+    # Con roto=True devuelve una respuesta sin .responses: annotate_labels lanza AttributeError
+    roto = False
+
+    def batch_annotate_images(self, requests, timeout=None, retry=None, **kwargs):
+        if self.roto:
+            return SimpleNamespace()
+        return super().batch_annotate_images(requests, timeout=timeout, retry=retry, **kwargs)
+
+
+def test_probe_that_raises_does_not_leave_the_breaker_half_open_forever():
+    ahora = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10.0, clock=lambda: ahora[0])
+    cliente = ClienteRoto(error_rate=1.0)
+    labeler = VisionLabeler(cliente, retries=0, breaker=breaker)
+    labeler.annotate([b"foto"]) # 503: el circuito se abre
+    assert breaker.state == CircuitBreaker.OPEN
+
+    ahora[0] += 11
+    cliente.roto = True
+    with pytest.raises(AttributeError):
+        labeler.annotate([b"foto"]) # La petición de prueba lanza
+    assert breaker.state == CircuitBreaker.OPEN
+    assert labeler.annotate([b"foto"]) is None # Sigue abierto hasta el siguiente tiempo de espera
+
+    ahora[0] += 11
+    cliente.roto, cliente.error_rate = False, 0.0
+    resultados = labeler.annotate([b"foto"])
+    assert resultados[0][1] is None and resultados[0][0]
+    assert breaker.state == CircuitBreaker.CLOSED
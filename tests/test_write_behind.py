@@ -0,0 +1,102 @@
+# tests/test_write_behind.py
+# get_records de WriteBehindStorage mientras la cola envía lotes al backend
+import threading
+
+import pytest
+
+from nutrimind.storage import SQLiteBackend
+from nutrimind.write_behind import FAILED, PERSISTED, WriteBehindStorage
+
+FILA = ["ana", "2026-03-10", "Manzana", "manzana", 7.5, "", 4, 1, "registro_diario", ""]
+
+
+class BackendControlado(SQLiteBackend):
+    # append_rows escribe y espera a `seguir` antes de volver (la fila ya está en el backend pero sigue QUEUED);
+    # tras_leer se ejecuta al terminar cada get_records (lo que pasa entre la lectura y el resto de get_records)
+    def __init__(self, path):
+        super().__init__(path)
+        self.escrita = threading.Event()
+        self.seguir = threading.Event()
+        self.tras_leer = None
+        self.error = None
+
+    def append_rows(self, rows):
+        if self.error:
+            raise self.error
+        super().append_rows(rows)
+        self.escrita.set()
+        self.seguir.wait(10)
+
+    def get_records(self, **filtros):
+        records = super().get_records(**filtros)
+        if self.tras_leer:
+            self.tras_leer()
+        return records
+
+
+@pytest.fixture
+def crear_storage(tmp_path):
+    creados = []
+    def crear(max_delay):
+        backend = BackendControlado(str(tmp_path / f"nutrimind_{len(creados)}.sqlite"))
+        backend.ensure_headers()
+        creados.append(WriteBehindStorage(backend, max_delay=max_delay))
+        return creados[-1]
+    yield crear
+    for storage in creados:
+        storage.backend.seguir.set()
+        storage.close(5)
+        storage.backend.close()
+
+
+def leer_en_hilo(storage):
+    resultado = []
+    hilo = threading.Thread(target=lambda: resultado.append(storage.get_records(usuario="ana")))
+    hilo.start()
+    return hilo, resultado
+
+
+def test_read_waits_for_the_batch_being_written(crear_storage):
+    storage = crear_storage(max_delay=0.0)
+    pendiente = storage.append_row(FILA)
+    assert storage.backend.escrita.wait(5) # La fila ya está en el backend, pero aún no marcada PERSISTED
+    hilo, resultado = leer_en_hilo(storage)
+    hilo.join(0.2)
+    assert hilo.is_alive()
+    storage.backend.seguir.set()
+    hilo.join(5)
+    assert len(resultado[0]) == 1 and pendiente.wait(5) == PERSISTED
+    assert len(storage.get_records(usuario="ana")) == 1
+
+
+def test_batch_waits_for_the_backend_read(crear_storage):
+    storage = crear_storage(max_delay=60.0)
+    storage.backend.seguir.set()
+    pendiente = storage.append_row(FILA)
+    def enviar_durante_la_lectura():
+        storage.backend.tras_leer = None
+        threading.Thread(target=storage.flush).start()
+        assert not storage.backend.escrita.wait(0.2) # El envío no empieza hasta que termina la lectura
+    storage.backend.tras_leer = enviar_durante_la_lectura
+    assert [r["comida_original"] for r in storage.get_records(usuario="ana")] == ["Manzana"]
+    assert pendiente.wait(5) == PERSISTED
+    assert len(storage.get_records(usuario="ana")) == 1
+
+
+def test_identical_rows_are_all_returned(crear_storage):
+    storage = crear_storage(max_delay=60.0)
+    storage.backend.seguir.set()
+    storage.append_row(FILA)
+    assert storage.flush(5)
+    storage.append_rows([FILA, FILA]) # La misma comida guardada otra vez (dos veces), aún en cola
+    assert len(storage.get_records(usuario="ana")) == 3
+    assert storage.flush(5)
+    assert len(storage.get_records(usuario="ana")) == 3
+
+
+def test_failed_rows_are_not_returned(crear_storage):
+    storage = crear_storage(max_delay=0.0)
+    storage.backend.error = ValueError("fila rechazada")
+    pendiente = storage.append_row(FILA)
+    assert pendiente.wait(5) == FAILED
+    assert storage.get_records(usuario="ana") == []